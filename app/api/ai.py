@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import AIGenerationRequest, AIGenerationResponse
 from app.services.ai_service import AIService
+from app.services.view_context import ViewContext
 
 router = APIRouter()
 ai_service = AIService()
@@ -18,18 +19,9 @@ async def generate_ai_content(request: AIGenerationRequest):
             else:
                 lab_results.append(result)
         
-        # Get template for persona
-        from app.services.template_service import TemplateService
-        template_service = TemplateService()
-        template = await template_service.get_template_for_persona(request.persona)
-        
-        # Generate content
-        response = await ai_service.generate_content(
-            persona=request.persona,
-            lab_results=lab_results,
-            template=template,
-            user_context=request.user_context
-        )
+        # The context resolves the persona's template once for every generation step
+        context = ViewContext(request.persona, lab_results, user_context=request.user_context)
+        response = await ai_service.generate_for_context(context)
         
         return response
         
@@ -45,9 +37,9 @@ async def get_ai_prompt_for_persona(persona_type: str):
         
         persona = PersonaType(persona_type)
         template_service = TemplateService()
-        prompt = await template_service.get_ai_prompt_for_persona(persona)
+        prompt = template_service.render_prompt(persona)
         
-        return {"persona": persona_type, "prompt": prompt}
+        return {"persona": persona_type, "prompt": prompt.text, "tokens": prompt.tokens}
         
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid persona type")
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from app.models.schemas import CohortQuery
+from app.services.cohort_service import cohort_service
+
+router = APIRouter()
+
+@router.post("/cohort")
+async def query_cohort(query: CohortQuery):
+    """Abnormal rates, percentiles and a histogram of one analyte over a filtered, optionally grouped cohort"""
+    if query.percentiles and not all(0 <= p <= 100 for p in query.percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+    try:
+        return JSONResponse(await cohort_service.query(query.model_dump(mode="json")))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cohort/analytes")
+async def list_cohort_analytes():
+    """Analytes available for cohort queries with their result counts"""
+    try:
+        return await cohort_service.list_analytes()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/cohort/refresh")
+async def refresh_cohort_snapshot():
+    """Rebuild the cohort snapshot from current data"""
+    try:
+        data = await cohort_service.refresh()
+        return {"users": data.user_count, "results": data.result_count, "built_at": data.meta["built_at"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
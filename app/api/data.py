@@ -1,12 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import UserProfile, LabResult
-from app.services.data_service import DataService
-from typing import List
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.models.schemas import PublicUserProfile, LabResult, LabReport, LabReportDiff, QuestionnaireResponse
+from app.services.data_service import DataService, InvalidCursorError
+from app.services.cache_service import cache_service
+from app.services.ingestion_service import IngestionService, IngestionError
+from app.services.export_service import ExportService, ExportError
+from app.services.timeseries_service import TrendService
+from app.config import settings
+from typing import List, Optional
+import json
 
 router = APIRouter()
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 data_service = DataService()
+ingestion_service = IngestionService(
+    data_service, cache_service, max_errors=settings.ingest_max_errors, max_line_length=settings.ingest_max_line_length
+)
+trend_service = TrendService(data_service)
+export_service = ExportService(data_service, page_size=settings.stream_page_size, chunk_bytes=settings.export_chunk_bytes)
+EXPORT_MEDIA_TYPES = {"ndjson": NDJSON_MEDIA_TYPE, "csv": "text/csv"}
 
-@router.get("/profile/{user_id}", response_model=UserProfile)
+async def _ndjson_lines(pages):
+    """Encode rows as they are read so a response holds at most one page"""
+    async for page in pages:
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in page)
+
+@router.get("/profile/{user_id}", response_model=PublicUserProfile)
 async def get_user_profile(user_id: str):
     """Get user profile by ID"""
     try:
@@ -18,7 +37,7 @@ async def get_user_profile(user_id: str):
 
 @router.get("/lab-results/{user_id}", response_model=List[LabResult])
 async def get_lab_results(user_id: str, report_id: str = None):
-    """Get lab results for user"""
+    """Get lab results for one report (the latest one if report_id is omitted)"""
     try:
         return await data_service.get_lab_results(user_id, report_id)
     except ValueError as e:
@@ -26,6 +45,54 @@ async def get_lab_results(user_id: str, report_id: str = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/lab-results/{user_id}/page")
+async def get_lab_results_page(
+    user_id: str,
+    report_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.page_default_limit, ge=1, le=settings.page_max_limit)
+):
+    """Get one page of a report's lab results; pass next_cursor back to continue"""
+    try:
+        page = await data_service.get_lab_results_page(user_id, report_id, cursor, limit)
+        return JSONResponse(page)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/lab-results/{user_id}/stream")
+async def stream_lab_results(user_id: str, report_id: Optional[str] = None):
+    """Stream a report's lab results as NDJSON"""
+    try:
+        if report_id:
+            await data_service.get_lab_report(user_id, report_id)
+        pages = data_service.iter_lab_results(user_id, report_id, page_size=settings.stream_page_size)
+        return StreamingResponse(_ndjson_lines(pages), media_type=NDJSON_MEDIA_TYPE)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/lab-results/ingest")
+async def ingest_lab_results(
+    request: Request,
+    format: Optional[str] = None,
+    batch_size: int = Query(default=settings.ingest_batch_size, ge=1, le=100000)
+):
+    """Stream NDJSON or CSV lab results for many users into storage in batched transactions"""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    try:
+        return await ingestion_service.ingest(request.stream(), format.lower(), batch_size)
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/lab-results/{user_id}/abnormal", response_model=List[LabResult])
 async def get_abnormal_results(user_id: str):
     """Get only abnormal lab results for user"""
@@ -36,6 +103,55 @@ async def get_abnormal_results(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/lab-results/{user_id}/diff", response_model=LabReportDiff)
+async def get_lab_results_diff(
+    user_id: str,
+    from_report: Optional[str] = Query(None, alias="from", description="Earlier report ID (defaults to the report before `to`)"),
+    to_report: Optional[str] = Query(None, alias="to", description="Later report ID (defaults to the latest report)")
+):
+    """Compare two lab reports: value changes, new and removed analytes, status transitions"""
+    try:
+        return await data_service.get_report_diff(user_id, from_report, to_report)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reports/{user_id}", response_model=List[LabReport])
+async def list_lab_reports(user_id: str):
+    """List lab report metadata for user, newest first"""
+    try:
+        return await data_service.list_lab_reports(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reports/{user_id}/{report_id}", response_model=LabReport)
+async def get_lab_report(user_id: str, report_id: str):
+    """Get metadata for a single lab report ("latest" resolves the newest one)"""
+    try:
+        return await data_service.get_lab_report(user_id, None if report_id == "latest" else report_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/trends/{user_id}/{analyte}")
+async def get_analyte_trend(
+    user_id: str,
+    analyte: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    points: int = Query(default=settings.trend_default_points, ge=3, le=settings.trend_max_points),
+    method: str = "lttb"
+):
+    """Get one analyte's values over time, downsampled server-side (lttb or minmax)"""
+    try:
+        return await trend_service.get_trend(user_id, analyte, start, end, points, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/history/{user_id}")
 async def get_user_history(user_id: str):
     """Get user health history"""
@@ -46,7 +162,60 @@ async def get_user_history(user_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/profile", response_model=UserProfile)
+@router.get("/history/{user_id}/lab-results")
+async def get_lab_history_page(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=settings.page_default_limit, ge=1, le=settings.page_max_limit)
+):
+    """Get one page of the user's lab results across all reports, oldest first"""
+    try:
+        page = await data_service.get_lab_results_page(user_id, cursor=cursor, limit=limit, all_reports=True)
+        return JSONResponse(page)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/history/{user_id}/lab-results/stream")
+async def stream_lab_history(user_id: str):
+    """Stream the user's lab results across all reports as NDJSON, oldest first"""
+    pages = data_service.iter_lab_results(user_id, all_reports=True, page_size=settings.stream_page_size)
+    return StreamingResponse(_ndjson_lines(pages), media_type=NDJSON_MEDIA_TYPE)
+
+@router.get("/export/{user_id}")
+async def export_user_data(
+    user_id: str,
+    format: str = "ndjson",
+    compress: bool = Query(default=False, alias="gzip", description="gzip the stream on the fly")
+):
+    """Stream the user's full record (profile, reports, all lab results, history) as NDJSON or CSV"""
+    format = format.lower()
+    try:
+        body = await export_service.export_user(user_id, format, compress)
+    except ExportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    headers = {"Content-Disposition": f'attachment; filename="healthlens-{user_id}.{format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+@router.put("/profile/{user_id}/questionnaire", response_model=PublicUserProfile)
+async def update_questionnaire(user_id: str, responses: QuestionnaireResponse):
+    """Store the user's questionnaire responses; the stored persona is recomputed if they changed"""
+    try:
+        return await data_service.update_user_profile(user_id, {"questionnaire_responses": responses.model_dump()})
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/profile", response_model=PublicUserProfile)
 async def create_user_profile(profile_data: dict):
     """Create new user profile"""
     try:
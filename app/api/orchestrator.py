@@ -1,38 +1,75 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import AdaptiveViewRequest, AdaptiveViewResponse
-from app.services.cache_service import CacheService
+from typing import Any, Dict, Optional
+from fastapi.responses import JSONResponse, Response
+from app.models.schemas import AdaptiveViewRequest
+from app.services.cache_service import cache_service, adaptive_view_key, adaptive_view_tag, persona_view_tag, ui_version_key
 from app.services.data_service import DataService
-from app.services.persona_service import PersonaService
-from app.services.template_service import TemplateService
 from app.services.ai_service import AIService
 from app.services.audit_service import AuditService
 from app.services.behavior_service import BehaviorService
+from app.services.persona_registry import encode_json
+from app.services.json_patch import make_patch
+from app.services.view_context import ViewContext
+import hashlib
 import time
 
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default UI version retention")
+    class MockSettings:
+        ui_version_ttl = 3600
+    settings = MockSettings()
+
 router = APIRouter()
 
 # Service dependencies
-cache_service = CacheService()
 data_service = DataService()
-persona_service = PersonaService()
-template_service = TemplateService()
 ai_service = AIService()
 audit_service = AuditService()
 behavior_service = BehaviorService()
 
+def _ui_version(ui_json: bytes) -> str:
+    """Version of a ui_components document: digest of its compact JSON"""
+    return hashlib.sha256(ui_json).hexdigest()[:16]
+
+async def _patch_response(
+    response: Dict[str, Any], user_id: str, report_id: Optional[str], base_version: str
+) -> Optional[Dict[str, Any]]:
+    """
+    The response with ui_components replaced by a JSON Patch from the client's
+    version, or None when that version is no longer cached. The top-level
+    lab_results are left out too; they are the results_view data.
+    """
+    if base_version == response["ui_version"]:
+        patch = []
+    else:
+        base = await cache_service.get(ui_version_key(user_id, report_id, base_version))
+        if base is None:
+            return None
+        patch = make_patch(base, response["ui_components"])
+    patched = {key: value for key, value in response.items() if key not in ("ui_components", "lab_results")}
+    return {**patched, "ui_base_version": base_version, "ui_patch": patch}
+
 @router.get("/adaptive-view")
-async def get_adaptive_view(user_id: str, report_id: str = None, bypass_cache: bool = False):
+async def get_adaptive_view(
+    user_id: str, report_id: str = None, bypass_cache: bool = False, ui_version: Optional[str] = None
+):
     """
     Main adaptive view endpoint that implements the sequence diagram flow:
     1. Check cache for existing response
     2. If cache miss: fetch data, determine persona, generate AI content
     3. Cache response and return
+    Every response carries a ui_version. A client that sends the ui_version it
+    holds gets ui_patch, an RFC 6902 JSON Patch from that version, instead of
+    ui_components, or the full response when the version has expired.
     """
     start_time = time.time()
     
     try:
         # Step 1: Check cache (unless bypassed)
-        cache_key = f"{user_id}:{report_id or 'default'}"
+        cache_key = adaptive_view_key(user_id, report_id)
         cached_response = None
         
         if not bypass_cache:
@@ -41,49 +78,56 @@ async def get_adaptive_view(user_id: str, report_id: str = None, bypass_cache: b
         if cached_response:
             # Log cache hit
             await audit_service.log_interaction(user_id, "adaptive_view", "cache_hit", time.time() - start_time)
-            # Update cache_hit flag for cached response
-            cached_response['cache_hit'] = True
-            return AdaptiveViewResponse(**cached_response)
+            if "ui_version" not in cached_response:
+                cached_response["ui_version"] = _ui_version(encode_json(cached_response["ui_components"]))
+            if ui_version:
+                patched = await _patch_response(cached_response, user_id, report_id, ui_version)
+                if patched is not None:
+                    return JSONResponse({**patched, "cache_hit": True})
+            # Cached responses were built from validated data; serve them without re-validating
+            return JSONResponse({**cached_response, "cache_hit": True})
         
         # Step 2: Cache miss - fetch fresh data
-        # Fetch user profile + lab data + history
-        user_profile = await data_service.get_user_profile(user_id)
-        lab_results = await data_service.get_lab_results(user_id, report_id)
-        user_history = await data_service.get_user_history(user_id)
+        # Fetch user profile + lab data + history in one data-layer round-trip
+        bundle = await data_service.get_user_bundle(user_id, report_id)
+        user_profile = bundle.profile
+        lab_results = bundle.lab_results
+        user_history = bundle.history
         
-        # Step 3: Determine persona
-        persona = await persona_service.determine_persona(
-            age=user_profile.age,
-            history=user_history,
-            conditions=user_profile.conditions
-        )
+        # Step 3: Read the persona stored on the profile; it is only recomputed
+        # when the profile's inputs or the persona rules have changed
+        persona = await data_service.get_stored_persona(user_profile)
 
-        # Step 4: Select template for persona
-        template = await template_service.get_template_for_persona(persona)
+        # Step 4: Resolve the persona's template and derived lab result sets once,
+        # on a context every later step shares
+        context = ViewContext(persona, lab_results, profile=user_profile, history=user_history)
         
         # Step 5: Call AI service with persona-specific prompt
-        ai_content = await ai_service.generate_content(
-            persona=persona,
-            lab_results=lab_results,
-            template=template,
-            user_context={
-                "age": user_profile.age,
-                "conditions": user_profile.conditions,
-                "history": user_history
-            }
-        )
+        ai_content = await ai_service.generate_for_context(context)
         
-        # Step 6: Structure response with UI components
-        response = AdaptiveViewResponse(
-            persona=persona,
-            ui_components=ai_content.ui_components,
-            lab_results=lab_results,
-            recommendations=ai_content.recommendations,
-            cache_hit=False
-        )
+        # Step 6: Structure response with UI components. Every part already comes
+        # from a validated source, so the AdaptiveViewResponse shape is built
+        # directly instead of validating and dumping it again.
+        ui_json = context.skeleton.render_json(ai_content.content, context.lab_results_json)
+        current_version = _ui_version(ui_json)
+        response = {
+            "persona": persona.value,
+            "ui_version": current_version,
+            "ui_components": ai_content.ui_components,
+            "lab_results": context.lab_results_data,
+            "recommendations": ai_content.recommendations,
+            "cache_hit": False
+        }
         
-        # Step 7: Cache response (1 minute TTL for development)
-        await cache_service.set(cache_key, response.dict(), ttl=60)
+        # Step 7: Cache response (1 minute TTL for development), tagged so a profile
+        # change or a reloaded persona template drops it
+        await cache_service.set(
+            cache_key, response, ttl=60, tags=[adaptive_view_tag(user_id), persona_view_tag(persona.value)]
+        )
+        # Keep this version as a patch base for clients that refresh later
+        await cache_service.set(
+            ui_version_key(user_id, report_id, current_version), ai_content.ui_components, ttl=settings.ui_version_ttl
+        )
         
         # Step 8: Log full interaction
         await audit_service.log_interaction(
@@ -91,7 +135,7 @@ async def get_adaptive_view(user_id: str, report_id: str = None, bypass_cache: b
             "adaptive_view", 
             "cache_miss", 
             time.time() - start_time,
-            {"persona": persona, "lab_results_count": len(lab_results)}
+            {"persona": persona, "lab_results_count": len(context.lab_results)}
         )
         
         # Step 9: Send anonymized behavior data
@@ -102,7 +146,23 @@ async def get_adaptive_view(user_id: str, report_id: str = None, bypass_cache: b
             response_time=time.time() - start_time
         )
         
-        return response
+        if ui_version:
+            patched = await _patch_response(response, user_id, report_id, ui_version)
+            if patched is not None:
+                return JSONResponse(patched)
+        
+        # The body is spliced together rather than serialized from `response`: the
+        # lab results are encoded once for both places they appear, and the UI
+        # components come from the persona's pre-encoded skeleton
+        body = b"".join((
+            b'{"persona":', encode_json(persona.value),
+            b',"ui_version":', encode_json(current_version),
+            b',"ui_components":', ui_json,
+            b',"lab_results":', context.lab_results_json,
+            b',"recommendations":', encode_json(ai_content.recommendations),
+            b',"cache_hit":false}'
+        ))
+        return Response(body, media_type="application/json")
         
     except Exception as e:
         await audit_service.log_error(user_id, "adaptive_view", str(e))
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import PersonaCalculationRequest, PersonaResult, QuestionnaireResponse, UserProfile
+from fastapi import APIRouter, HTTPException, Response
+from app.models.schemas import (
+    PersonaBatchRequest, PersonaBatchResult, PersonaCalculationRequest, PersonaResult, QuestionnaireResponse, UserProfile
+)
+from app.services.persona_registry import PERSONAS_BY_NAME
 from app.services.persona_service import PersonaService
 
 router = APIRouter()
@@ -37,26 +40,32 @@ async def calculate_persona(request: PersonaCalculationRequest):
             reasoning=f"Error occurred during calculation, defaulting to balanced persona: {str(e)}"
         )
 
+@router.post("/calculate-batch", response_model=PersonaBatchResult)
+async def calculate_personas_batch(request: PersonaBatchRequest):
+    """Calculate personas for many users at once, in request order"""
+    try:
+        users = request.users
+        personas = await persona_service.determine_personas_batch(
+            [user.age for user in users],
+            [user.conditions for user in users],
+            [user.questionnaire_responses for user in users]
+        )
+        return PersonaBatchResult(personas=personas)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/info/{persona_type}")
 async def get_persona_info(persona_type: str):
     """Get detailed information about a specific persona"""
-    try:
-        from app.models.schemas import PersonaType
-        persona = PersonaType(persona_type)
-        return persona_service.get_persona_info(persona)
-    except ValueError:
+    entry = PERSONAS_BY_NAME.get(persona_type)
+    if entry is None:
         raise HTTPException(status_code=400, detail="Invalid persona type")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return Response(entry.info_json, media_type="application/json")
 
 @router.get("/templates/{persona_type}")
 async def get_persona_template_preferences(persona_type: str):
     """Get UI template preferences for a persona"""
-    try:
-        from app.models.schemas import PersonaType
-        persona = PersonaType(persona_type)
-        return await persona_service.get_ui_template_preferences(persona)
-    except ValueError:
+    entry = PERSONAS_BY_NAME.get(persona_type)
+    if entry is None:
         raise HTTPException(status_code=400, detail="Invalid persona type")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+    return Response(entry.ui_preferences_json, media_type="application/json")
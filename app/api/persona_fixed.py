@@ -1,10 +1,12 @@
 """
 Fixed Persona API - Simple working version
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import Dict, Any
 from pydantic import BaseModel
 
+from app.services.persona_registry import PERSONAS_BY_NAME, encode_json, generic_persona_info
+
 router = APIRouter()
 
 class SimplePersonaInfo(BaseModel):
@@ -14,55 +16,30 @@ class SimplePersonaInfo(BaseModel):
     category: str
     status: str
 
-@router.get("/info/{persona_type}")
-async def get_persona_info_fixed(persona_type: str) -> SimplePersonaInfo:
-    """Get detailed information about a specific persona - Fixed version"""
-    
-    # Simple persona data without complex dependencies
-    persona_data = {
-        "balanced": {
-            "name": "The Balanced User",
-            "description": "Takes a moderate approach to health management",
-            "category": "Balanced Health Management"
-        },
-        "detail-oriented": {
-            "name": "The Analyst", 
-            "description": "Loves diving deep into health data and tracking every detail",
-            "category": "Detail-Focused Management"
-        },
-        "health-conscious": {
-            "name": "The Guardian",
-            "description": "Prioritizes managing specific health conditions and prevention", 
-            "category": "Preventive Health Focus"
-        },
-        "tech-savvy": {
-            "name": "The Tech Expert",
-            "description": "Comfortable with technology and prefers digital solutions",
-            "category": "Technology-Focused"
-        },
-        "casual": {
-            "name": "The Casual User", 
-            "description": "Prefers simple, easy-to-understand health information",
-            "category": "Simplified Health Management"
-        }
-    }
-    
-    # Default for any persona not in the list
-    default_persona = {
-        "name": f"The {persona_type.title()} User",
-        "description": f"User with {persona_type} health management approach",
-        "category": "General Health Management"
+def _info(persona_type: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "persona": persona_type,
+        "name": info["name"],
+        "description": info["description"],
+        "category": info["category"],
+        "status": "success"
     }
-    
-    info = persona_data.get(persona_type, default_persona)
-    
-    return SimplePersonaInfo(
-        persona=persona_type,
-        name=info["name"],
-        description=info["description"], 
-        category=info["category"],
-        status="success"
-    )
+
+# Bodies served for known personas, encoded once at import
+_INFO_BODIES = {name: encode_json(_info(name, entry.config)) for name, entry in PERSONAS_BY_NAME.items()}
+_LIST_BODY = encode_json({
+    "personas": [{"id": name, "name": entry.config["name"]} for name, entry in PERSONAS_BY_NAME.items()],
+    "count": len(PERSONAS_BY_NAME),
+    "status": "success"
+})
+
+@router.get("/info/{persona_type}", response_model=SimplePersonaInfo)
+async def get_persona_info_fixed(persona_type: str):
+    """Get detailed information about a specific persona - Fixed version"""
+    body = _INFO_BODIES.get(persona_type)
+    if body is None:
+        body = encode_json(_info(persona_type, generic_persona_info(persona_type)))
+    return Response(body, media_type="application/json")
 
 @router.post("/calculate-simple")
 async def calculate_persona_simple(data: Dict[str, Any] = None):
@@ -97,22 +74,4 @@ async def calculate_persona_simple(data: Dict[str, Any] = None):
 @router.get("/list")
 async def list_all_personas():
     """List all available personas"""
-    return {
-        "personas": [
-            {"id": "balanced", "name": "The Balanced User"},
-            {"id": "detail-oriented", "name": "The Analyst"},
-            {"id": "health-conscious", "name": "The Guardian"}, 
-            {"id": "tech-savvy", "name": "The Tech Expert"},
-            {"id": "casual", "name": "The Casual User"},
-            {"id": "analytical", "name": "The Data Analyst"},
-            {"id": "quick-bold", "name": "The Quick Decision Maker"},
-            {"id": "fast-action", "name": "The Action Taker"},
-            {"id": "passive", "name": "The Passive User"},
-            {"id": "beginner", "name": "The Beginner"},
-            {"id": "intermediate", "name": "The Intermediate User"},
-            {"id": "goal-focused", "name": "The Goal Achiever"},
-            {"id": "action-oriented", "name": "The Action-Oriented User"}
-        ],
-        "count": 13,
-        "status": "success"
-    }
\ No newline at end of file
+    return Response(_LIST_BODY, media_type="application/json")
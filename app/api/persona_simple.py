@@ -1,84 +1,70 @@
 """
 Simple Persona Router - Clean implementation without enum issues
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Optional
 import sys
 sys.path.append('.')
 
+from app.services.persona_registry import PERSONAS_BY_NAME, encode_json, generic_persona_info
 from app.services.simple_persona_service import SimplePersonaService
 
-router = APIRouter(prefix="/api/v1/persona-simple", tags=["persona-simple"])
+# main.py mounts this router under /api/v1/persona-simple
+router = APIRouter(tags=["persona-simple"])
 
 # Initialize the simple persona service
 persona_service = SimplePersonaService()
 
+# Response bodies for every known persona are encoded once, at import
+_INFO_BODIES = {
+    name: b'{"success":true,"data":' + entry.summary_json + b"}" for name, entry in PERSONAS_BY_NAME.items()
+}
+_TYPES_BODY = encode_json({
+    "success": True,
+    "data": {"persona_types": list(PERSONAS_BY_NAME), "count": len(PERSONAS_BY_NAME)}
+})
+_HEALTH_BODY = encode_json({
+    "success": True,
+    "data": {"service": "Simple Persona Service", "status": "healthy", "version": "1.0"}
+})
+
 class PersonaCalculationRequest(BaseModel):
     age: Optional[int] = 30
     tech_comfort: Optional[str] = "intermediate"
 
 @router.get("/info/{persona_type}")
-async def get_persona_info(persona_type: str) -> Dict[str, Any]:
+async def get_persona_info(persona_type: str):
     """Get persona information by persona type"""
-    try:
-        info = persona_service.get_persona_info(persona_type)
-        return {
-            "success": True,
-            "data": info
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    body = _INFO_BODIES.get(persona_type)
+    if body is None:
+        body = encode_json({"success": True, "data": generic_persona_info(persona_type)})
+    return Response(body, media_type="application/json")
 
 @router.post("/calculate")
-async def calculate_persona(request: PersonaCalculationRequest) -> Dict[str, Any]:
+async def calculate_persona(request: PersonaCalculationRequest):
     """Calculate persona based on user inputs"""
     try:
         persona_type = persona_service.calculate_simple_persona(
             age=request.age,
             tech_comfort=request.tech_comfort
         )
-        
-        persona_info = persona_service.get_persona_info(persona_type)
-        
-        return {
-            "success": True,
-            "data": {
-                "calculated_persona": persona_type,
-                "persona_info": persona_info
-            }
-        }
+        entry = PERSONAS_BY_NAME.get(persona_type)
+        persona_info = entry.summary_json if entry else encode_json(generic_persona_info(persona_type))
+        body = (
+            b'{"success":true,"data":{"calculated_persona":' + encode_json(persona_type)
+            + b',"persona_info":' + persona_info + b"}}"
+        )
+        return Response(body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/types")
-async def get_available_persona_types() -> Dict[str, Any]:
+async def get_available_persona_types():
     """Get list of all available persona types"""
-    try:
-        persona_types = [
-            "detail-oriented", "analytical", "tech-savvy", "quick-bold",
-            "casual", "fast-action", "health-conscious", "balanced",
-            "passive", "beginner", "intermediate", "goal-focused", "action-oriented"
-        ]
-        
-        return {
-            "success": True,
-            "data": {
-                "persona_types": persona_types,
-                "count": len(persona_types)
-            }
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return Response(_TYPES_BODY, media_type="application/json")
 
 @router.get("/health")
-async def persona_health_check() -> Dict[str, Any]:
+async def persona_health_check():
     """Health check for persona service"""
-    return {
-        "success": True,
-        "data": {
-            "service": "Simple Persona Service",
-            "status": "healthy",
-            "version": "1.0"
-        }
-    }
\ No newline at end of file
+    return Response(_HEALTH_BODY, media_type="application/json")
@@ -1,12 +1,21 @@
 """
 HealthLens API - Simple Test Endpoints
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 from pydantic import BaseModel
 from typing import Dict, Any
 
+from app.services.persona_registry import PERSONAS_BY_NAME, encode_json
+
 router = APIRouter()
 
+# Encoded once from the persona registry, like the persona-simple bodies
+_PERSONAS_BODY = encode_json({
+    "personas": list(PERSONAS_BY_NAME),
+    "count": len(PERSONAS_BY_NAME),
+    "status": "success"
+})
+
 class SimplePersonaResponse(BaseModel):
     persona: str
     status: str
@@ -52,22 +61,4 @@ async def calculate_persona_simple(data: Dict[str, Any] = None):
 @router.get("/personas")
 async def list_personas():
     """List all available personas"""
-    return {
-        "personas": [
-            "detail-oriented",
-            "analytical", 
-            "tech-savvy",
-            "quick-bold",
-            "casual",
-            "fast-action",
-            "health-conscious",
-            "balanced",
-            "passive",
-            "beginner",
-            "intermediate",
-            "goal-focused",
-            "action-oriented"
-        ],
-        "count": 13,
-        "status": "success"
-    }
\ No newline at end of file
+    return Response(_PERSONAS_BODY, media_type="application/json")
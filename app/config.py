@@ -4,11 +4,60 @@ from typing import List
 class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
     database_url: str = "sqlite:///./healthlens.db"
+    data_backend: str = "memory"  # "memory", "sql" or "sharded"
+    database_pool_size: int = 5
+    database_seed_mock_data: bool = True
+    shard_database_urls: str = "sqlite:///./healthlens-shard0.db,sqlite:///./healthlens-shard1.db"
+    shard_map_path: str = "./shard_map.json"
+    shard_virtual_buckets: int = 1024
+    shard_map_reload_interval: float = 2.0  # Seconds between shard map file checks; 0 disables reloading
+    ingest_batch_size: int = 1000
+    ingest_max_errors: int = 1000
+    ingest_max_line_length: int = 65536  # Characters per line (or CSV record); longer ones fail the upload
+    ingest_normalize_units: bool = True
+    trend_default_points: int = 300
+    page_default_limit: int = 100
+    page_max_limit: int = 1000
+    stream_page_size: int = 500
+    export_chunk_bytes: int = 65536
+    trend_max_points: int = 5000
+    lab_catalog_path: str = "./lab_catalog.bin"
+    cohort_snapshot_dir: str = "./cohort_snapshot"
+    cohort_refresh_seconds: int = 900
+    cohort_workers: int = 2
+    cohort_pool_min_rows: int = 1000000
+    cohort_age_bands: str = "18,30,45,65,80"
+    cohort_scan_batch_size: int = 50000
+    persona_recompute_on_startup: bool = True
+    persona_recompute_batch_size: int = 1000
+    persona_recompute_lock_ttl: int = 3600  # Seconds one worker's claim on a rules version's recompute lasts
+    persona_rules_path: str = ""  # Empty: the bundled app/data/persona_rules.json
+    ui_templates_path: str = ""  # Empty: the bundled app/data/ui_templates.json
+    ui_version_ttl: int = 3600  # Seconds a served ui_components version stays available as a JSON Patch base
+    content_reload_interval: float = 5.0  # Seconds between content file checks; 0 disables reloading
     ai_service_url: str = "https://vertex-ai-endpoint"
+    ai_remote_enabled: bool = False  # False: generate content locally (mock)
+    ai_generate_path: str = "/generate"
+    ai_proxy_url: str = ""
+    ai_verify_tls: bool = True
+    ai_http2: bool = True  # Needs the h2 package; HTTP/1.1 otherwise
+    ai_max_connections: int = 100
+    ai_max_keepalive_connections: int = 20
+    ai_keepalive_expiry: float = 30.0
+    ai_connect_timeout: float = 5.0
+    ai_read_timeout: float = 30.0
+    ai_pool_timeout: float = 5.0
     cors_origins: List[str] = ["http://localhost:8080", "http://localhost:3000"]
     secret_key: str = "your-secret-key-here"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    cache_local_ttl: int = 30
+    cache_snapshot_path: str = "./cache_snapshot.bin"
+    cache_snapshot_max_entries: int = 5000
+    cache_warm_key: str = "cache:warm"
+    cache_invalidation_channel: str = "cache:invalidate"
+    cache_memory_max_entries: int = 10000
+    data_cache_enabled: bool = True
 
     class Config:
         env_file = ".env"
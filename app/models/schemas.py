@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional, Dict, Any
 from enum import Enum
 
 class PersonaType(str, Enum):
@@ -26,16 +26,70 @@ class LabResult(BaseModel):
     name: str
     value: float
     unit: str
-    reference_range: Dict[str, float]  # {"min": float, "max": float}
+    reference_range: Dict[str, Optional[float]]  # {"min": float, "max": float}; a bound may be missing
     category: str
     status: LabResultStatus
+    original_value: Optional[float] = None  # As submitted, when converted to the canonical unit
+    original_unit: Optional[str] = None
 
-class UserProfile(BaseModel):
-    id: str
-    age: int
-    gender: str
-    conditions: Optional[str] = None
-    created_at: Optional[str] = None
+class LabResultIngestRow(BaseModel):
+    """One row of a partner lab feed; reference ranges arrive flat (CSV) or nested (NDJSON)"""
+    user_id: str
+    report_id: Optional[str] = None
+    collected_at: Optional[str] = None
+    result_date: Optional[str] = None
+    source: Optional[str] = None
+    name: str
+    value: float
+    unit: str
+    ref_min: Optional[float] = None
+    ref_max: Optional[float] = None
+    category: str
+    status: Optional[LabResultStatus] = None
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize_feed_row(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            reference_range = data.pop("reference_range", None)
+            if isinstance(reference_range, dict):
+                data.setdefault("ref_min", reference_range.get("min"))
+                data.setdefault("ref_max", reference_range.get("max"))
+            if isinstance(data.get("user_id"), int):
+                data["user_id"] = str(data["user_id"])
+        return data
+
+class LabReport(BaseModel):
+    report_id: str
+    user_id: str
+    collected_at: str
+    source: Optional[str] = None
+    result_count: int = 0
+
+class LabResultChange(BaseModel):
+    """One analyte present in both compared reports"""
+    name: str
+    unit: str
+    from_value: float
+    to_value: float
+    delta: Optional[float] = None  # None when the two reports use different units
+    percent_change: Optional[float] = None  # None as well when the earlier value is zero
+    from_status: LabResultStatus
+    to_status: LabResultStatus
+
+class StatusTransition(BaseModel):
+    name: str
+    from_status: LabResultStatus
+    to_status: LabResultStatus
+
+class LabReportDiff(BaseModel):
+    user_id: str
+    from_report: LabReport
+    to_report: LabReport
+    changes: List[LabResultChange]
+    new_analytes: List[LabResult]
+    removed_analytes: List[LabResult]
+    status_transitions: List[StatusTransition]
 
 class QuestionnaireResponse(BaseModel):
     tracking_style: str
@@ -44,6 +98,28 @@ class QuestionnaireResponse(BaseModel):
     tech_comfort: str
     dashboard_preference: str
 
+class PublicUserProfile(BaseModel):
+    """The profile as served to clients"""
+    id: str
+    age: int
+    gender: str
+    conditions: Optional[str] = None
+    created_at: Optional[str] = None
+    questionnaire_responses: Optional[QuestionnaireResponse] = None
+    persona: Optional[PersonaType] = None
+
+class UserProfile(PublicUserProfile):
+    # Rules version and input fingerprint the stored persona was computed from
+    persona_rules_version: Optional[str] = None
+    persona_fingerprint: Optional[str] = None
+
+class UserBundle(BaseModel):
+    """Everything the adaptive view needs about a user, fetched together"""
+    profile: UserProfile
+    report: Optional[LabReport] = None
+    lab_results: List[LabResult]
+    history: Dict[str, Any]
+
 class PersonaCalculationRequest(BaseModel):
     user_profile: UserProfile
     questionnaire_responses: QuestionnaireResponse
@@ -53,6 +129,30 @@ class PersonaResult(BaseModel):
     confidence: float
     reasoning: str
 
+class PersonaBatchUser(BaseModel):
+    age: int
+    conditions: Optional[str] = None
+    questionnaire_responses: Optional[QuestionnaireResponse] = None
+
+class PersonaBatchRequest(BaseModel):
+    users: List[PersonaBatchUser] = Field(..., max_length=10000)
+
+class PersonaBatchResult(BaseModel):
+    personas: List[PersonaType]  # In request order
+
+class CohortQuery(BaseModel):
+    """Filters and aggregates for one analyte across the user population"""
+    analyte: str
+    personas: Optional[List[PersonaType]] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    gender: Optional[str] = None
+    conditions: Optional[List[str]] = None  # Users with any condition containing one of these terms
+    group_by: Optional[Literal["persona", "age_band", "gender", "condition"]] = None
+    latest_only: bool = True  # Each user's most recent result instead of every result
+    percentiles: List[float] = Field(default=[5, 25, 50, 75, 95], max_length=20)
+    histogram_bins: int = Field(default=20, ge=0, le=200)
+
 class AdaptiveViewRequest(BaseModel):
     user_id: str
     report_id: Optional[str] = None
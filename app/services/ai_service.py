@@ -1,5 +1,8 @@
 from app.models.schemas import AIGenerationRequest, AIGenerationResponse, PersonaType, LabResult
-from app.services.template_service import TemplateService
+from app.services.ai_transport import TRANSPORT_ERRORS, ai_transport
+from app.services.lab_catalog import get_lab_catalog
+from app.services.persona_registry import encode_json
+from app.services.view_context import ViewContext
 from typing import List, Dict, Any
 import asyncio
 
@@ -11,29 +14,13 @@ except ImportError:
     SETTINGS_AVAILABLE = False
     print("⚠️  Settings not available - using defaults for AI service")
 
-# Try to import httpx gracefully
-try:
-    import httpx
-    HTTPX_AVAILABLE = True
-except ImportError:
-    HTTPX_AVAILABLE = False
-    print("⚠️  HTTPX not available - AI service will use mock responses only")
+_RECOMMENDATION_TOPICS = ("glucose", "cholesterol", "blood")
 
 class AIService:
-    def __init__(self):
-        self.template_service = TemplateService()
-        # Initialize HTTP client with proxy support for external AI calls
-        if HTTPX_AVAILABLE and SETTINGS_AVAILABLE:
-            try:
-                self.client = httpx.AsyncClient(
-                    proxies={'http': 'http://tproxy02.qdx.com:9090', 'https': 'http://tproxy02.qdx.com:9090'},
-                    timeout=30.0,
-                    verify=False  # For corporate environments with custom certificates
-                )
-            except Exception:
-                self.client = None
-        else:
-            self.client = None
+    @property
+    def client(self):
+        """HTTP client for external AI calls, shared by every AIService (see ai_transport)"""
+        return ai_transport.client
     
     async def generate_content(
         self, 
@@ -46,23 +33,29 @@ class AIService:
         Mock AI service that simulates Vertex AI content generation.
         In production, this would call the actual AI service.
         """
-        # Simulate API call delay
-        await asyncio.sleep(0.5)
-        
-        # Analyze lab results
-        abnormal_results = [r for r in lab_results if r.status != "normal"]
-        normal_count = len(lab_results) - len(abnormal_results)
-        
-        # Generate persona-specific content
-        content = await self._generate_persona_content(persona, lab_results, abnormal_results, user_context)
+        # The template is resolved from the persona on the context
+        return await self.generate_for_context(ViewContext(persona, lab_results, user_context=user_context))
+
+    async def generate_for_context(self, context: ViewContext) -> AIGenerationResponse:
+        """generate_content for a request whose persona and lab results are already resolved"""
+        if SETTINGS_AVAILABLE and settings.ai_remote_enabled:
+            try:
+                content = await self._generate_remote_content(context)
+            except (*TRANSPORT_ERRORS, KeyError, TypeError) as e:
+                # A flaky AI backend degrades the summary instead of failing the dashboard
+                print(f"⚠️  AI backend unavailable, using built-in persona content: {e!r}")
+                content = await self._generate_persona_content(context)
+        else:
+            # Simulate API call delay
+            await asyncio.sleep(0.5)
+            # Generate persona-specific content
+            content = await self._generate_persona_content(context)
         
         # Generate UI components based on template
-        ui_components = await self.template_service.structure_ui_response(
-            persona, content, [r.dict() for r in lab_results]
-        )
+        ui_components = context.skeleton.render(content, context.lab_results_data)
         
         # Generate recommendations
-        recommendations = await self._generate_recommendations(persona, abnormal_results, user_context)
+        recommendations = await self._generate_recommendations(context)
         
         return AIGenerationResponse(
             content=content,
@@ -70,14 +63,19 @@ class AIService:
             recommendations=recommendations
         )
     
-    async def _generate_persona_content(
-        self, 
-        persona: PersonaType, 
-        lab_results: List[LabResult], 
-        abnormal_results: List[LabResult],
-        user_context: Dict[str, Any] = None
-    ) -> str:
+    async def _generate_remote_content(self, context: ViewContext) -> str:
+        """Ask the AI backend for the summary, sending the persona's rendered prompt"""
+        body = encode_json({
+            "persona": context.persona.value,
+            "prompt": context.prompt.text,
+            "lab_results": context.lab_results_data
+        })
+        reply = await ai_transport.post_json(settings.ai_generate_path, body)
+        return reply["content"]
+    
+    async def _generate_persona_content(self, context: ViewContext) -> str:
         """Generate content based on persona type"""
+        persona, abnormal_results = context.persona, context.abnormal_results
         
         if len(abnormal_results) == 0:
             return await self._generate_normal_results_content(persona)
@@ -99,14 +97,16 @@ class AIService:
             items = []
             for result in abnormal_results:
                 ref_range = result.reference_range
-                deviation = (result.value - ref_range["max"]) if result.status == "high" else (result.value - ref_range["min"])
+                bound = ref_range.get("max") if result.status == "high" else ref_range.get("min")
                 direction = "+" if result.status == "high" else ""
-                items.append(
+                item = (
                     f"• {result.name}: {result.value} {result.unit} "
-                    f"(Ref: {ref_range['min']}-{ref_range['max']}). "
-                    f"Status: {result.status.upper()}. "
-                    f"Deviation: {direction}{deviation:.1f} {result.unit}"
+                    f"(Ref: {ref_range.get('min')}-{ref_range.get('max')}). "
+                    f"Status: {result.status.upper()}."
                 )
+                if bound is not None:
+                    item += f" Deviation: {direction}{result.value - bound:.1f} {result.unit}"
+                items.append(item)
             
             content = f"Abnormal findings detected ({len(abnormal_results)} total):\n\n"
             content += "\n".join(items)
@@ -115,7 +115,7 @@ class AIService:
             
         elif persona == PersonaType.QUICK_BOLD:
             # Quick action focused
-            high_priority = [r for r in abnormal_results if r.status == "high"]
+            high_priority = context.high_priority_results
             if high_priority:
                 content = f"⚠️ {len(high_priority)} values need immediate attention:\n"
                 content += "\n".join([f"• {r.name}" for r in high_priority[:3]])
@@ -161,13 +161,9 @@ class AIService:
         else:
             return "All your lab results are within normal ranges. This is a positive indicator of your current health status."
     
-    async def _generate_recommendations(
-        self, 
-        persona: PersonaType, 
-        abnormal_results: List[LabResult],
-        user_context: Dict[str, Any] = None
-    ) -> List[str]:
+    async def _generate_recommendations(self, context: ViewContext) -> List[str]:
         """Generate persona-specific recommendations"""
+        persona, abnormal_results = context.persona, context.abnormal_results
         
         if len(abnormal_results) == 0:
             return [
@@ -177,8 +173,17 @@ class AIService:
             ]
         
         recommendations = []
-        # Common recommendations based on abnormal results
-        if any("glucose" in r.name.lower() for r in abnormal_results):
+        # Common recommendations based on the catalog topic of each abnormal test;
+        # names the catalog does not know fall back to matching the topic words
+        catalog = get_lab_catalog()
+        topics = set()
+        for r in abnormal_results:
+            topic = catalog.topic(r.name)
+            if topic is not None:
+                topics.add(topic)
+            else:
+                topics.update(word for word in _RECOMMENDATION_TOPICS if word in r.name.lower())
+        if "glucose" in topics:
             if persona == PersonaType.HEALTH_CONSCIOUS:
                 recommendations.append("Monitor your blood sugar levels daily")
                 recommendations.append("Follow your diabetes management plan")
@@ -187,10 +192,10 @@ class AIService:
                 recommendations.append("Review carb intake this week")
             else:
                 recommendations.append("Consider glucose monitoring")
-        if any("cholesterol" in r.name.lower() for r in abnormal_results):
+        if "cholesterol" in topics:
             recommendations.append("Consider heart-healthy diet modifications")
             recommendations.append("Discuss cholesterol management with your doctor")
-        if any("blood" in r.name.lower() for r in abnormal_results):
+        if "blood" in topics:
             recommendations.append("Follow up with your healthcare provider")
             recommendations.append("Consider additional blood work if recommended")
         # Persona-specific additions
@@ -204,20 +209,4 @@ class AIService:
     
     def _get_simple_explanation(self, test_name: str) -> str:
         """Get simple explanations for common lab tests"""
-        explanations = {
-            "glucose": "blood sugar levels",
-            "cholesterol": "fat levels in your blood",
-            "hemoglobin": "oxygen-carrying protein in your blood",
-            "white blood cell": "infection-fighting cells",
-            "red blood cell": "oxygen-carrying cells",
-            "platelet": "blood clotting cells",
-            "creatinine": "kidney function",
-            "sodium": "salt levels in your blood",
-            "potassium": "an important mineral for heart function"
-        }
-        
-        for key, explanation in explanations.items():
-            if key.lower() in test_name.lower():
-                return explanation
-        
-        return "an important health marker"
\ No newline at end of file
+        return get_lab_catalog().explanation(test_name) or "an important health marker"
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Shared HTTP transport for the AI backend.
+
+One httpx.AsyncClient, and with it one connection pool, serves every
+AIService in the process. The lifespan opens it at start-up and closes it on
+shutdown. Pool limits, keep-alive, timeouts, proxy, TLS verification and
+HTTP/2 all come from settings. HTTP/2 needs the h2 package (httpx[http2]);
+without it the client speaks HTTP/1.1 over the same keep-alive pool.
+"""
+from typing import Any, Optional
+
+# Try to import httpx gracefully
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    print("⚠️  HTTPX not available - AI service will use mock responses only")
+
+# Everything post_json raises when the backend is unreachable, slow or replies badly:
+# transport and HTTP status errors, undecodable JSON, and no httpx at all
+TRANSPORT_ERRORS = ((httpx.HTTPError,) if HTTPX_AVAILABLE else ()) + (ValueError, RuntimeError)
+
+# Try to import h2, fallback to HTTP/1.1 if not available
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default AI transport settings")
+    class MockSettings:
+        ai_service_url = "https://vertex-ai-endpoint"
+        ai_proxy_url = ""
+        ai_verify_tls = True
+        ai_http2 = True
+        ai_max_connections = 100
+        ai_max_keepalive_connections = 20
+        ai_keepalive_expiry = 30.0
+        ai_connect_timeout = 5.0
+        ai_read_timeout = 30.0
+        ai_pool_timeout = 5.0
+    settings = MockSettings()
+
+
+class AITransport:
+    def __init__(self):
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _build_client(self) -> "httpx.AsyncClient":
+        if settings.ai_http2 and not H2_AVAILABLE:
+            print("⚠️  h2 not available - AI transport will use HTTP/1.1")
+        return httpx.AsyncClient(
+            base_url=settings.ai_service_url,
+            http2=settings.ai_http2 and H2_AVAILABLE,
+            proxy=settings.ai_proxy_url or None,
+            verify=settings.ai_verify_tls,
+            limits=httpx.Limits(
+                max_connections=settings.ai_max_connections,
+                max_keepalive_connections=settings.ai_max_keepalive_connections,
+                keepalive_expiry=settings.ai_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                settings.ai_read_timeout, connect=settings.ai_connect_timeout, pool=settings.ai_pool_timeout
+            )
+        )
+
+    @property
+    def client(self) -> Optional["httpx.AsyncClient"]:
+        """The shared client, opened on first use outside the lifespan; None without httpx"""
+        if self._client is None and HTTPX_AVAILABLE:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        """Start-up hook: open the client so the first request does not pay for it"""
+        if self._client is None and HTTPX_AVAILABLE:
+            self._client = self._build_client()
+
+    async def close(self):
+        """Shutdown hook: close every pooled connection"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def post_json(self, path: str, body: bytes) -> Any:
+        """POST an encoded JSON body and return the decoded JSON reply"""
+        if self.client is None:
+            raise RuntimeError("AI transport needs httpx")
+        response = await self.client.post(path, content=body, headers={"content-type": "application/json"})
+        response.raise_for_status()
+        return response.json()
+
+
+# Shared so every AIService uses one pool and the lifespan can close it
+ai_transport = AITransport()
@@ -1,5 +1,17 @@
+import asyncio
+import functools
+import itertools
 import json
-from typing import Optional, Any
+import os
+import struct
+import time
+import uuid
+import zlib
+from collections import Counter, OrderedDict
+from fnmatch import fnmatch
+from typing import Optional, Any, Callable, Dict, Iterable, List, Tuple
+
+from pydantic import TypeAdapter
 
 # Try to import redis, fallback gracefully if not available
 try:
@@ -16,89 +28,603 @@ except ImportError:
     print("⚠️  Settings not available - using defaults")
     class MockSettings:
         redis_url = "redis://localhost:6379"
+        cache_local_ttl = 30
+        cache_snapshot_path = "./cache_snapshot.bin"
+        cache_snapshot_max_entries = 5000
+        cache_warm_key = "cache:warm"
+        cache_invalidation_channel = "cache:invalidate"
+        cache_memory_max_entries = 10000
     settings = MockSettings()
 
+# Snapshot file layout: fixed header, then a zlib-compressed run of records.
+# Each record is (key_len, value_len, expires_at, hits) followed by the key
+# bytes and the compact JSON value bytes.
+SNAPSHOT_MAGIC = b"HLCS"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("!4sBI")
+_SNAPSHOT_RECORD = struct.Struct("!HIdI")
+
+# Seconds to wait before retrying a failed Redis connection
+REDIS_RETRY_INTERVAL = 30
+
+
+def _tag_key(tag: str) -> str:
+    return f"tag:{tag}"
+
+
+def _lock_key(name: str) -> str:
+    return f"lock:{name}"
+
+
+# PEXPIRE the key to ARGV[1] ms unless it already lives longer. PTTL is -1 for a
+# key without a TTL, so a new tag set always gets one. Works on any Redis with
+# scripting, unlike EXPIRE GT/NX (Redis 7).
+_EXTEND_TTL_SCRIPT = """
+if redis.call('PTTL', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[1])
+end
+"""
+
+# DEL the lock only if this worker still holds it (ARGV[1] is its token)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def adaptive_view_key(user_id: str, report_id: Optional[str] = None) -> str:
+    """Cache key of the adaptive-view response for a user's report"""
+    return f"{user_id}:{report_id or 'default'}"
+
+
+def adaptive_view_tag(user_id: str) -> str:
+    """Cache tag of every adaptive-view response of a user"""
+    return f"view:{user_id}"
+
+
+def ui_version_key(user_id: str, report_id: Optional[str], version: str) -> str:
+    """Cache key of one version of a user's adaptive-view ui_components, kept as a JSON Patch base"""
+    return f"ui:{adaptive_view_key(user_id, report_id)}:{version}"
+
+
+def persona_view_tag(persona: str) -> str:
+    """Cache tag of every adaptive-view response rendered for a persona"""
+    return f"persona-view:{persona}"
+
+
 class CacheService:
+    """
+    Redis-backed cache with a short-lived local tier in each worker. Every
+    write and invalidation in Redis mode is published on
+    CACHE_INVALIDATION_CHANNEL; the listener started by the lifespan drops the
+    same keys from the other workers' local tiers. The local tier is capped at
+    CACHE_MEMORY_MAX_ENTRIES, sweeping expired entries and then evicting the
+    least recently used.
+    """
+
     def __init__(self):
         self.redis_client = None
-        self.memory_cache = {}  # Fallback in-memory cache
-    
+        self.memory_cache = {}  # Local tier: key -> (value, expires_at), least recently used first
+        self.hit_counts = Counter()  # Per-key hits, used to pick snapshot entries
+        self.tag_index: Dict[str, set] = {}  # Local tier: tag -> keys stored under it
+        self._redis_retry_at = 0.0
+        self._origin = uuid.uuid4().hex  # Identifies this worker's own invalidation messages
+        self._listen = False
+        self._listener: Optional[asyncio.Task] = None
+
     async def _get_client(self):
-        if not self.redis_client:
+        if not self.redis_client and time.time() >= self._redis_retry_at:
             if REDIS_AVAILABLE:
                 try:
                     self.redis_client = redis.from_url(settings.redis_url)
                     # Test the connection
                     await self.redis_client.ping()
                     print("✅ Redis connection established")
+                    self._ensure_listener()
                 except Exception as e:
                     print(f"⚠️  Redis connection failed: {e}")
                     print("📝 Using in-memory cache fallback")
                     self.redis_client = None
+                    self._redis_retry_at = time.time() + REDIS_RETRY_INTERVAL
             else:
                 print("📝 Using in-memory cache (Redis not available)")
                 self.redis_client = None
-        return self.redis_client
-    
+                self._redis_retry_at = float("inf")
+        return self.redis_client if self.redis_client is not None else self.memory_cache
+
+    def _local_get(self, key: str) -> Optional[Any]:
+        entry = self.memory_cache.pop(key, None)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            return None
+        # Re-inserting keeps the dict in least-recently-used order
+        self.memory_cache[key] = entry
+        return value
+
+    def _local_set(self, key: str, value: Any, ttl: float):
+        self.memory_cache.pop(key, None)
+        self.memory_cache[key] = (value, time.time() + ttl)
+        if len(self.memory_cache) > settings.cache_memory_max_entries:
+            self._sweep()
+
+    def _sweep(self):
+        """Drop expired local entries, then the least recently used down to 90% of the cap"""
+        now = time.time()
+        for key in [k for k, (_, expires_at) in self.memory_cache.items() if expires_at <= now]:
+            del self.memory_cache[key]
+        excess = len(self.memory_cache) - int(settings.cache_memory_max_entries * 0.9)
+        if excess > 0:
+            for key in list(itertools.islice(self.memory_cache, excess)):
+                del self.memory_cache[key]
+        for tag in list(self.tag_index):
+            keys = {key for key in self.tag_index[tag] if key in self.memory_cache}
+            if keys:
+                self.tag_index[tag] = keys
+            else:
+                del self.tag_index[tag]
+
+    def _local_drop(self, keys: Iterable[str]):
+        for key in keys:
+            self.memory_cache.pop(key, None)
+
+    def _ensure_listener(self):
+        if self._listen and (self._listener is None or self._listener.done()):
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self):
+        """Drop keys other workers wrote or invalidated from this worker's local tier"""
+        resubscribing = False
+        while self._listen:
+            pubsub = None
+            try:
+                client = self.redis_client
+                if client is None:
+                    return
+                pubsub = client.pubsub()
+                await pubsub.subscribe(settings.cache_invalidation_channel)
+                if resubscribing:
+                    # Messages published while unsubscribed are lost, so start from an empty local tier
+                    self.memory_cache.clear()
+                    self.tag_index.clear()
+                resubscribing = True
+                while self._listen:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is None:
+                        continue
+                    event = json.loads(message["data"])
+                    if event.get("origin") == self._origin:
+                        continue
+                    if "pattern" in event:
+                        self._local_drop([k for k in self.memory_cache if fnmatch(k, event["pattern"])])
+                    self._local_drop(event.get("keys", ()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Cache invalidation listener error: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def _publish(self, target, **event):
+        """Queue an invalidation message for the other workers on a Redis client or pipeline"""
+        return target.publish(settings.cache_invalidation_channel, json.dumps({"origin": self._origin, **event}))
+
+    async def start_invalidation_listener(self):
+        """Start-up hook: follow other workers' writes and invalidations while Redis is in use"""
+        self._listen = True
+        if not isinstance(await self._get_client(), dict):
+            self._ensure_listener()
+
+    async def stop_invalidation_listener(self):
+        """Shutdown hook: stop following invalidations"""
+        self._listen = False
+        if self._listener is not None and not self._listener.done():
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+        self._listener = None
+
+    def _record_hit(self, key: str):
+        self.hit_counts[key] += 1
+        # Keep the hit counter bounded to a multiple of the snapshot size
+        limit = settings.cache_snapshot_max_entries * 4
+        if len(self.hit_counts) > limit:
+            self.hit_counts = Counter(dict(self.hit_counts.most_common(limit // 2)))
+
     async def get(self, key: str) -> Optional[dict]:
         """Get cached value by key"""
         try:
+            value = self._local_get(key)
+            if value is not None:
+                self._record_hit(key)
+                return value
+
             client = await self._get_client()
             if isinstance(client, dict):
                 # In-memory fallback
-                return client.get(key)
-            
+                return None
+
             value = await client.get(key)
             if value:
-                return json.loads(value)
+                value = json.loads(value)
+                self._local_set(key, value, settings.cache_local_ttl)
+                self._record_hit(key)
+                return value
             return None
         except Exception as e:
             print(f"Cache get error: {e}")
             return None
-    
-    async def set(self, key: str, value: dict, ttl: int = 3600) -> bool:
-        """Set cache value with TTL in seconds"""
+
+    async def set(self, key: str, value: dict, ttl: int = 3600, tags: Optional[List[str]] = None) -> bool:
+        """Set cache value with TTL in seconds, optionally filed under tags for invalidate_tags"""
         try:
+            for tag in tags or ():
+                self.tag_index.setdefault(tag, set()).add(key)
+
             client = await self._get_client()
             if isinstance(client, dict):
                 # In-memory fallback
-                client[key] = value
+                self._local_set(key, value, ttl)
                 return True
-            
-            await client.setex(key, ttl, json.dumps(value))
+
+            self._local_set(key, value, min(ttl, settings.cache_local_ttl))
+            pipe = client.pipeline()
+            pipe.setex(key, ttl, json.dumps(value))
+            for tag in tags or ():
+                pipe.sadd(_tag_key(tag), key)
+                # Only ever extend the tag set's TTL: a shorter-lived member must
+                # not expire the set while longer-lived keys are still listed in it
+                pipe.eval(_EXTEND_TTL_SCRIPT, 1, _tag_key(tag), int(ttl * 1000))
+            # Other workers drop their local copy and read the new value from Redis
+            self._publish(pipe, keys=[key])
+            await pipe.execute()
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
             return False
-    
+
     async def delete(self, key: str) -> bool:
         """Delete cache entry"""
         try:
+            self.memory_cache.pop(key, None)
             client = await self._get_client()
             if isinstance(client, dict):
-                client.pop(key, None)
                 return True
-            
-            await client.delete(key)
+
+            pipe = client.pipeline()
+            pipe.delete(key)
+            self._publish(pipe, keys=[key])
+            await pipe.execute()
             return True
         except Exception as e:
             print(f"Cache delete error: {e}")
             return False
-    
+
+    async def delete_many(self, keys: List[str]) -> bool:
+        """Delete several cache entries in one round-trip"""
+        try:
+            self._local_drop(keys)
+            client = await self._get_client()
+            if isinstance(client, dict) or not keys:
+                return True
+
+            pipe = client.pipeline()
+            pipe.delete(*keys)
+            self._publish(pipe, keys=list(keys))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache delete error: {e}")
+            return False
+
+    async def invalidate_tags(self, tags: List[str]) -> bool:
+        """Delete every entry stored under any of the tags"""
+        try:
+            local_keys = set()
+            for tag in tags:
+                local_keys.update(self.tag_index.pop(tag, ()))
+            self._local_drop(local_keys)
+
+            client = await self._get_client()
+            if isinstance(client, dict) or not tags:
+                return True
+
+            tag_keys = [_tag_key(tag) for tag in tags]
+            members = [m.decode("utf-8") if isinstance(m, bytes) else m for m in await client.sunion(tag_keys)]
+            pipe = client.pipeline()
+            pipe.delete(*members, *tag_keys)
+            # Other workers may hold keys tagged only in their own local index
+            self._publish(pipe, keys=sorted(local_keys.union(members)), tags=list(tags))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache invalidate tags error: {e}")
+            return False
+
     async def clear_pattern(self, pattern: str) -> bool:
-        """Clear all keys matching pattern"""
+        """Clear all keys matching a glob-style pattern"""
         try:
+            keys_to_delete = [k for k in self.memory_cache.keys() if fnmatch(k, pattern)]
+            for k in keys_to_delete:
+                del self.memory_cache[k]
+
             client = await self._get_client()
             if isinstance(client, dict):
-                keys_to_delete = [k for k in client.keys() if pattern in k]
-                for k in keys_to_delete:
-                    del client[k]
                 return True
-            
+
             keys = await client.keys(pattern)
+            pipe = client.pipeline()
             if keys:
-                await client.delete(*keys)
+                pipe.delete(*keys)
+            self._publish(pipe, pattern=pattern)
+            await pipe.execute()
             return True
         except Exception as e:
             print(f"Cache clear pattern error: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    async def acquire_lock(self, name: str, ttl: int) -> bool:
+        """
+        Take a lock shared by every worker for ttl seconds; False while another
+        worker holds it. Without Redis each worker only coordinates with itself,
+        so the lock is always granted.
+        """
+        try:
+            client = await self._get_client()
+            if isinstance(client, dict):
+                return True
+            return bool(await client.set(_lock_key(name), self._origin, ex=ttl, nx=True))
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+            return False
+
+    async def release_lock(self, name: str) -> bool:
+        """Release a lock taken by this worker before its TTL runs out"""
+        try:
+            client = await self._get_client()
+            if isinstance(client, dict):
+                return True
+            await client.eval(_RELEASE_LOCK_SCRIPT, 1, _lock_key(name), self._origin)
+            return True
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+            return False
+
+    async def _collect_hot_entries(self, limit: int) -> List[Tuple[str, Any, float, int]]:
+        """Return (key, value, expires_at, hits) for the hottest live entries"""
+        now = time.time()
+        hot = self.hit_counts.most_common(limit)
+        client = await self._get_client()
+        entries = []
+        if isinstance(client, dict):
+            for key, hits in hot:
+                entry = self.memory_cache.get(key)
+                if entry is not None and entry[1] > now:
+                    entries.append((key, entry[0], entry[1], hits))
+            return entries
+
+        # Local entries are capped at cache_local_ttl, so value and TTL come from Redis
+        if not hot:
+            return entries
+        pipe = client.pipeline()
+        for key, _ in hot:
+            pipe.get(key)
+            pipe.pttl(key)
+        replies = await pipe.execute()
+        for i, (key, hits) in enumerate(hot):
+            raw, pttl = replies[2 * i], replies[2 * i + 1]
+            if raw and pttl and pttl > 0:
+                entries.append((key, json.loads(raw), now + pttl / 1000.0, hits))
+        return entries
+
+    async def snapshot(self, path: Optional[str] = None) -> int:
+        """Write the hottest cache entries and their TTLs to a local snapshot file"""
+        path = path or settings.cache_snapshot_path
+        try:
+            limit = settings.cache_snapshot_max_entries
+            entries = await self._collect_hot_entries(limit)
+
+            body = bytearray()
+            for key, value, expires_at, hits in entries:
+                key_bytes = key.encode("utf-8")
+                value_bytes = json.dumps(value, separators=(",", ":")).encode("utf-8")
+                body += _SNAPSHOT_RECORD.pack(len(key_bytes), len(value_bytes), expires_at, hits)
+                body += key_bytes
+                body += value_bytes
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(entries)))
+                f.write(zlib.compress(bytes(body)))
+            os.replace(tmp_path, path)
+
+            # Publish the warm list so workers without a snapshot file can warm from Redis
+            client = await self._get_client()
+            if entries and not isinstance(client, dict):
+                await client.zadd(settings.cache_warm_key, {key: hits for key, _, _, hits in entries})
+                await client.zremrangebyrank(settings.cache_warm_key, 0, -limit - 1)
+
+            print(f"💾 Cache snapshot written: {len(entries)} entries")
+            return len(entries)
+        except Exception as e:
+            print(f"Cache snapshot error: {e}")
+            return 0
+
+    def _read_snapshot(self, path: str) -> List[Tuple[str, Any, float, int]]:
+        with open(path, "rb") as f:
+            magic, version, count = _SNAPSHOT_HEADER.unpack(f.read(_SNAPSHOT_HEADER.size))
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported cache snapshot format in {path}")
+            body = zlib.decompress(f.read())
+
+        entries = []
+        offset = 0
+        for _ in range(count):
+            key_len, value_len, expires_at, hits = _SNAPSHOT_RECORD.unpack_from(body, offset)
+            offset += _SNAPSHOT_RECORD.size
+            key = body[offset:offset + key_len].decode("utf-8")
+            offset += key_len
+            value = json.loads(body[offset:offset + value_len])
+            offset += value_len
+            entries.append((key, value, expires_at, hits))
+        return entries
+
+    async def _warm_from_redis(self, client) -> int:
+        keys = await client.zrevrange(settings.cache_warm_key, 0, settings.cache_snapshot_max_entries - 1)
+        if not keys:
+            return 0
+        values = await client.mget(keys)
+        loaded = 0
+        for key, raw in zip(keys, values):
+            if raw:
+                key = key.decode("utf-8") if isinstance(key, bytes) else key
+                self._local_set(key, json.loads(raw), settings.cache_local_ttl)
+                self.hit_counts[key] += 1
+                loaded += 1
+        return loaded
+
+    async def warm(self, path: Optional[str] = None) -> int:
+        """Load a snapshot file (or the Redis warm list) into the cache before serving traffic"""
+        path = path or settings.cache_snapshot_path
+        try:
+            client = await self._get_client()
+            if not os.path.exists(path):
+                if isinstance(client, dict):
+                    return 0
+                loaded = await self._warm_from_redis(client)
+                print(f"🔥 Cache warmed from Redis warm list: {loaded} entries")
+                return loaded
+
+            now = time.time()
+            loaded = 0
+            for key, value, expires_at, hits in self._read_snapshot(path):
+                remaining = expires_at - now
+                if remaining <= 0:
+                    continue
+                if isinstance(client, dict):
+                    self._local_set(key, value, remaining)
+                else:
+                    self._local_set(key, value, min(remaining, settings.cache_local_ttl))
+                    # Re-seed Redis without clobbering anything fresher written meanwhile
+                    await client.set(key, json.dumps(value), px=int(remaining * 1000), nx=True)
+                self.hit_counts[key] += hits
+                loaded += 1
+            print(f"🔥 Cache warmed from snapshot: {loaded} entries")
+            return loaded
+        except Exception as e:
+            print(f"Cache warm error: {e}")
+            return 0
+
+
+# Shared instance so the application lifespan can warm and snapshot it
+cache_service = CacheService()
+
+
+# Method caching decorators. The decorated object exposes its cache as
+# `self.cache` (None disables caching); key builders receive the method's own
+# arguments, so call sites keep their signatures. Values are stored as JSON
+# and rebuilt with a TypeAdapter of the declared return type; a local-tier hit
+# on a payload that was already rebuilt returns the same validated object.
+
+class _DecodedValues:
+    """Validated objects of cached payloads, reused while the cache returns the same payload object"""
+
+    def __init__(self, adapter: TypeAdapter):
+        self.adapter = adapter
+        self.entries: "OrderedDict[str, Tuple[Any, Any]]" = OrderedDict()
+
+    def decode(self, key: str, payload: Any) -> Any:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is payload:
+            self.entries.move_to_end(key)
+            return entry[1]
+        value = self.adapter.validate_python(payload)
+        self.remember(key, payload, value)
+        return value
+
+    def remember(self, key: str, payload: Any, value: Any):
+        self.entries[key] = (payload, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > settings.cache_memory_max_entries:
+            self.entries.popitem(last=False)
+
+
+def read_through(
+    key: Callable[..., str],
+    ttl: int,
+    returns: Any,
+    tags: Optional[Callable[..., Iterable[str]]] = None
+):
+    """
+    Serve an async method from the cache, filling it from the method on a miss.
+    `tags(result, *args, **kwargs)` files the entry under cache tags.
+    """
+    adapter = TypeAdapter(returns)
+    decoded = _DecodedValues(adapter)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                return await func(self, *args, **kwargs)
+
+            cache_key = key(*args, **kwargs)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return decoded.decode(cache_key, cached)
+
+            result = await func(self, *args, **kwargs)
+            entry_tags = list(tags(result, *args, **kwargs)) if tags else None
+            payload = adapter.dump_python(result, mode="json")
+            await cache.set(cache_key, payload, ttl=ttl, tags=entry_tags)
+            decoded.remember(cache_key, payload, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def write_through(key: Callable[[Any], str], ttl: int, returns: Any):
+    """Store an async method's result under key(result) so readers see the write at once"""
+    adapter = TypeAdapter(returns)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            result = await func(self, *args, **kwargs)
+            cache = getattr(self, "cache", None)
+            if cache is not None:
+                await cache.set(key(result), adapter.dump_python(result, mode="json"), ttl=ttl)
+            return result
+        return wrapper
+    return decorator
+
+
+def invalidates(
+    keys: Optional[Callable[..., Iterable[str]]] = None,
+    tags: Optional[Callable[..., Iterable[str]]] = None
+):
+    """Drop keys(...) and everything under tags(...) after an async method succeeds; both get (result, *args, **kwargs)"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            result = await func(self, *args, **kwargs)
+            cache = getattr(self, "cache", None)
+            if cache is not None:
+                if keys:
+                    await cache.delete_many(sorted(set(keys(result, *args, **kwargs))))
+                if tags:
+                    await cache.invalidate_tags(sorted(set(tags(result, *args, **kwargs))))
+            return result
+        return wrapper
+    return decorator
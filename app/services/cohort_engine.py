@@ -0,0 +1,249 @@
+"""
+Columnar cohort data and the vectorized query kernel behind cohort analytics.
+
+Lab results are held as flat NumPy columns (user index, value, status code,
+latest-per-user flag) sorted by analyte and then by value, so every analyte
+is one contiguous, value-ordered slice. Users are columns too (age, gender,
+persona), and conditions are a (user, condition) pair list. A query is a
+handful of boolean masks over one analyte's slice; any masked subset is still
+sorted, so percentiles, extremes and histogram counts are index lookups
+instead of partitions and per-value binning.
+
+The module only depends on NumPy so query workers can import it without the
+rest of the application. `CohortData.save` writes the columns as .npy files
+that workers open memory-mapped, sharing the snapshot through the page cache.
+"""
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+STATUS_NORMAL, STATUS_HIGH, STATUS_LOW = 0, 1, 2
+
+_ARRAYS = (
+    "user_age", "user_gender", "user_persona", "condition_user", "condition_index",
+    "row_user", "row_value", "row_status", "row_latest",
+)
+
+
+def age_band_labels(edges: Sequence[int]) -> List[str]:
+    """Labels for np.digitize bands over ascending edges, e.g. <18, 18-44, 65+"""
+    labels = [f"<{edges[0]}"]
+    labels += [f"{lo}-{hi - 1}" for lo, hi in zip(edges[:-1], edges[1:])]
+    labels.append(f"{edges[-1]}+")
+    return labels
+
+
+class CohortData:
+    """Immutable column snapshot of every user and lab result"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.analytes: Dict[str, Tuple[int, int]] = {name: tuple(span) for name, span in meta["analytes"].items()}
+        self.genders: List[str] = meta["genders"]
+        self.personas: List[str] = meta["personas"]
+        self.conditions: List[str] = meta["conditions"]
+        self.age_bands: List[int] = meta["age_bands"]
+
+    @property
+    def user_count(self) -> int:
+        return len(self.user_age)
+
+    @property
+    def result_count(self) -> int:
+        return len(self.row_value)
+
+    def save(self, path: str) -> str:
+        """Write the snapshot into a new directory, replacing any previous one at path"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(self.meta, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CohortData":
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in _ARRAYS
+        }
+        return cls(arrays, meta)
+
+
+def _condition_users(data: CohortData, terms: Sequence[str]) -> np.ndarray:
+    """Boolean user mask of users with any condition containing one of the terms"""
+    terms = [term.strip().lower() for term in terms]
+    matching = [i for i, condition in enumerate(data.conditions) if any(term in condition for term in terms)]
+    mask = np.zeros(data.user_count, dtype=bool)
+    if matching:
+        mask[data.condition_user[np.isin(data.condition_index, matching)]] = True
+    return mask
+
+
+def _user_mask(data: CohortData, query: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Users passing the query's filters, or None when nothing filters on users"""
+    mask = None
+
+    def narrow(condition: np.ndarray):
+        nonlocal mask
+        mask = condition if mask is None else mask & condition
+
+    if query.get("personas"):
+        codes = [data.personas.index(p) for p in query["personas"] if p in data.personas]
+        narrow(np.isin(data.user_persona, codes))
+    if query.get("age_min") is not None:
+        narrow(data.user_age >= query["age_min"])
+    if query.get("age_max") is not None:
+        narrow(data.user_age <= query["age_max"])
+    if query.get("gender"):
+        gender = query["gender"].strip().lower()
+        narrow(data.user_gender == (data.genders.index(gender) if gender in data.genders else -1))
+    if query.get("conditions"):
+        narrow(_condition_users(data, query["conditions"]))
+    return mask
+
+
+def sorted_percentiles(values: np.ndarray, percentiles: Sequence[float]) -> np.ndarray:
+    """np.percentile (linear interpolation) of already sorted values"""
+    position = np.asarray(percentiles, dtype=np.float64) / 100 * (len(values) - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def sorted_histogram(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """np.histogram counts of already sorted values (last bin closed on the right)"""
+    bounds = np.searchsorted(values, edges, side="left")
+    bounds[-1] = np.searchsorted(values, edges[-1], side="right")
+    return np.diff(bounds)
+
+
+def _summarize(
+    data: CohortData,
+    values: np.ndarray,
+    status: np.ndarray,
+    users: np.ndarray,
+    percentiles: Sequence[float],
+    edges: Optional[np.ndarray]
+) -> Dict[str, Any]:
+    count = len(values)
+    seen = np.zeros(data.user_count, dtype=bool)
+    seen[users] = True
+    summary: Dict[str, Any] = {"results": count, "users": int(np.count_nonzero(seen))}
+    if not count:
+        return summary
+    status_counts = np.bincount(status, minlength=3)
+    summary.update({
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values[0]),
+        "max": float(values[-1]),
+        "abnormal_rate": float((count - status_counts[STATUS_NORMAL]) / count),
+        "high_rate": float(status_counts[STATUS_HIGH] / count),
+        "low_rate": float(status_counts[STATUS_LOW] / count),
+    })
+    if percentiles:
+        points = sorted_percentiles(values, percentiles)
+        summary["percentiles"] = {f"p{p:g}": float(v) for p, v in zip(percentiles, points)}
+    if edges is not None:
+        summary["histogram"] = sorted_histogram(values, edges).tolist()
+    return summary
+
+
+def _groups(
+    data: CohortData,
+    group_by: str,
+    values: np.ndarray,
+    status: np.ndarray,
+    users: np.ndarray
+) -> List[Tuple[str, np.ndarray, np.ndarray, np.ndarray]]:
+    """(label, values, status, users) of every non-empty group, values still sorted"""
+    if group_by == "condition":
+        # Users can have several conditions, so groups overlap and are masked one by one
+        groups = []
+        for index, condition in enumerate(data.conditions):
+            in_group = np.zeros(data.user_count, dtype=bool)
+            in_group[data.condition_user[data.condition_index == index]] = True
+            rows = in_group[users]
+            if rows.any():
+                groups.append((condition, values[rows], status[rows], users[rows]))
+        return groups
+
+    if group_by == "persona":
+        codes, labels = data.user_persona[users], data.personas
+    elif group_by == "gender":
+        codes, labels = data.user_gender[users], data.genders
+    else:
+        bands = np.digitize(data.user_age, data.age_bands).astype(np.int16)
+        codes, labels = bands[users], age_band_labels(data.age_bands)
+    # One stable counting sort splits every group into a contiguous, still value-ordered run
+    counts = np.bincount(codes, minlength=len(labels))
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    order = np.argsort(codes, kind="stable")
+    values, status, users = values[order], status[order], users[order]
+    return [
+        (labels[code], values[bounds[code]:bounds[code + 1]], status[bounds[code]:bounds[code + 1]], users[bounds[code]:bounds[code + 1]])
+        for code in np.flatnonzero(counts).tolist()
+    ]
+
+
+def run_query(data: CohortData, query: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aggregate one analyte over the users matching the query filters.
+    `query["analyte"]` must already be the snapshot's analyte key.
+    """
+    start, stop = data.analytes[query["analyte"]]
+    row_users = data.row_user[start:stop]
+    values = data.row_value[start:stop]
+    status = data.row_status[start:stop]
+
+    rows = np.asarray(data.row_latest[start:stop]) if query.get("latest_only", True) else None
+    user_mask = _user_mask(data, query)
+    if user_mask is not None:
+        rows = user_mask[row_users] if rows is None else rows & user_mask[row_users]
+    if rows is not None:
+        row_users, values, status = row_users[rows], values[rows], status[rows]
+
+    edges = None
+    bins = query.get("histogram_bins") or 0
+    if bins and len(values):
+        edges = np.linspace(values[0], values[-1], bins + 1) if values[-1] > values[0] else np.histogram_bin_edges(values, bins=bins)
+    percentiles = query.get("percentiles") or []
+
+    result: Dict[str, Any] = {
+        "analyte": query["analyte"],
+        "overall": _summarize(data, values, status, row_users, percentiles, edges),
+    }
+    if edges is not None:
+        result["histogram_edges"] = edges.tolist()
+    group_by = query.get("group_by")
+    if group_by:
+        result["group_by"] = group_by
+        result["groups"] = [
+            {"group": label, **_summarize(data, group_values, group_status, group_users, percentiles, edges)}
+            for label, group_values, group_status, group_users in _groups(data, group_by, values, status, row_users)
+        ]
+    return result
+
+
+# Worker processes keep the last snapshot they opened
+_worker_data: Optional[Tuple[str, CohortData]] = None
+
+
+def run_query_at(path: str, query: Dict[str, Any]) -> Dict[str, Any]:
+    """Process-pool entry point: run a query against the snapshot saved at path"""
+    global _worker_data
+    if _worker_data is None or _worker_data[0] != path:
+        _worker_data = (path, CohortData.load(path))
+    return run_query(_worker_data[1], query)
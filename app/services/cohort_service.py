@@ -0,0 +1,291 @@
+"""
+Population cohort analytics over every stored lab result.
+
+The service scans the data backend into a columnar CohortData snapshot (see
+cohort_engine), saves it under COHORT_SNAPSHOT_DIR and answers queries from
+it. A snapshot older than COHORT_REFRESH_SECONDS is rebuilt by a background
+task while queries keep using it, so results lag writes by that long plus one
+rebuild. Queries over large analytes run in a process
+pool whose workers memory-map the saved snapshot; small ones run on a thread.
+Each query pins the snapshot generation it started on, and a replaced
+generation's directory is deleted only once its last query has finished.
+"""
+import asyncio
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.cohort_engine import CohortData, run_query, run_query_at
+from app.services.data_service import get_data_backend
+from app.services.lab_catalog import get_lab_catalog, normalize_name
+from app.services.lab_classifier import CODE_BY_STATUS, STATUS_NORMAL, classify
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default cohort analytics settings")
+    class MockSettings:
+        cohort_snapshot_dir = "./cohort_snapshot"
+        cohort_refresh_seconds = 900
+        cohort_workers = 2
+        cohort_pool_min_rows = 1000000
+        cohort_age_bands = "18,30,45,65,80"
+        cohort_scan_batch_size = 50000
+    settings = MockSettings()
+
+UNKNOWN = "unknown"
+
+
+def analyte_key(name: str) -> str:
+    """Snapshot key of a test name: its catalog name, or the normalized spelling"""
+    return get_lab_catalog().canonical_name(name) or normalize_name(name)
+
+
+class _Builder:
+    """Accumulates scanned batches into column arrays"""
+
+    def __init__(self):
+        self.user_index: Dict[str, int] = {}
+        self.ages: List[int] = []
+        self.genders: List[str] = []
+        self.conditions: List[Optional[str]] = []
+        self.personas: List[str] = []
+        self.analyte_index: Dict[str, int] = {}
+        self.chunks: List[tuple] = []
+
+    def add_user(
+        self,
+        user_id: str,
+        age: Optional[int],
+        gender: Optional[str],
+        conditions: Optional[str],
+        persona: Optional[str] = None
+    ) -> int:
+        index = self.user_index.get(user_id)
+        if index is None:
+            index = self.user_index[user_id] = len(self.ages)
+            self.ages.append(-1)
+            self.genders.append(UNKNOWN)
+            self.conditions.append(None)
+            self.personas.append(UNKNOWN)
+        if age is not None:
+            self.ages[index] = age
+            self.genders[index] = (gender or UNKNOWN).strip().lower()
+            self.conditions[index] = conditions
+            self.personas[index] = persona or UNKNOWN
+        return index
+
+    def add_results(self, rows: List[tuple]):
+        user_ids, _, names, values, ref_min, ref_max, statuses = zip(*rows)
+        users = np.fromiter(
+            (self.user_index.get(u) if u in self.user_index else self.add_user(u, None, None, None) for u in user_ids),
+            dtype=np.int32, count=len(rows)
+        )
+        # One catalog lookup per distinct name in the batch
+        distinct, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        codes = np.array([
+            self.analyte_index.setdefault(analyte_key(str(name)), len(self.analyte_index)) for name in distinct
+        ], dtype=np.int32)
+
+        values = np.asarray(values, dtype=np.float64)
+        ref_min = np.asarray(ref_min, dtype=np.float64)
+        ref_max = np.asarray(ref_max, dtype=np.float64)
+        status, _ = classify(values, ref_min, ref_max)
+        # Rows without any reference bound keep their stored status
+        unbounded = np.isnan(ref_min) & np.isnan(ref_max)
+        if unbounded.any():
+            stored = np.array([CODE_BY_STATUS.get(s, STATUS_NORMAL) for s in statuses], dtype=np.int8)
+            status = np.where(unbounded, stored, status)
+        self.chunks.append((users, codes[inverse], values, status.astype(np.int8)))
+
+    def build(self, age_bands: List[int], built_at: float) -> CohortData:
+        if self.chunks:
+            users, analytes, values, status = (np.concatenate(part) for part in zip(*self.chunks))
+        else:
+            users, analytes = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+            values, status = np.zeros(0), np.zeros(0, dtype=np.int8)
+        # A stable sort keeps each analyte's rows grouped by user and oldest first
+        order = np.argsort(analytes, kind="stable")
+        users, analytes, values, status = users[order], analytes[order], values[order], status[order]
+        latest = np.ones(len(users), dtype=bool)
+        if len(users):
+            latest[:-1] = (users[1:] != users[:-1]) | (analytes[1:] != analytes[:-1])
+        # Queries want each analyte's rows in value order
+        order = np.lexsort((values, analytes))
+        users, analytes, values, status, latest = users[order], analytes[order], values[order], status[order], latest[order]
+
+        bounds = np.searchsorted(analytes, np.arange(len(self.analyte_index) + 1))
+        names = sorted(self.analyte_index, key=self.analyte_index.get)
+        spans = {name: (int(bounds[i]), int(bounds[i + 1])) for i, name in enumerate(names)}
+
+        gender_names = sorted(set(self.genders))
+        gender_codes = {g: i for i, g in enumerate(gender_names)}
+        condition_sets = [
+            {c.strip().lower() for c in (conditions or "").split(",") if c.strip()} for conditions in self.conditions
+        ]
+        condition_names = sorted(set().union(*condition_sets)) if condition_sets else []
+        condition_codes = {c: i for i, c in enumerate(condition_names)}
+        pairs = [(u, condition_codes[c]) for u, cs in enumerate(condition_sets) for c in cs]
+
+        persona_names = sorted(set(self.personas))
+        persona_codes = {p: i for i, p in enumerate(persona_names)}
+        arrays = {
+            "user_age": np.asarray(self.ages, dtype=np.int16),
+            "user_gender": np.asarray([gender_codes[g] for g in self.genders], dtype=np.int16),
+            "user_persona": np.asarray([persona_codes[p] for p in self.personas], dtype=np.int16),
+            "condition_user": np.asarray([u for u, _ in pairs], dtype=np.int32),
+            "condition_index": np.asarray([c for _, c in pairs], dtype=np.int16),
+            "row_user": users,
+            "row_value": values,
+            "row_status": status,
+            "row_latest": latest,
+        }
+        meta = {
+            "built_at": built_at,
+            "analytes": spans,
+            "genders": gender_names,
+            "personas": persona_names,
+            "conditions": condition_names,
+            "age_bands": age_bands,
+        }
+        return CohortData(arrays, meta)
+
+
+class _Generation:
+    """One saved snapshot and the number of queries still reading it"""
+    __slots__ = ("data", "path", "readers", "retired")
+
+    def __init__(self, data: CohortData, path: str):
+        self.data = data
+        self.path = path
+        self.readers = 0
+        self.retired = False
+
+    def acquire(self) -> "_Generation":
+        self.readers += 1
+        return self
+
+    def release(self):
+        self.readers -= 1
+        self._remove_if_unused()
+
+    def retire(self):
+        """Mark the generation replaced; its files go when the last reader releases it"""
+        self.retired = True
+        self._remove_if_unused()
+
+    def _remove_if_unused(self):
+        if self.retired and self.readers == 0:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+class CohortService:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.current: Optional[_Generation] = None
+        self._refresh_lock = asyncio.Lock()
+        self._rebuild: Optional[asyncio.Task] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def refresh(self) -> CohortData:
+        """Rebuild the snapshot from the data backend and swap it in"""
+        async with self._refresh_lock:
+            backend = self.backend or get_data_backend()
+            builder = _Builder()
+            async for rows in backend.scan_users(settings.cohort_scan_batch_size):
+                # Users are grouped by their stored persona, the one the adaptive view serves
+                for user_id, age, gender, conditions, persona in rows:
+                    builder.add_user(user_id, age, gender, conditions, persona)
+            async for rows in backend.scan_lab_results(settings.cohort_scan_batch_size):
+                builder.add_results(rows)
+
+            age_bands = [int(edge) for edge in settings.cohort_age_bands.split(",")]
+            data = await asyncio.to_thread(builder.build, age_bands, time.time())
+
+            # Each build gets its own directory so workers never see a half-written snapshot
+            path = os.path.join(settings.cohort_snapshot_dir, f"{os.getpid()}-{uuid.uuid4().hex}")
+            await asyncio.to_thread(data.save, path)
+            previous, self.current = self.current, _Generation(data, path)
+            if previous is not None:
+                previous.retire()
+            print(f"📊 Cohort snapshot built: {data.user_count} users, {data.result_count} results")
+            return data
+
+    async def _rebuild_in_background(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            print(f"❌ Cohort snapshot rebuild failed: {e}")
+
+    def _start_rebuild(self) -> asyncio.Task:
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._rebuild_in_background())
+        return self._rebuild
+
+    async def _snapshot(self) -> _Generation:
+        generation = self.current
+        if generation is None:
+            # Only the first build is waited for; concurrent first queries share it
+            await asyncio.shield(self._start_rebuild())
+            if self.current is None:
+                raise RuntimeError("Cohort snapshot could not be built")
+            return self.current
+        if time.time() - generation.data.meta["built_at"] > settings.cohort_refresh_seconds:
+            self._start_rebuild()
+        return generation
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned workers only import the NumPy-only engine module
+            self._pool = ProcessPoolExecutor(max_workers=settings.cohort_workers, mp_context=get_context("spawn"))
+        return self._pool
+
+    async def query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Aggregate one analyte over a filtered cohort, optionally grouped"""
+        generation = (await self._snapshot()).acquire()
+        try:
+            data = generation.data
+            key = analyte_key(query["analyte"])
+            if key not in data.analytes:
+                raise ValueError(f"No results for analyte {query['analyte']}")
+            query = {**query, "analyte": key}
+
+            start, stop = data.analytes[key]
+            if settings.cohort_workers > 0 and stop - start >= settings.cohort_pool_min_rows:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._get_pool(), run_query_at, generation.path, query)
+            else:
+                result = await asyncio.to_thread(run_query, data, query)
+        finally:
+            generation.release()
+        result["snapshot_built_at"] = data.meta["built_at"]
+        return result
+
+    async def list_analytes(self) -> List[Dict[str, Any]]:
+        """Analytes in the snapshot with their result counts, most common first"""
+        data = (await self._snapshot()).data
+        counts = [{"analyte": name, "results": stop - start} for name, (start, stop) in data.analytes.items()]
+        return sorted(counts, key=lambda item: item["results"], reverse=True)
+
+    def close(self):
+        """Stop the worker pool and any rebuild, and remove this process's snapshot"""
+        if self._rebuild is not None and not self._rebuild.done():
+            self._rebuild.cancel()
+        self._rebuild = None
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        if self.current is not None:
+            self.current.retire()
+            self.current = None
+
+
+# Shared so the lifespan can shut the worker pool down
+cohort_service = CohortService()
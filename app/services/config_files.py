@@ -0,0 +1,50 @@
+"""
+Loading of the versioned content files under app/data.
+
+Persona rules and UI templates are kept as JSON (or YAML, when PyYAML is
+installed) documents with a top-level "version" giving the file format. A
+file signature (modification time and size) lets the reloader tell when a
+file has changed without reading it.
+"""
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+# Try to import yaml, fallback gracefully if not available
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def data_path(configured: str, bundled: str) -> str:
+    """Configured file path, or the bundled file in app/data when none is set"""
+    return configured or os.path.join(DATA_DIR, bundled)
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_document(path: str, supported_versions: Tuple[int, ...] = (1,)) -> Dict[str, Any]:
+    """Parse a JSON or YAML content file and check its format version"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            if not YAML_AVAILABLE:
+                raise ValueError(f"{path} is YAML but PyYAML is not installed")
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    if not isinstance(document, dict):
+        raise ValueError(f"{path} must contain a mapping")
+    if document.get("version") not in supported_versions:
+        raise ValueError(f"{path} has unsupported format version {document.get('version')!r}")
+    return document
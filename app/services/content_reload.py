@@ -0,0 +1,72 @@
+"""
+Hot reload of the persona rules and UI templates.
+
+A background task checks both content files every CONTENT_RELOAD_INTERVAL
+seconds and, when one changed, recompiles it and swaps it in. Changed rules
+restart the stored persona recompute, which refreshes the users whose persona
+moved and drops their cached views. A changed template drops the cached views
+of the personas it renders, and nothing else.
+"""
+import asyncio
+from typing import Dict, Optional
+
+from app.services.cache_service import cache_service, persona_view_tag
+from app.services.data_service import schedule_persona_recompute
+from app.services.persona_rules import reload_persona_rules
+from app.services.template_service import reload_ui_templates
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default content reload settings")
+    class MockSettings:
+        content_reload_interval = 5.0
+    settings = MockSettings()
+
+
+async def reload_content() -> Dict[str, object]:
+    """Pick up changed content files now; reports what was swapped in"""
+    rules = await asyncio.to_thread(reload_persona_rules)
+    if rules is not None:
+        schedule_persona_recompute()
+    changed = await asyncio.to_thread(reload_ui_templates)
+    if changed:
+        await cache_service.invalidate_tags([persona_view_tag(persona.value) for persona in changed])
+    return {
+        "persona_rules_version": rules.version if rules is not None else None,
+        "templates_changed": [persona.value for persona in changed],
+    }
+
+
+async def _watch_content(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await reload_content()
+        except Exception as e:
+            print(f"❌ Content reload failed: {e}")
+
+
+_reload_job: Optional[asyncio.Task] = None
+
+
+def start_content_reload() -> Optional[asyncio.Task]:
+    """Start-up hook: watch the content files unless disabled in settings"""
+    global _reload_job
+    if settings.content_reload_interval <= 0:
+        return None
+    _reload_job = asyncio.create_task(_watch_content(settings.content_reload_interval))
+    return _reload_job
+
+
+async def cancel_content_reload():
+    """Stop watching the content files, e.g. on shutdown"""
+    global _reload_job
+    if _reload_job is not None and not _reload_job.done():
+        _reload_job.cancel()
+        try:
+            await _reload_job
+        except asyncio.CancelledError:
+            pass
+    _reload_job = None
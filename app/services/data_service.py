@@ -1,13 +1,58 @@
-from app.models.schemas import UserProfile, LabResult, LabResultStatus
-from typing import List, Optional, Dict, Any
+from app.models.schemas import (
+    PersonaType, UserProfile, LabResult, LabResultChange, LabReport, LabReportDiff, StatusTransition, UserBundle
+)
+from app.services.cache_service import adaptive_view_tag, cache_service, invalidates, read_through, write_through
+from app.services.lab_catalog import get_lab_catalog, normalize_name, normalize_unit
+from app.services.persona_rules import get_persona_rules, input_fingerprint, version_revision
+from app.services.lab_classifier import (
+    STATUS_BY_CODE, STATUS_NORMAL, effective_status_codes, fill_missing_statuses, with_effective_statuses
+)
+from app.services.unit_normalizer import normalize_rows
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator
+import asyncio
+import base64
 import json
-from datetime import datetime
+import uuid
+from datetime import datetime, timezone
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using in-memory data backend")
+    class MockSettings:
+        data_backend = "memory"
+        database_url = "sqlite:///./healthlens.db"
+        database_pool_size = 5
+        database_seed_mock_data = True
+        shard_database_urls = "sqlite:///./healthlens-shard0.db,sqlite:///./healthlens-shard1.db"
+        shard_map_path = "./shard_map.json"
+        shard_virtual_buckets = 1024
+        shard_map_reload_interval = 2.0
+        data_cache_enabled = True
+        ingest_normalize_units = True
+        persona_recompute_on_startup = True
+        persona_recompute_batch_size = 1000
+        persona_recompute_lock_ttl = 3600
+    settings = MockSettings()
+
+class MemoryDataBackend:
+    """In-process data backend serving the demo mock data"""
 
-class DataService:
     def __init__(self):
-        # In a real implementation, this would connect to a database
         self.mock_data = self._load_mock_data()
+        self.reports = {}  # user_id -> {report_id: {"report": metadata, "results": [...]}}
+        self.latest_report = {}  # user_id -> report_id of the most recently collected report
+        for user_id, results in self.mock_data["lab_results"].items():
+            report = self.mock_data["lab_reports"][user_id]
+            self._put_report(user_id, results, report["report_id"], report["collected_at"], report["source"])
     
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
     def _load_mock_data(self):
         """Load mock data similar to the React app's mockLabData"""
         return {
@@ -207,6 +252,10 @@ class DataService:
                     }
                 ]
             },
+            "lab_reports": {
+                "123": {"report_id": "RPT-123-001", "collected_at": "2024-10-15T09:00:00Z", "source": "mock"},
+                "456": {"report_id": "RPT-456-001", "collected_at": "2024-10-20T09:00:00Z", "source": "mock"}
+            },
             "user_history": {
                 "123": {
                     "previous_conditions": ["Pre-diabetes", "High cholesterol"],
@@ -218,52 +267,762 @@ class DataService:
             }
         }
     
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.mock_data["users"].get(user_id)
+
+    async def create_user(self, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        profile_data["id"] = str(len(self.mock_data["users"]) + 1)
+        self.mock_data["users"][profile_data["id"]] = profile_data
+        return profile_data
+
+    async def get_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        users = self.mock_data["users"]
+        return {user_id: users[user_id] for user_id in user_ids if user_id in users}
+
+    async def update_user(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if user_id not in self.mock_data["users"]:
+            return None
+        self.mock_data["users"][user_id].update(profile_data)
+        return self.mock_data["users"][user_id]
+
+    def _put_report(
+        self,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        report_id: str,
+        collected_at: str,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        report = {
+            "report_id": report_id,
+            "user_id": user_id,
+            "collected_at": collected_at,
+            "source": source,
+            "result_count": len(results)
+        }
+        user_reports = self.reports.setdefault(user_id, {})
+        user_reports[report_id] = {"report": report, "results": results}
+
+        latest_id = self.latest_report.get(user_id)
+        if latest_id is None or collected_at >= user_reports[latest_id]["report"]["collected_at"]:
+            self.latest_report[user_id] = report_id
+        return report
+
+    async def get_lab_results(self, user_id: str, report_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        report_id = report_id or self.latest_report.get(user_id)
+        entry = self.reports.get(user_id, {}).get(report_id)
+        return entry["results"] if entry else None
+
+    async def store_lab_results(
+        self,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        report_id: str,
+        collected_at: str,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return self._put_report(user_id, results, report_id, collected_at, source)
+
+    async def store_lab_results_batch(self, records: List[Tuple[str, str, str, Optional[str], Dict[str, Any]]]):
+        for user_id, report_id, collected_at, source, result in records:
+            entry = self.reports.get(user_id, {}).get(report_id)
+            if entry is None:
+                self._put_report(user_id, [result], report_id, collected_at, source)
+            else:
+                entry["results"].append(result)
+                entry["report"]["result_count"] += 1
+
+    async def get_report(self, user_id: str, report_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        report_id = report_id or self.latest_report.get(user_id)
+        entry = self.reports.get(user_id, {}).get(report_id)
+        return entry["report"] if entry else None
+
+    async def get_report_pair(self, user_id: str, from_id: str, to_id: str) -> Dict[str, Dict[str, Any]]:
+        user_reports = self.reports.get(user_id, {})
+        return {
+            report_id: {"report": user_reports[report_id]["report"], "lab_results": user_reports[report_id]["results"]}
+            for report_id in (from_id, to_id)
+            if report_id in user_reports
+        }
+
+    async def list_reports(self, user_id: str) -> List[Dict[str, Any]]:
+        reports = [entry["report"] for entry in self.reports.get(user_id, {}).values()]
+        return sorted(reports, key=lambda r: r["collected_at"], reverse=True)
+
+    async def get_lab_results_page(
+        self,
+        user_id: str,
+        report_id: Optional[str] = None,
+        all_reports: bool = False,
+        after: Optional[tuple] = None,
+        limit: int = 100
+    ) -> List[Tuple[tuple, Dict[str, Any]]]:
+        if all_reports:
+            entries = list(self.reports.get(user_id, {}).values())
+        else:
+            entry = self.reports.get(user_id, {}).get(report_id or self.latest_report.get(user_id))
+            entries = [entry] if entry else []
+
+        # Order by (result date, report/position tiebreak) to mirror the SQL keyset
+        keyed = []
+        for entry in entries:
+            report = entry["report"]
+            for i, result in enumerate(entry["results"]):
+                result_date = result.get("result_date") or report["collected_at"]
+                key = (result_date, f"{report['report_id']}/{i:09d}")
+                if after is None or key > tuple(after):
+                    keyed.append((key, result, report["report_id"]))
+        keyed.sort(key=lambda item: item[0])
+        return [
+            (key, {**result, "report_id": rid, "result_date": key[0]})
+            for key, result, rid in keyed[:limit]
+        ]
+
+    async def get_analyte_series(self, user_id: str, analyte: str) -> Tuple[List[str], List[float]]:
+        analyte = analyte.lower()
+        dates, values = [], []
+        for entry in self.reports.get(user_id, {}).values():
+            collected_at = entry["report"]["collected_at"]
+            for result in entry["results"]:
+                if result["name"].lower() == analyte:
+                    dates.append(result.get("result_date") or collected_at)
+                    values.append(result["value"])
+        return dates, values
+
+    async def get_user_bundle(self, user_id: str, report_id: Optional[str] = None) -> Dict[str, Any]:
+        report_id = report_id or self.latest_report.get(user_id)
+        entry = self.reports.get(user_id, {}).get(report_id)
+        return {
+            "profile": self.mock_data["users"].get(user_id),
+            "report": entry["report"] if entry else None,
+            "lab_results": entry["results"] if entry else None,
+            "history": self.mock_data["user_history"].get(user_id, {}),
+        }
+
+    async def get_user_history(self, user_id: str) -> Dict[str, Any]:
+        return self.mock_data["user_history"].get(user_id, {})
+
+    async def scan_users(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        rows = [
+            (u["id"], u["age"], u["gender"], u.get("conditions"), u.get("persona"))
+            for u in self.mock_data["users"].values()
+        ]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def scan_persona_inputs(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        rows = [
+            (u["id"], u["age"], u.get("conditions"), u.get("questionnaire_responses"),
+             u.get("persona_rules_version"), u.get("persona_fingerprint"))
+            for u in self.mock_data["users"].values()
+        ]
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    async def update_personas(self, rows: List[Tuple[str, str, str, str]]):
+        users = self.mock_data["users"]
+        for user_id, persona, version, fingerprint in rows:
+            if user_id in users:
+                users[user_id].update(persona=persona, persona_rules_version=version, persona_fingerprint=fingerprint)
+
+    async def scan_lab_results(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        batch = []
+        for user_id in sorted(self.reports):
+            rows = []
+            for entry in self.reports[user_id].values():
+                collected_at = entry["report"]["collected_at"]
+                for result in entry["results"]:
+                    ref = result.get("reference_range") or {}
+                    rows.append((
+                        user_id, result.get("result_date") or collected_at, result["name"], result["value"],
+                        ref.get("min"), ref.get("max"), result.get("status")
+                    ))
+            rows.sort(key=lambda row: row[1])
+            batch.extend(rows)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a pagination cursor that was not issued by this service"""
+
+
+def encode_cursor(key: tuple) -> str:
+    """Opaque pagination cursor for a backend sort key"""
+    return base64.urlsafe_b64encode(json.dumps(list(key), separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid pagination cursor")
+    if not isinstance(key, list) or len(key) != 2:
+        raise InvalidCursorError("Invalid pagination cursor")
+    return tuple(key)
+
+
+_backend = None
+
+def get_data_backend():
+    """Return the process-wide data backend selected by settings"""
+    global _backend
+    if _backend is None:
+        if settings.data_backend == "sql":
+            from app.services.sql_data_backend import SQLDataBackend
+            seed_data = MemoryDataBackend().mock_data if settings.database_seed_mock_data else None
+            _backend = SQLDataBackend(settings.database_url, settings.database_pool_size, seed_data)
+        elif settings.data_backend == "sharded":
+            from app.services.sharded_data_backend import ShardedDataBackend, load_shard_map
+            seed_data = MemoryDataBackend().mock_data if settings.database_seed_mock_data else None
+            _backend = ShardedDataBackend(
+                load_shard_map(), settings.database_pool_size, seed_data, settings.shard_map_path,
+                settings.shard_map_reload_interval
+            )
+        else:
+            _backend = MemoryDataBackend()
+    return _backend
+
+
+# Background recompute of stored personas, restarted whenever the rules change
+_persona_job: Optional[asyncio.Task] = None
+
+
+async def _run_persona_recompute():
+    # One worker recomputes per rules version. The lock is kept after a run
+    # that completes, so workers reaching the same rules later skip it.
+    lock = f"persona-recompute:{get_persona_rules().version}"
+    if not await cache_service.acquire_lock(lock, settings.persona_recompute_lock_ttl):
+        print("🧭 Stored persona recompute already claimed by another worker")
+        return
+    try:
+        updated = await DataService().recompute_personas(settings.persona_recompute_batch_size)
+        print(f"🧭 Stored personas recomputed: {updated} updated")
+    except asyncio.CancelledError:
+        await cache_service.release_lock(lock)
+        raise
+    except Exception as e:
+        print(f"❌ Stored persona recompute failed: {e}")
+        await cache_service.release_lock(lock)
+
+
+def schedule_persona_recompute() -> asyncio.Task:
+    """Start recomputing stale stored personas in the background, replacing a run in progress"""
+    global _persona_job
+    if _persona_job is not None and not _persona_job.done():
+        _persona_job.cancel()
+    _persona_job = asyncio.create_task(_run_persona_recompute())
+    return _persona_job
+
+
+def start_persona_recompute() -> Optional[asyncio.Task]:
+    """Start-up hook: bring stored personas up to date unless disabled in settings"""
+    return schedule_persona_recompute() if settings.persona_recompute_on_startup else None
+
+
+async def cancel_persona_recompute():
+    """Stop a background persona recompute, e.g. on shutdown"""
+    global _persona_job
+    if _persona_job is not None and not _persona_job.done():
+        _persona_job.cancel()
+        try:
+            await _persona_job
+        except asyncio.CancelledError:
+            pass
+    _persona_job = None
+
+
+def _profile_key(user_id: str) -> str:
+    return f"data:profile:{user_id}"
+
+
+def _lab_results_key(user_id: str, report_id: Optional[str] = None) -> str:
+    return f"data:labs:{user_id}:{report_id or 'latest'}"
+
+
+def _history_key(user_id: str) -> str:
+    return f"data:history:{user_id}"
+
+
+def _report_key(user_id: str, report_id: Optional[str] = None) -> str:
+    return f"data:report:{user_id}:{report_id or 'latest'}"
+
+
+def _reports_key(user_id: str) -> str:
+    return f"data:reports:{user_id}"
+
+
+def _abnormal_key(user_id: str) -> str:
+    return f"data:abnormal:{user_id}"
+
+
+def _series_version_key(user_id: str) -> str:
+    return f"data:series-version:{user_id}"
+
+
+def _lab_write_keys(user_id: str, report_id: str) -> List[str]:
+    """Every cached read a write to one of the user's reports can change"""
+    return [
+        _series_version_key(user_id),
+        _lab_results_key(user_id, report_id),
+        _lab_results_key(user_id),
+        _report_key(user_id, report_id),
+        _report_key(user_id),
+        _reports_key(user_id),
+        _abnormal_key(user_id),
+    ]
+
+
+def _diff_key(user_id: str, from_report: Optional[str] = None, to_report: Optional[str] = None) -> str:
+    return f"data:diff:{user_id}:{from_report or 'previous'}:{to_report or 'latest'}"
+
+
+def _report_tag(user_id: str, report_id: str) -> str:
+    return f"report:{user_id}:{report_id}"
+
+
+def _reports_tag(user_id: str) -> str:
+    return f"reports:{user_id}"
+
+
+def _lab_write_tags(user_id: str, report_id: str) -> List[str]:
+    """Cache tags of derived reads (report diffs) a write to one report can change"""
+    return [_report_tag(user_id, report_id), _reports_tag(user_id)]
+
+
+def _diff_tags(diff: LabReportDiff, user_id: str, from_report: Optional[str] = None, to_report: Optional[str] = None) -> List[str]:
+    # A diff is filed under both of its reports; one that picked its reports by
+    # recency also depends on the user's report list
+    tags = [_report_tag(user_id, diff.from_report.report_id), _report_tag(user_id, diff.to_report.report_id)]
+    if not (from_report and to_report):
+        tags.append(_reports_tag(user_id))
+    return tags
+
+
+def _persona_fields(profile: UserProfile) -> Dict[str, Any]:
+    """
+    Stored persona columns for a profile's current inputs, or {} when the
+    stored persona was computed from the same inputs under rules at least as
+    new as this worker's. Changed inputs are always classified; when the
+    stored persona came from newer rules, the older version written here lets
+    workers on those rules recompute it on their next read.
+    """
+    rules = get_persona_rules()
+    fingerprint = input_fingerprint(profile.age, profile.conditions, profile.questionnaire_responses)
+    if profile.persona is not None and profile.persona_fingerprint == fingerprint and not rules.supersedes(profile.persona_rules_version):
+        return {}
+    persona = rules.classify(profile.age, profile.conditions, profile.questionnaire_responses)
+    return {"persona": persona.value, "persona_rules_version": rules.version, "persona_fingerprint": fingerprint}
+
+
+def diff_lab_results(from_rows: List[Dict[str, Any]], to_rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Hash-join two reports' results on the analyte's canonical catalog name
+    (normalized spelling for tests outside the catalog). Statuses are
+    recomputed from each row's reference range.
+    """
+    catalog = get_lab_catalog()
+
+    def by_analyte(rows):
+        codes = effective_status_codes(rows)
+        return {
+            catalog.canonical_name(row["name"]) or normalize_name(row["name"]): (row, code)
+            for row, code in zip(rows, codes)
+        }
+
+    before, after = by_analyte(from_rows), by_analyte(to_rows)
+    changes, transitions, new_analytes = [], [], []
+    for analyte, (row, code) in after.items():
+        status = STATUS_BY_CODE[code]
+        if analyte not in before:
+            new_analytes.append(LabResult(**{**row, "status": status}))
+            continue
+        old_row, old_code = before[analyte]
+        delta = percent = None
+        if normalize_unit(old_row["unit"]) == normalize_unit(row["unit"]):
+            delta = round(row["value"] - old_row["value"], 6)
+            if old_row["value"]:
+                percent = round(delta / abs(old_row["value"]) * 100, 2)
+        changes.append(LabResultChange(
+            name=row["name"],
+            unit=row["unit"],
+            from_value=old_row["value"],
+            to_value=row["value"],
+            delta=delta,
+            percent_change=percent,
+            from_status=STATUS_BY_CODE[old_code],
+            to_status=status
+        ))
+        if old_code != code:
+            transitions.append(StatusTransition(name=row["name"], from_status=STATUS_BY_CODE[old_code], to_status=status))
+
+    removed = [
+        LabResult(**{**row, "status": STATUS_BY_CODE[code]})
+        for analyte, (row, code) in before.items()
+        if analyte not in after
+    ]
+    return {
+        "changes": changes,
+        "new_analytes": new_analytes,
+        "removed_analytes": removed,
+        "status_transitions": transitions,
+    }
+
+
+_SHARED_CACHE = object()
+
+
+class DataService:
+    def __init__(self, backend=None, cache=_SHARED_CACHE):
+        # All instances share one backend so routers see the same data
+        self.backend = backend or get_data_backend()
+        # ...and one cache, so a write through any instance invalidates every reader; None disables caching
+        if cache is _SHARED_CACHE:
+            cache = cache_service if settings.data_cache_enabled else None
+        self.cache = cache
+    
+    @read_through(key=_profile_key, ttl=300, returns=UserProfile)
     async def get_user_profile(self, user_id: str) -> UserProfile:
         """Fetch user profile by ID"""
-        user_data = self.mock_data["users"].get(user_id)
+        user_data = await self.backend.get_user(user_id)
         if not user_data:
             raise ValueError(f"User {user_id} not found")
         
         return UserProfile(**user_data)
     
+    async def get_user_profiles(self, user_ids: List[str]) -> Dict[str, UserProfile]:
+        """Fetch many profiles at once (fanned out across shards where sharded); unknown ids are skipped"""
+        if not hasattr(self.backend, "get_users"):
+            profiles = {}
+            for user_id in user_ids:
+                user_data = await self.backend.get_user(user_id)
+                if user_data:
+                    profiles[user_id] = UserProfile(**user_data)
+            return profiles
+        
+        users = await self.backend.get_users(list(dict.fromkeys(user_ids)))
+        return {user_id: UserProfile(**user_data) for user_id, user_data in users.items()}
+    
+    @read_through(key=_lab_results_key, ttl=300, returns=List[LabResult])
     async def get_lab_results(self, user_id: str, report_id: Optional[str] = None) -> List[LabResult]:
-        """Fetch lab results for user"""
-        lab_data = self.mock_data["lab_results"].get(user_id, [])
+        """Fetch lab results for one report, defaulting to the user's latest report"""
+        lab_data = await self.backend.get_lab_results(user_id, report_id)
+        if lab_data is None:
+            if report_id:
+                raise ValueError(f"Report {report_id} not found for user {user_id}")
+            return []
         
-        # Convert to LabResult objects
-        results = []
-        for result in lab_data:
-            results.append(LabResult(**result))
+        # Statuses are read back as classified against the reference ranges
+        return [LabResult(**result) for result in with_effective_statuses(lab_data)]
+    
+    async def get_lab_results_page(
+        self,
+        user_id: str,
+        report_id: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        all_reports: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Fetch one page of lab results in stable (result date, insertion) order.
+        Results come from one report (the latest by default) or, with
+        all_reports, from the user's whole lab history.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        rows = await self.backend.get_lab_results_page(user_id, report_id, all_reports, after, limit + 1)
+        if not rows and after is None and report_id and not all_reports:
+            await self.get_lab_report(user_id, report_id)  # Raises for an unknown report
         
-        return results
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": with_effective_statuses([item for _, item in rows]),
+            "next_cursor": encode_cursor(rows[-1][0]) if has_more else None
+        }
+    
+    async def iter_lab_results(
+        self,
+        user_id: str,
+        report_id: Optional[str] = None,
+        all_reports: bool = False,
+        page_size: int = 500
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield lab results page by page so callers never hold the full history"""
+        after = None
+        while True:
+            rows = await self.backend.get_lab_results_page(user_id, report_id, all_reports, after, page_size)
+            if not rows:
+                return
+            yield with_effective_statuses([item for _, item in rows])
+            if len(rows) < page_size:
+                return
+            after = rows[-1][0]
+    
+    async def get_analyte_series(self, user_id: str, analyte: str) -> Tuple[List[str], List[float]]:
+        """Fetch (dates, values) of one analyte across all of a user's reports"""
+        return await self.backend.get_analyte_series(user_id, analyte)
+
+    async def get_series_version(self, user_id: str) -> Optional[str]:
+        """
+        Token that changes whenever the user's lab results are written, so every
+        worker can tell its loaded series are stale. Writes delete it and the
+        next read issues a new one; None without a shared cache.
+        """
+        if self.cache is None:
+            return None
+        key = _series_version_key(user_id)
+        version = await self.cache.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            await self.cache.set(key, version, 86400)
+        return version
     
+    @read_through(key=_history_key, ttl=900, returns=Dict[str, Any])
     async def get_user_history(self, user_id: str) -> Dict[str, Any]:
         """Fetch user health history"""
-        return self.mock_data["user_history"].get(user_id, {})
+        return await self.backend.get_user_history(user_id)
+    
+    async def get_user_bundle(self, user_id: str, report_id: Optional[str] = None) -> UserBundle:
+        """
+        Fetch profile, one report's lab results and history together. Backends
+        with a native get_user_bundle answer in a single round-trip; others
+        fall back to composing the individual calls.
+        """
+        if not hasattr(self.backend, "get_user_bundle"):
+            profile = await self.get_user_profile(user_id)
+            lab_results = await self.get_lab_results(user_id, report_id)
+            history = await self.get_user_history(user_id)
+            report = await self.backend.get_report(user_id, report_id)
+            return UserBundle(
+                profile=profile,
+                report=LabReport(**report) if report else None,
+                lab_results=lab_results,
+                history=history
+            )
+        
+        bundle = await self.backend.get_user_bundle(user_id, report_id)
+        if not bundle["profile"]:
+            raise ValueError(f"User {user_id} not found")
+        if bundle["lab_results"] is None and report_id:
+            raise ValueError(f"Report {report_id} not found for user {user_id}")
+        
+        return UserBundle(
+            profile=UserProfile(**bundle["profile"]),
+            report=LabReport(**bundle["report"]) if bundle["report"] else None,
+            lab_results=[LabResult(**result) for result in with_effective_statuses(bundle["lab_results"] or [])],
+            history=bundle["history"]
+        )
     
+    @write_through(key=lambda profile: _profile_key(profile.id), ttl=300, returns=UserProfile)
     async def create_user_profile(self, profile_data: Dict[str, Any]) -> UserProfile:
-        """Create new user profile"""
-        user_id = str(len(self.mock_data["users"]) + 1)
-        profile_data["id"] = user_id
-        profile_data["created_at"] = datetime.now().isoformat()
+        """Create new user profile, storing the persona its inputs resolve to"""
+        profile_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        draft = UserProfile(**{**profile_data, "id": ""})
+        if draft.questionnaire_responses is not None:
+            profile_data["questionnaire_responses"] = draft.questionnaire_responses.model_dump()
+        profile_data.update(_persona_fields(draft))
         
-        self.mock_data["users"][user_id] = profile_data
+        profile_data = await self.backend.create_user(profile_data)
         return UserProfile(**profile_data)
     
+    @write_through(key=lambda profile: _profile_key(profile.id), ttl=300, returns=UserProfile)
     async def update_user_profile(self, user_id: str, profile_data: Dict[str, Any]) -> UserProfile:
-        """Update existing user profile"""
-        if user_id not in self.mock_data["users"]:
+        """Update existing user profile, recomputing the stored persona only if its inputs changed"""
+        current = await self.backend.get_user(user_id)
+        if current is None:
             raise ValueError(f"User {user_id} not found")
+        profile_data = dict(profile_data)
+        draft = UserProfile(**{**current, **profile_data})
+        if "questionnaire_responses" in profile_data and draft.questionnaire_responses is not None:
+            profile_data["questionnaire_responses"] = draft.questionnaire_responses.model_dump()
+        persona_fields = _persona_fields(draft)
+        profile_data.update(persona_fields)
         
-        self.mock_data["users"][user_id].update(profile_data)
-        return UserProfile(**self.mock_data["users"][user_id])
+        user_data = await self.backend.update_user(user_id, profile_data)
+        if user_data is None:
+            raise ValueError(f"User {user_id} not found")
+        if persona_fields and self.cache is not None:
+            await self.cache.invalidate_tags([adaptive_view_tag(user_id)])
+        
+        return UserProfile(**user_data)
+    
+    async def get_stored_persona(self, profile: UserProfile) -> PersonaType:
+        """
+        The profile's stored persona. One that is missing or was computed under
+        older rules (before the background recompute reached this user) is
+        recomputed and stored first; one from newer rules than this worker's is
+        returned as stored.
+        """
+        if profile.persona is not None and not get_persona_rules().supersedes(profile.persona_rules_version):
+            return profile.persona
+        return (await self.update_user_profile(profile.id, {})).persona
+    
+    async def recompute_personas(self, batch_size: int = 1000) -> int:
+        """
+        Recompute every stored persona computed under older rules, or under
+        this revision from other inputs, a batch at a time. Personas from newer
+        rules are left to the workers running them. Returns the number of
+        profiles updated.
+        """
+        rules = get_persona_rules()
+        updated = 0
+        async for rows in self.backend.scan_persona_inputs(batch_size):
+            fingerprints = [input_fingerprint(age, conditions, answers) for _, age, conditions, answers, _, _ in rows]
+            revisions = [version_revision(row[4]) for row in rows]
+            stale = [
+                i for i, row in enumerate(rows)
+                if revisions[i] < rules.revision or (revisions[i] == rules.revision and row[5] != fingerprints[i])
+            ]
+            if not stale:
+                continue
+            personas = rules.classify_batch(
+                [rows[i][1] for i in stale], [rows[i][2] for i in stale], [rows[i][3] for i in stale]
+            )
+            changes = [(rows[i][0], persona.value, rules.version, fingerprints[i]) for i, persona in zip(stale, personas)]
+            await self.backend.update_personas(changes)
+            if self.cache is not None:
+                user_ids = [user_id for user_id, *_ in changes]
+                await self.cache.delete_many([_profile_key(user_id) for user_id in user_ids])
+                await self.cache.invalidate_tags([adaptive_view_tag(user_id) for user_id in user_ids])
+            updated += len(changes)
+        return updated
     
-    async def store_lab_results(self, user_id: str, lab_results: List[Dict[str, Any]]) -> bool:
-        """Store lab results for user"""
-        self.mock_data["lab_results"][user_id] = lab_results
+    async def store_lab_results(
+        self,
+        user_id: str,
+        lab_results: List[Dict[str, Any]],
+        report_id: Optional[str] = None,
+        collected_at: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> bool:
+        """Store lab results for user as one report"""
+        await self.store_lab_report(user_id, lab_results, report_id, collected_at, source)
         return True
     
+    @invalidates(
+        keys=lambda report, *args, **kwargs: _lab_write_keys(report.user_id, report.report_id),
+        tags=lambda report, *args, **kwargs: _lab_write_tags(report.user_id, report.report_id)
+    )
+    async def store_lab_report(
+        self,
+        user_id: str,
+        lab_results: List[Dict[str, Any]],
+        report_id: Optional[str] = None,
+        collected_at: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> LabReport:
+        """Store lab results as a report, replacing any report with the same ID"""
+        report_id = report_id or f"RPT-{user_id}-{uuid.uuid4().hex[:12]}"
+        collected_at = collected_at or datetime.now(timezone.utc).isoformat()
+        
+        if settings.ingest_normalize_units:
+            normalize_rows(lab_results)
+        await self._fill_reference_ranges([(user_id, result) for result in lab_results])
+        fill_missing_statuses(lab_results)
+        report = await self.backend.store_lab_results(user_id, lab_results, report_id, collected_at, source)
+        return LabReport(**report)
+    
+    @invalidates(
+        keys=lambda count, records: [key for record in records for key in _lab_write_keys(record[0], record[1])],
+        tags=lambda count, records: [tag for record in records for tag in _lab_write_tags(record[0], record[1])]
+    )
+    async def store_lab_results_batch(self, records: List[Tuple[str, str, str, Optional[str], Dict[str, Any]]]) -> int:
+        """Append (user_id, report_id, collected_at, source, result) records for many users in one transaction"""
+        results = [record[4] for record in records]
+        if settings.ingest_normalize_units:
+            normalize_rows(results)
+        await self._fill_reference_ranges([(record[0], record[4]) for record in records])
+        fill_missing_statuses(results)
+        await self.backend.store_lab_results_batch(records)
+        return len(records)
+    
+    async def _fill_reference_ranges(self, rows: List[Tuple[str, Dict[str, Any]]]):
+        """
+        Give (user_id, result) rows that arrived without any reference bound the
+        catalog's default range for the user's age and sex. Only rows already in
+        the test's canonical unit are filled, since catalog ranges are in it.
+        """
+        pending = [
+            (user_id, result) for user_id, result in rows
+            if all(bound is None for bound in (result.get("reference_range") or {}).values())
+        ]
+        if not pending:
+            return
+        profiles = await self.backend.get_users(sorted({user_id for user_id, _ in pending}))
+        catalog = get_lab_catalog()
+        for user_id, result in pending:
+            conversion = catalog.unit_conversion(result["name"], result["unit"])
+            if conversion is None or conversion[1:] != (1.0, 0.0):
+                continue
+            profile = profiles.get(user_id) or {}
+            reference_range = catalog.reference_range(result["name"], profile.get("age"), profile.get("gender"))
+            if reference_range is not None:
+                result["reference_range"] = reference_range
+    
+    @read_through(key=_report_key, ttl=300, returns=LabReport)
+    async def get_lab_report(self, user_id: str, report_id: Optional[str] = None) -> LabReport:
+        """Fetch report metadata, defaulting to the user's latest report"""
+        report = await self.backend.get_report(user_id, report_id)
+        if not report:
+            raise ValueError(f"Report {report_id or 'latest'} not found for user {user_id}")
+        
+        return LabReport(**report)
+    
+    @read_through(key=_reports_key, ttl=300, returns=List[LabReport])
+    async def list_lab_reports(self, user_id: str) -> List[LabReport]:
+        """List report metadata for user, newest first"""
+        return [LabReport(**report) for report in await self.backend.list_reports(user_id)]
+    
+    @read_through(key=_diff_key, ttl=300, returns=LabReportDiff, tags=_diff_tags)
+    async def get_report_diff(
+        self,
+        user_id: str,
+        from_report: Optional[str] = None,
+        to_report: Optional[str] = None
+    ) -> LabReportDiff:
+        """
+        Compare two of a user's reports analyte by analyte. `to_report`
+        defaults to the latest report and `from_report` to the one collected
+        before it.
+        """
+        if not (from_report and to_report):
+            reports = await self.list_lab_reports(user_id)
+            if to_report is None:
+                if not reports:
+                    raise ValueError(f"No reports found for user {user_id}")
+                to_report = reports[0].report_id
+            if from_report is None:
+                ids = [report.report_id for report in reports]
+                earlier = ids[ids.index(to_report) + 1:] if to_report in ids else []
+                if not earlier:
+                    raise ValueError(f"No report before {to_report} for user {user_id}")
+                from_report = earlier[0]
+        
+        pair = await self.backend.get_report_pair(user_id, from_report, to_report)
+        for report_id in (from_report, to_report):
+            if report_id not in pair:
+                raise ValueError(f"Report {report_id} not found for user {user_id}")
+        
+        return LabReportDiff(
+            user_id=user_id,
+            from_report=LabReport(**pair[from_report]["report"]),
+            to_report=LabReport(**pair[to_report]["report"]),
+            **diff_lab_results(pair[from_report]["lab_results"], pair[to_report]["lab_results"])
+        )
+    
+    @read_through(key=_abnormal_key, ttl=300, returns=List[LabResult])
     async def get_abnormal_results(self, user_id: str) -> List[LabResult]:
         """Get only abnormal lab results for user"""
-        all_results = await self.get_lab_results(user_id)
-        return [result for result in all_results if result.status != LabResultStatus.NORMAL]
\ No newline at end of file
+        lab_data = await self.backend.get_lab_results(user_id) or []
+        
+        # Classify the whole report against its reference ranges in one pass
+        codes = effective_status_codes(lab_data)
+        return [
+            LabResult(**{**result, "status": STATUS_BY_CODE[code]})
+            for result, code in zip(lab_data, codes)
+            if code != STATUS_NORMAL
+        ]
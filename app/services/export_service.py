@@ -0,0 +1,127 @@
+"""
+Streaming export of a user's complete record: profile, report metadata, every
+lab result across all reports and health history.
+
+Lab results are read from the store one page at a time and encoded as they
+arrive. Output is gathered into chunks of about `chunk_bytes` (optionally
+gzip-compressed on the fly) and each chunk is only produced when the response
+asks for the next one, so a slow client holds back the reads and memory stays
+bounded by one page plus one chunk whatever the size of the history.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterable
+
+from app.models.schemas import PublicUserProfile
+from app.services.data_service import DataService
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+# One CSV table for every record type: lab results fill the named columns,
+# other records carry their fields as JSON in `data`
+CSV_COLUMNS = (
+    "record_type", "report_id", "result_date", "name", "value", "unit", "ref_min", "ref_max",
+    "category", "status", "original_value", "original_unit", "data"
+)
+
+
+class ExportError(ValueError):
+    """Raised for an unsupported export format"""
+
+
+def _enum_value(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+
+    def header(self) -> str:
+        return self._rows([CSV_COLUMNS])
+
+    def encode(self, record_type: str, record: Dict[str, Any]) -> str:
+        if record_type != "lab_result":
+            data = json.dumps(record, separators=(",", ":"))
+            return self._rows([(record_type, record.get("report_id", "")) + ("",) * (len(CSV_COLUMNS) - 3) + (data,)])
+        ref = record.get("reference_range") or {}
+        return self._rows([(
+            record_type, record.get("report_id"), record.get("result_date"), record["name"], record["value"],
+            record["unit"], ref.get("min"), ref.get("max"), record["category"], _enum_value(record.get("status")),
+            record.get("original_value"), record.get("original_unit"), ""
+        )])
+
+    def encode_many(self, record_type: str, records: Iterable[Dict[str, Any]]) -> str:
+        return "".join(self.encode(record_type, record) for record in records)
+
+    def _rows(self, rows) -> str:
+        self._writer.writerows(rows)
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+
+class _NdjsonEncoder:
+    def header(self) -> str:
+        return ""
+
+    def encode(self, record_type: str, record: Dict[str, Any]) -> str:
+        return json.dumps({"record_type": record_type, **record}, separators=(",", ":")) + "\n"
+
+    def encode_many(self, record_type: str, records: Iterable[Dict[str, Any]]) -> str:
+        return "".join(self.encode(record_type, record) for record in records)
+
+
+class ExportService:
+    def __init__(self, data_service: DataService, page_size: int = 500, chunk_bytes: int = 65536):
+        self.data_service = data_service
+        self.page_size = page_size
+        self.chunk_bytes = chunk_bytes
+
+    async def export_user(self, user_id: str, fmt: str = "ndjson", compress: bool = False) -> AsyncIterator[bytes]:
+        """
+        Check the user exists and the format is supported, then return the
+        byte stream. Raises ValueError for an unknown user before anything is
+        sent, so callers can still answer with an error status.
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ExportError(f"Unsupported export format '{fmt}'; use one of {', '.join(SUPPORTED_FORMATS)}")
+        profile = await self.data_service.get_user_profile(user_id)
+        public = profile.model_dump(mode="json", include=set(PublicUserProfile.model_fields))
+        return self._stream(user_id, public, fmt, compress)
+
+    async def _stream(self, user_id: str, profile: Dict[str, Any], fmt: str, compress: bool) -> AsyncIterator[bytes]:
+        encoder = _CsvEncoder() if fmt == "csv" else _NdjsonEncoder()
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        pending = bytearray()
+
+        def flush() -> bytes:
+            data = bytes(pending)
+            pending.clear()
+            return compressor.compress(data) if compressor else data
+
+        pending += encoder.header().encode("utf-8")
+        pending += encoder.encode("profile", profile).encode("utf-8")
+        reports = await self.data_service.list_lab_reports(user_id)
+        pending += encoder.encode_many("report", (report.model_dump(mode="json") for report in reports)).encode("utf-8")
+
+        async for page in self.data_service.iter_lab_results(user_id, all_reports=True, page_size=self.page_size):
+            pending += encoder.encode_many("lab_result", page).encode("utf-8")
+            if len(pending) >= self.chunk_bytes:
+                chunk = flush()
+                if chunk:
+                    yield chunk
+
+        history = await self.data_service.get_user_history(user_id)
+        if history:
+            pending += encoder.encode("history", history).encode("utf-8")
+        tail = flush()
+        if compressor:
+            tail += compressor.flush()
+        if tail:
+            yield tail
@@ -0,0 +1,200 @@
+"""
+Streaming bulk ingestion of lab results from partner feeds (NDJSON or CSV).
+
+Lines longer than max_line_length characters fail the upload, so a body
+without newlines is never buffered whole. CSV records go through one
+csv.reader, so RFC 4180 quoted fields may span lines.
+"""
+import codecs
+import csv
+import json
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.models.schemas import LabResultIngestRow
+from app.services.cache_service import CacheService, adaptive_view_tag
+from app.services.data_service import DataService
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+
+class IngestionError(ValueError):
+    """Raised when a feed cannot be ingested at all (bad format or header)"""
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_length: int = 65536) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            if len(line) > max_line_length:
+                raise IngestionError(f"Line longer than {max_line_length} characters")
+            yield line.rstrip("\r")
+        if len(pending) > max_line_length:
+            raise IngestionError(f"Line longer than {max_line_length} characters")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class _LineFeed:
+    """Lines csv.reader pulls from; only ever holds complete records"""
+
+    def __init__(self):
+        self.lines: deque = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_csv_records(lines: AsyncIterator[str], max_line_length: int = 65536) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (line_number, fields or csv.Error) per non-blank CSV record. A record
+    is complete once its double quotes balance, so a quoted field may contain
+    newlines; line_number is the record's first line.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    line_number = start = 0
+    length = 0
+    quotes = 0
+    async for line in lines:
+        line_number += 1
+        if not feed.lines:
+            if not line.strip():
+                continue
+            start, length, quotes = line_number, 0, 0
+        feed.lines.append(line + "\n")
+        length += len(line) + 1
+        quotes += line.count('"')
+        if length > max_line_length:
+            raise IngestionError(f"Record at line {start} longer than {max_line_length} characters")
+        if quotes % 2:
+            continue
+        try:
+            yield start, next(reader)
+        except csv.Error as e:
+            feed.lines.clear()
+            yield start, e
+    if feed.lines:
+        yield start, csv.Error("unterminated quoted field at end of data")
+
+
+class IngestionService:
+    def __init__(
+        self,
+        data_service: DataService,
+        cache_service: CacheService,
+        max_errors: int = 1000,
+        max_line_length: int = 65536
+    ):
+        self.data_service = data_service
+        self.cache_service = cache_service
+        self.max_errors = max_errors
+        self.max_line_length = max_line_length
+
+    async def _parse_csv(self, lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+        header = None
+        async for line_number, values in iter_csv_records(lines, self.max_line_length):
+            if header is None:
+                if isinstance(values, Exception):
+                    raise IngestionError(f"CSV header cannot be parsed: {values}")
+                header = [column.strip() for column in values]
+                missing = {"user_id", "name", "value", "unit", "category"} - set(header)
+                if missing:
+                    raise IngestionError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+                continue
+            if isinstance(values, Exception):
+                # A malformed record is a bad row like any other, not a failed upload
+                yield line_number, values
+            elif len(values) != len(header):
+                yield line_number, ValueError(f"expected {len(header)} columns, got {len(values)}")
+            else:
+                yield line_number, {k: v for k, v in zip(header, values) if v != ""}
+
+    async def _parse_ndjson(self, lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, Any]]:
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object")
+                yield line_number, row
+            except ValueError as e:
+                yield line_number, e
+
+    def _parse_rows(self, lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+        """Yield (line_number, raw row dict or exception) for every non-blank record"""
+        return self._parse_csv(lines) if fmt == "csv" else self._parse_ndjson(lines)
+
+    def _to_record(self, row: LabResultIngestRow, ingest_id: str, now: str) -> Tuple[str, str, str, Optional[str], Dict[str, Any]]:
+        report_id = row.report_id or f"RPT-{row.user_id}-{ingest_id}"
+        # Missing statuses are classified per batch by DataService
+        result = {
+            "name": row.name,
+            "value": row.value,
+            "unit": row.unit,
+            "reference_range": {"min": row.ref_min, "max": row.ref_max},
+            "category": row.category,
+            "status": row.status.value if row.status else None,
+        }
+        if row.result_date:
+            result["result_date"] = row.result_date
+        return row.user_id, report_id, row.collected_at or now, row.source, result
+
+    async def _flush(self, batch: List[Tuple], summary: Dict[str, Any]):
+        await self.data_service.store_lab_results_batch(batch)
+        summary["accepted"] += len(batch)
+        summary["batches"] += 1
+
+        # Drop every cached view of the users this batch touched, whatever report it shows
+        users: Set[str] = {record[0] for record in batch}
+        await self.cache_service.invalidate_tags(sorted(adaptive_view_tag(user_id) for user_id in users))
+        summary["users"].update(users)
+
+    async def ingest(self, chunks: AsyncIterator[bytes], fmt: str, batch_size: int) -> Dict[str, Any]:
+        """Validate rows as they stream in and write them in transactions of batch_size rows"""
+        if fmt not in SUPPORTED_FORMATS:
+            raise IngestionError(f"Unsupported ingestion format: {fmt}")
+
+        ingest_id = uuid.uuid4().hex[:12]
+        now = datetime.now(timezone.utc).isoformat()
+        summary: Dict[str, Any] = {"accepted": 0, "rejected": 0, "batches": 0, "errors": [], "users": set()}
+        batch: List[Tuple] = []
+
+        async for line_number, raw in self._parse_rows(iter_lines(chunks, self.max_line_length), fmt):
+            try:
+                if isinstance(raw, Exception):
+                    raise raw
+                batch.append(self._to_record(LabResultIngestRow(**raw), ingest_id, now))
+            except (ValueError, ValidationError, csv.Error) as e:
+                summary["rejected"] += 1
+                if len(summary["errors"]) < self.max_errors:
+                    summary["errors"].append({"line": line_number, "error": str(e)})
+                continue
+            if len(batch) >= batch_size:
+                await self._flush(batch, summary)
+                batch = []
+
+        if batch:
+            await self._flush(batch, summary)
+
+        summary["users_affected"] = len(summary.pop("users"))
+        summary["errors_truncated"] = summary["rejected"] > len(summary["errors"])
+        return summary
@@ -0,0 +1,82 @@
+"""
+RFC 6902 JSON Patch between two JSON documents.
+
+make_patch walks both documents together and emits add, remove and replace
+operations: objects are compared key by key and arrays index by index, so a
+changed leaf costs one small operation instead of a copy of its parents.
+Array elements past the common length are appended or removed from the end.
+apply_patch applies the operations make_patch produces.
+"""
+import copy
+from typing import Any, Dict, List
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _diff(old: Any, new: Any, path: str, ops: List[Dict[str, Any]]):
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key in old:
+                _diff(old[key], value, f"{path}/{_escape(key)}", ops)
+            else:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+    elif isinstance(old, list) and isinstance(new, list):
+        common = min(len(old), len(new))
+        for i in range(common):
+            _diff(old[i], new[i], f"{path}/{i}", ops)
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for value in new[common:]:
+            ops.append({"op": "add", "path": f"{path}/-", "value": value})
+    else:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+def make_patch(old: Any, new: Any) -> List[Dict[str, Any]]:
+    """Operations that turn old into new"""
+    ops: List[Dict[str, Any]] = []
+    _diff(old, new, "", ops)
+    return ops
+
+
+def apply_patch(document: Any, patch: List[Dict[str, Any]]) -> Any:
+    """A copy of document with the add, remove and replace operations applied"""
+    document = copy.deepcopy(document)
+    for op in patch:
+        if op["path"] == "":
+            if op["op"] == "remove":
+                raise ValueError("Cannot remove the whole document")
+            document = copy.deepcopy(op["value"])
+            continue
+        *parents, last = [_unescape(token) for token in op["path"].split("/")[1:]]
+        target = document
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del target[index]
+            elif op["op"] == "replace":
+                target[index] = copy.deepcopy(op["value"])
+            else:
+                raise ValueError(f"Unsupported patch operation {op['op']!r}")
+        elif op["op"] in ("add", "replace"):
+            target[last] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            raise ValueError(f"Unsupported patch operation {op['op']!r}")
+    return document
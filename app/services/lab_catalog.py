@@ -0,0 +1,299 @@
+"""
+Compiled lab test catalog: canonical names, aliases, units and unit
+conversions, reference ranges by age and sex, and plain-language explanations.
+
+app/data/lab_catalog.json is compiled into a compact binary file that every
+worker memory-maps read-only, so all processes share one copy through the page
+cache. Aliases sit in an open-addressing hash table inside the file, so a
+lookup hashes the normalized name and probes a slot or two instead of
+scanning a list.
+
+File layout (network byte order):
+    header      magic, version, test/range/slot counts, section offsets
+    tests       one fixed-size record per test
+    ranges      (sex, age_min, age_max, min, max) records, grouped by test
+    conversions (unit, factor, offset) records, grouped by test; a value in
+                that unit times factor plus offset is in the canonical unit
+    aliases     hash slots of (alias string offset + 1, test index); 0 = empty
+    strings     length-prefixed UTF-8 strings
+"""
+import functools
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default lab catalog path")
+    class MockSettings:
+        lab_catalog_path = "./lab_catalog.bin"
+    settings = MockSettings()
+
+CATALOG_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "lab_catalog.json")
+
+CATALOG_MAGIC = b"HLLC"
+CATALOG_VERSION = 2
+_HEADER = struct.Struct("!4sBIIIIIIIII")
+_TEST = struct.Struct("!IIIIIIHIH")
+_RANGE = struct.Struct("!BBBdd")
+_CONVERSION = struct.Struct("!Idd")
+_SLOT = struct.Struct("!II")
+_STRING_LEN = struct.Struct("!H")
+
+SEX_ANY, SEX_MALE, SEX_FEMALE = 0, 1, 2
+_SEX_CODES = {"male": SEX_MALE, "m": SEX_MALE, "female": SEX_FEMALE, "f": SEX_FEMALE}
+_NO_STRING = 0xFFFFFFFF
+_AGE_OPEN = 255
+
+
+def normalize_name(name: str) -> str:
+    """Alias key of a test name: lowercase words separated by single spaces"""
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def normalize_unit(unit: str) -> str:
+    """Comparison key of a unit string: case, spacing and micro sign insensitive"""
+    return "".join(unit.split()).lower().replace("µ", "u").replace("μ", "u").replace("×", "x")
+
+
+def _sex_code(sex: Optional[str]) -> int:
+    return _SEX_CODES.get((sex or "").strip().lower(), SEX_ANY)
+
+
+class LabTest(NamedTuple):
+    name: str
+    unit: str
+    category: str
+    topic: Optional[str]
+    explanation: Optional[str]
+    ranges: Tuple[Tuple[int, int, int, Optional[float], Optional[float]], ...]
+    conversions: Tuple[Tuple[str, float, float], ...]
+
+
+def compile_catalog(source_path: str = CATALOG_SOURCE, output_path: Optional[str] = None) -> str:
+    """Compile the JSON catalog into the binary format, replacing output_path atomically"""
+    output_path = output_path or settings.lab_catalog_path
+    with open(source_path) as f:
+        tests = json.load(f)["tests"]
+
+    strings = bytearray()
+    string_offsets: Dict[str, int] = {}
+
+    def add_string(value: Optional[str]) -> int:
+        if value is None:
+            return _NO_STRING
+        if value not in string_offsets:
+            encoded = value.encode("utf-8")
+            string_offsets[value] = len(strings)
+            strings.extend(_STRING_LEN.pack(len(encoded)) + encoded)
+        return string_offsets[value]
+
+    test_records = bytearray()
+    range_records = bytearray()
+    conversion_records = bytearray()
+    aliases: Dict[str, int] = {}
+    range_count = 0
+    conversion_count = 0
+    for index, test in enumerate(tests):
+        ranges = test.get("ranges", [])
+        conversions = test.get("conversions", [])
+        test_records += _TEST.pack(
+            add_string(test["name"]),
+            add_string(test["unit"]),
+            add_string(test["category"]),
+            add_string(test.get("topic")),
+            add_string(test.get("explanation")),
+            range_count,
+            len(ranges),
+            conversion_count,
+            len(conversions),
+        )
+        for r in ranges:
+            range_records += _RANGE.pack(
+                _sex_code(r.get("sex")),
+                r.get("age_min", 0),
+                r.get("age_max", _AGE_OPEN),
+                math.nan if r.get("min") is None else float(r["min"]),
+                math.nan if r.get("max") is None else float(r["max"]),
+            )
+        range_count += len(ranges)
+        for c in conversions:
+            conversion_records += _CONVERSION.pack(
+                add_string(normalize_unit(c["unit"])), float(c["factor"]), float(c.get("offset", 0.0))
+            )
+        conversion_count += len(conversions)
+        for alias in [test["name"]] + test.get("aliases", []):
+            key = normalize_name(alias)
+            if aliases.setdefault(key, index) != index:
+                raise ValueError(f"Alias '{alias}' is used by more than one lab test")
+
+    # Power-of-two table at most half full keeps probe chains short
+    slot_count = 1
+    while slot_count < 2 * len(aliases):
+        slot_count *= 2
+    slots = [(0, 0)] * slot_count
+    for key, index in aliases.items():
+        slot = zlib.crc32(key.encode("utf-8")) & (slot_count - 1)
+        while slots[slot][0]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = (add_string(key) + 1, index)
+    slot_records = b"".join(_SLOT.pack(*s) for s in slots)
+
+    tests_offset = _HEADER.size
+    ranges_offset = tests_offset + len(test_records)
+    conversions_offset = ranges_offset + len(range_records)
+    slots_offset = conversions_offset + len(conversion_records)
+    strings_offset = slots_offset + len(slot_records)
+    header = _HEADER.pack(
+        CATALOG_MAGIC, CATALOG_VERSION, len(tests), range_count, conversion_count, slot_count,
+        tests_offset, ranges_offset, conversions_offset, slots_offset, strings_offset
+    )
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + test_records + range_records + conversion_records + slot_records + bytes(strings))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class LabCatalog:
+    """Read-only view of a compiled catalog file"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.test_count, self.range_count, self.conversion_count, self.slot_count,
+         self._tests, self._ranges, self._conversions, self._slots, self._strings) = _HEADER.unpack_from(self._buffer, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_VERSION:
+            self._buffer.close()
+            raise ValueError(f"Unsupported lab catalog format in {path}")
+        # Decoded entries are immutable, so repeat lookups of a name skip the file
+        self.lookup = functools.lru_cache(maxsize=4096)(self.lookup)
+
+    def __len__(self) -> int:
+        return self.test_count
+
+    def close(self):
+        self._buffer.close()
+
+    def _string(self, offset: int) -> Optional[str]:
+        if offset == _NO_STRING:
+            return None
+        start = self._strings + offset
+        (length,) = _STRING_LEN.unpack_from(self._buffer, start)
+        start += _STRING_LEN.size
+        return self._buffer[start:start + length].decode("utf-8")
+
+    def _index_of(self, name: str) -> Optional[int]:
+        key = normalize_name(name)
+        encoded = key.encode("utf-8")
+        mask = self.slot_count - 1
+        slot = zlib.crc32(encoded) & mask
+        for _ in range(self.slot_count):
+            alias_offset, index = _SLOT.unpack_from(self._buffer, self._slots + slot * _SLOT.size)
+            if not alias_offset:
+                return None
+            if self._string(alias_offset - 1) == key:
+                return index
+            slot = (slot + 1) & mask
+        return None
+
+    def _test(self, index: int) -> LabTest:
+        (name, unit, category, topic, explanation,
+         range_start, range_count, conversion_start, conversion_count) = _TEST.unpack_from(
+            self._buffer, self._tests + index * _TEST.size
+        )
+        ranges = []
+        for i in range(range_start, range_start + range_count):
+            sex, age_min, age_max, low, high = _RANGE.unpack_from(self._buffer, self._ranges + i * _RANGE.size)
+            ranges.append((sex, age_min, age_max, None if math.isnan(low) else low, None if math.isnan(high) else high))
+        conversions = []
+        for i in range(conversion_start, conversion_start + conversion_count):
+            conv_unit, factor, offset = _CONVERSION.unpack_from(self._buffer, self._conversions + i * _CONVERSION.size)
+            conversions.append((self._string(conv_unit), factor, offset))
+        return LabTest(
+            self._string(name), self._string(unit), self._string(category),
+            self._string(topic), self._string(explanation), tuple(ranges), tuple(conversions)
+        )
+
+    def lookup(self, name: str) -> Optional[LabTest]:
+        """Catalog entry for a test name or any of its aliases"""
+        index = self._index_of(name)
+        return None if index is None else self._test(index)
+
+    def canonical_name(self, name: str) -> Optional[str]:
+        test = self.lookup(name)
+        return test.name if test else None
+
+    def explanation(self, name: str) -> Optional[str]:
+        test = self.lookup(name)
+        return test.explanation if test else None
+
+    def topic(self, name: str) -> Optional[str]:
+        test = self.lookup(name)
+        return test.topic if test else None
+
+    def unit_conversion(self, name: str, unit: str) -> Optional[Tuple[str, float, float]]:
+        """
+        (canonical unit, factor, offset) taking a value of test `name` in `unit`
+        to the canonical unit, or None for an unknown test or unit.
+        """
+        test = self.lookup(name)
+        if test is None:
+            return None
+        key = normalize_unit(unit)
+        if key == normalize_unit(test.unit):
+            return test.unit, 1.0, 0.0
+        for conv_unit, factor, offset in test.conversions:
+            if conv_unit == key:
+                return test.unit, factor, offset
+        return None
+
+    def reference_range(self, name: str, age: Optional[int] = None, sex: Optional[str] = None) -> Optional[Dict[str, Optional[float]]]:
+        """
+        Default reference range of a test for a patient. Ranges are listed most
+        specific first; the first one matching the age and sex wins, and a
+        sex-specific range is only used when the sex is known.
+        """
+        test = self.lookup(name)
+        if test is None:
+            return None
+        sex_code = _sex_code(sex)
+        for range_sex, age_min, age_max, low, high in test.ranges:
+            if age is not None and not age_min <= age <= age_max:
+                continue
+            if age is None and (age_min > 0 or age_max < _AGE_OPEN):
+                continue
+            if range_sex not in (SEX_ANY, sex_code):
+                continue
+            return {"min": low, "max": high}
+        return None
+
+
+_catalog: Optional[LabCatalog] = None
+
+
+def get_lab_catalog() -> LabCatalog:
+    """Process-wide catalog, compiling the JSON source first if the binary is missing or stale"""
+    global _catalog
+    if _catalog is None:
+        path = settings.lab_catalog_path
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(CATALOG_SOURCE):
+            compile_catalog(CATALOG_SOURCE, path)
+        try:
+            _catalog = LabCatalog(path)
+        except ValueError:
+            # Written by an older build with a different format
+            _catalog = LabCatalog(compile_catalog(CATALOG_SOURCE, path))
+    return _catalog
+
+
+if __name__ == "__main__":
+    print(f"✅ Lab catalog compiled to {compile_catalog()}")
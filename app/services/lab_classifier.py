@@ -0,0 +1,87 @@
+"""
+Vectorized lab result classification against reference ranges.
+
+Status codes follow STATUS_BY_CODE: 0 normal, 1 high, 2 low. Severity is the
+distance outside the reference range divided by the range width (or by the
+violated bound when the range has no width), and 0.0 inside the range.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.schemas import LabResultStatus
+
+STATUS_NORMAL, STATUS_HIGH, STATUS_LOW = 0, 1, 2
+STATUS_BY_CODE = (LabResultStatus.NORMAL, LabResultStatus.HIGH, LabResultStatus.LOW)
+CODE_BY_STATUS = {status.value: code for code, status in enumerate(STATUS_BY_CODE)}
+_NO_RANGE: Dict[str, Optional[float]] = {}
+
+
+def classify(values, ref_min, ref_max) -> Tuple[Any, Any]:
+    """
+    Classify arrays of values against their reference minima and maxima.
+    Missing bounds are passed as NaN and never trigger their side. Returns
+    (status_codes, severity) arrays.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ref_min = np.asarray(ref_min, dtype=np.float64)
+    ref_max = np.asarray(ref_max, dtype=np.float64)
+
+    high = values > ref_max
+    low = values < ref_min
+    codes = np.zeros(values.shape, dtype=np.int8)
+    codes[high] = STATUS_HIGH
+    codes[low & ~high] = STATUS_LOW
+
+    width = ref_max - ref_min
+    with np.errstate(invalid="ignore", divide="ignore"):
+        high_scale = np.where(width > 0, width, np.maximum(np.abs(ref_max), 1.0))
+        low_scale = np.where(width > 0, width, np.maximum(np.abs(ref_min), 1.0))
+        severity = np.where(high, (values - ref_max) / high_scale, 0.0)
+        severity = np.where(low & ~high, (ref_min - values) / low_scale, severity)
+    return codes, severity
+
+
+def classify_rows(rows: Sequence[Dict[str, Any]]) -> Tuple[Any, Any]:
+    """Classify lab result dicts (with a reference_range of min/max) in one call"""
+    refs = [row.get("reference_range") or _NO_RANGE for row in rows]
+    # A float array turns missing (None) bounds into NaN
+    values = np.fromiter([row["value"] for row in rows], dtype=np.float64, count=len(rows))
+    ref_min = np.array([ref.get("min") for ref in refs], dtype=np.float64)
+    ref_max = np.array([ref.get("max") for ref in refs], dtype=np.float64)
+    return classify(values, ref_min, ref_max)
+
+
+def fill_missing_statuses(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set a computed status on every row that arrived without one"""
+    pending = [row for row in rows if not row.get("status")]
+    if pending:
+        codes, _ = classify_rows(pending)
+        for row, code in zip(pending, codes):
+            row["status"] = STATUS_BY_CODE[code].value
+    return rows
+
+
+def effective_status_codes(rows: Sequence[Dict[str, Any]]) -> List[int]:
+    """
+    Status code of every row computed from its reference range. Rows without
+    any reference bound keep their stored status.
+    """
+    if not rows:
+        return []
+    codes, _ = classify_rows(rows)
+    effective = []
+    for row, code in zip(rows, codes):
+        ref = row.get("reference_range") or {}
+        if ref.get("min") is None and ref.get("max") is None:
+            status = row.get("status")
+            effective.append(CODE_BY_STATUS.get(getattr(status, "value", status), STATUS_NORMAL))
+        else:
+            effective.append(int(code))
+    return effective
+
+
+def with_effective_statuses(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of the rows with the status effective_status_codes computes for them"""
+    codes = effective_status_codes(rows)
+    return [{**row, "status": STATUS_BY_CODE[code].value} for row, code in zip(rows, codes)]
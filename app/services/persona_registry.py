@@ -0,0 +1,265 @@
+"""
+Immutable persona registry.
+
+Every persona's display configuration (name, category, description,
+strengths, focus areas, dashboard type and UI preferences) is defined once
+here and frozen when the module is imported. Each entry also carries its
+read-only response bodies pre-encoded as JSON bytes, so the persona info and
+template endpoints return stored bytes instead of building and serializing a
+dict on every request.
+"""
+import json
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple
+
+from app.models.schemas import PersonaType
+
+PERSONA_CONFIGS: Dict[PersonaType, Dict[str, Any]] = {
+    PersonaType.DETAIL_ORIENTED: {
+        "name": "THE ANALYST",
+        "category": "Detail-Focused Management",
+        "description": "You love diving deep into your health data and tracking every detail",
+        "strengths": ["Thorough data analysis", "Consistent tracking", "Pattern recognition"],
+        "focus_areas": ["Avoid analysis paralysis", "Set actionable goals"],
+        "dashboard_type": "Comprehensive analytics with detailed charts and trends",
+        "ui_preferences": {
+            "show_detailed_charts": True,
+            "show_trends": True,
+            "show_raw_data": True,
+            "complexity_level": "high"
+        }
+    },
+    PersonaType.HEALTH_CONSCIOUS: {
+        "name": "THE GUARDIAN",
+        "category": "Preventive Health Focus",
+        "description": "You prioritize managing specific health conditions and prevention",
+        "strengths": ["Health awareness", "Preventive mindset", "Medical compliance"],
+        "focus_areas": ["Stress management", "Lifestyle balance"],
+        "dashboard_type": "Condition-focused dashboard with medical insights",
+        "ui_preferences": {
+            "show_medical_context": True,
+            "highlight_abnormal": True,
+            "simple_language": True,
+            "complexity_level": "medium"
+        }
+    },
+    PersonaType.BEGINNER: {
+        "name": "THE LEARNER",
+        "category": "Simple Health Start",
+        "description": "You prefer straightforward, easy-to-understand health information",
+        "strengths": ["Willingness to learn", "Appreciation for simplicity", "Step-by-step approach"],
+        "focus_areas": ["Building confidence", "Gradual complexity increase"],
+        "dashboard_type": "Simplified interface with educational content",
+        "ui_preferences": {
+            "simple_language": True,
+            "show_explanations": True,
+            "minimal_complexity": True,
+            "complexity_level": "low"
+        }
+    },
+    PersonaType.TECH_SAVVY: {
+        "name": "THE INNOVATOR",
+        "category": "Technology-Enhanced Health",
+        "description": "You leverage technology and devices to automate your health tracking",
+        "strengths": ["Device integration", "Automation", "Tech adoption"],
+        "focus_areas": ["Data accuracy validation", "Human touch points"],
+        "dashboard_type": "Connected dashboard with device integrations",
+        "ui_preferences": {
+            "show_technical_details": True,
+            "enable_integrations": True,
+            "advanced_features": True,
+            "complexity_level": "high"
+        }
+    },
+    PersonaType.QUICK_BOLD: {
+        "name": "THE ACHIEVER",
+        "category": "Fast-Action Health",
+        "description": "You want quick insights and immediate actionable recommendations",
+        "strengths": ["Quick decision making", "Goal-oriented", "Action-focused"],
+        "focus_areas": ["Patience for long-term trends", "Detailed planning"],
+        "dashboard_type": "Streamlined view with key metrics and instant actions",
+        "ui_preferences": {
+            "show_summary_only": True,
+            "highlight_actions": True,
+            "minimal_details": True,
+            "complexity_level": "low"
+        }
+    },
+    PersonaType.BALANCED: {
+        "name": "THE BALANCED USER",
+        "category": "Balanced Health Management",
+        "description": "You take a moderate approach to health management, balancing detail with simplicity",
+        "strengths": ["Practical decisions", "Balanced information needs", "Flexible approach"],
+        "focus_areas": ["Maintain consistency", "Find sustainable habits"],
+        "dashboard_type": "Balanced view with moderate detail and clear summaries",
+        "ui_preferences": {
+            "show_detailed_charts": True,
+            "show_trends": True,
+            "show_raw_data": False,
+            "complexity_level": "medium",
+            "show_medical_context": True,
+            "highlight_abnormal": True,
+            "simple_language": False
+        }
+    },
+    PersonaType.GOAL_FOCUSED: {
+        "name": "THE GOAL SETTER",
+        "category": "Goal-Oriented Health",
+        "description": "You are motivated by setting and achieving specific health goals",
+        "strengths": ["Target achievement", "Motivation", "Progress tracking"],
+        "focus_areas": ["Realistic goal setting", "Long-term sustainability"],
+        "dashboard_type": "Goal-focused dashboard with progress tracking",
+        "ui_preferences": {
+            "show_progress_bars": True,
+            "highlight_goals": True,
+            "show_achievements": True,
+            "complexity_level": "medium"
+        }
+    },
+    PersonaType.ANALYTICAL: {
+        "name": "THE ANALYST",
+        "category": "Data-Driven Health",
+        "description": "You prefer detailed analysis and comprehensive data views",
+        "strengths": ["Data interpretation", "Pattern recognition", "Thorough analysis"],
+        "focus_areas": ["Actionable insights", "Avoiding analysis paralysis"],
+        "dashboard_type": "Analytics-heavy dashboard with detailed charts and trends",
+        "ui_preferences": {
+            "show_detailed_charts": True,
+            "show_trends": True,
+            "show_raw_data": True,
+            "complexity_level": "high",
+            "show_correlations": True
+        }
+    },
+    PersonaType.FAST_ACTION: {
+        "name": "THE EXECUTOR",
+        "category": "Immediate Action Health",
+        "description": "You prefer quick, actionable health insights with immediate next steps",
+        "strengths": ["Quick implementation", "Action orientation", "Decisiveness"],
+        "focus_areas": ["Comprehensive planning", "Long-term thinking"],
+        "dashboard_type": "Action-focused dashboard with immediate recommendations",
+        "ui_preferences": {
+            "show_action_items": True,
+            "highlight_urgent": True,
+            "minimal_analysis": True,
+            "complexity_level": "low"
+        }
+    },
+    PersonaType.INTERMEDIATE: {
+        "name": "THE STEADY TRACKER",
+        "category": "Consistent Health Management",
+        "description": "You maintain steady engagement with moderate detail preferences",
+        "strengths": ["Consistency", "Steady progress", "Balanced approach"],
+        "focus_areas": ["Avoiding monotony", "Finding motivation"],
+        "dashboard_type": "Standard dashboard with consistent features",
+        "ui_preferences": {
+            "show_trends": True,
+            "moderate_detail": True,
+            "consistent_layout": True,
+            "complexity_level": "medium"
+        }
+    },
+    PersonaType.CASUAL: {
+        "name": "THE CASUAL USER",
+        "category": "Low-Maintenance Health",
+        "description": "You prefer simple, low-effort health tracking with minimal complexity",
+        "strengths": ["Simplicity", "Low maintenance", "Easy adoption"],
+        "focus_areas": ["Staying engaged", "Finding value in simplicity"],
+        "dashboard_type": "Simple dashboard with essential information only",
+        "ui_preferences": {
+            "simple_language": True,
+            "minimal_features": True,
+            "easy_navigation": True,
+            "complexity_level": "low"
+        }
+    },
+    PersonaType.PASSIVE: {
+        "name": "THE OBSERVER",
+        "category": "Passive Health Monitoring",
+        "description": "You prefer automated tracking with minimal active engagement",
+        "strengths": ["Automated data collection", "Background monitoring", "Low effort"],
+        "focus_areas": ["Relevant notifications", "When to take action"],
+        "dashboard_type": "Automated dashboard with smart alerts and summaries",
+        "ui_preferences": {
+            "automated_insights": True,
+            "minimal_interaction": True,
+            "smart_alerts": True,
+            "complexity_level": "low"
+        }
+    },
+    PersonaType.ACTION_ORIENTED: {
+        "name": "THE DOER",
+        "category": "Action-Based Health",
+        "description": "You prefer taking immediate action on health insights and recommendations",
+        "strengths": ["Quick implementation", "Results-driven", "Proactive"],
+        "focus_areas": ["Strategic thinking", "Long-term planning"],
+        "dashboard_type": "Action-focused dashboard with clear next steps",
+        "ui_preferences": {
+            "show_action_items": True,
+            "highlight_actions": True,
+            "complexity_level": "medium"
+        }
+    }
+}
+
+
+def encode_json(value: Any) -> bytes:
+    """Compact UTF-8 JSON, matching FastAPI's JSONResponse; frozen mappings encode as objects"""
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        default=lambda o: dict(o) if isinstance(o, MappingProxyType) else o
+    ).encode("utf-8")
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class PersonaEntry(NamedTuple):
+    persona: PersonaType
+    config: Mapping[str, Any]           # Read-only; lists are tuples
+    info_json: bytes                    # The config
+    ui_preferences_json: bytes
+    summary_json: bytes                 # The config plus "persona_id"
+
+
+def generic_persona_info(persona_type: str) -> Dict[str, Any]:
+    """Placeholder configuration for a persona name the registry does not know"""
+    label = persona_type.title().replace("-", " ")
+    return {
+        "persona_id": persona_type,
+        "name": f"The {label} User",
+        "category": f"{label} Health Management",
+        "description": f"You have a {persona_type.replace('-', ' ')} approach to health management",
+        "strengths": ["Personalized approach", "Unique perspective"],
+        "focus_areas": ["Finding your optimal health strategy"],
+    }
+
+
+def _build() -> Mapping[PersonaType, PersonaEntry]:
+    missing = set(PersonaType) - set(PERSONA_CONFIGS)
+    if missing:
+        raise ValueError(f"Persona registry has no configuration for: {', '.join(sorted(p.value for p in missing))}")
+    return MappingProxyType({
+        persona: PersonaEntry(
+            persona=persona,
+            config=_freeze(config),
+            info_json=encode_json(config),
+            ui_preferences_json=encode_json(config["ui_preferences"]),
+            summary_json=encode_json({**config, "persona_id": persona.value}),
+        )
+        for persona, config in PERSONA_CONFIGS.items()
+    })
+
+
+PERSONAS: Mapping[PersonaType, PersonaEntry] = _build()
+# Routers receive persona names as plain path strings
+PERSONAS_BY_NAME: Mapping[str, PersonaEntry] = MappingProxyType({p.value: entry for p, entry in PERSONAS.items()})
+
+
+def get_persona_entry(persona: PersonaType) -> PersonaEntry:
+    return PERSONAS[persona]
@@ -0,0 +1,290 @@
+"""
+Persona rules compiled into a decision table.
+
+The rules are split by age band. Inside a band the first matching rule wins,
+and if none match the band's default applies. A rule tests one of two things:
+the user's conditions, where it matches when a listed condition contains one
+of its terms (or, with no terms, when any conditions are listed), or one
+questionnaire answer.
+
+Those rules only ever look at a few facts about the inputs. These are the age
+band, which condition tests match, and whether each questionnaire answer is
+one of the values some rule compares it with. Each fact becomes a small
+integer code. Every combination of codes is evaluated once, ahead of time,
+into a flat table of personas. Classifying a user is then a handful of
+lookups and one table index, and a batch of users is the same index arithmetic
+over NumPy code arrays. A conditions string is parsed into a normalized set
+once per distinct string.
+
+The rules are read from app/data/persona_rules.json, or the file named by
+PERSONA_RULES_PATH. reload_persona_rules recompiles them when that file
+changes and swaps the new table in with a single assignment, so a request
+always classifies against one complete rule set. The file's "revision" orders
+rule sets: a stored persona is only recomputed by a worker whose rules have a
+higher revision than the ones it was stored under, so workers that have not
+picked up a change yet never overwrite personas from the newer rules.
+"""
+import bisect
+import functools
+import hashlib
+import itertools
+import json
+import math
+import operator
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.schemas import PersonaType
+from app.services.config_files import data_path, file_signature, load_document
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using the bundled persona rules")
+    class MockSettings:
+        persona_rules_path = ""
+    settings = MockSettings()
+
+CONDITIONS = "conditions"
+QUESTIONNAIRE_FIELDS = ("tracking_style", "motivation", "time_spent", "tech_comfort", "dashboard_preference")
+PERSONA_RULES_SOURCE = data_path("", "persona_rules.json")
+
+
+class Rule(NamedTuple):
+    field: str                                  # "conditions" or a questionnaire field
+    match: Tuple[str, ...]                      # condition terms, or the one answer compared against
+    persona: PersonaType
+
+
+class AgeBand(NamedTuple):
+    min_age: Optional[int]                      # None for the lowest band, which takes every other age
+    rules: Tuple[Rule, ...]
+    default: PersonaType
+
+
+def parse_rules(document: Dict[str, Any]) -> Tuple[AgeBand, ...]:
+    """Age bands of a persona rules document (see app/data/persona_rules.json)"""
+    try:
+        return tuple(
+            AgeBand(
+                band["min_age"],
+                tuple(Rule(rule["field"], tuple(rule["match"]), PersonaType(rule["persona"])) for rule in band["rules"]),
+                PersonaType(band["default"])
+            )
+            for band in document["bands"]
+        )
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed persona rules: {e!r}")
+
+
+def rules_revision(document: Dict[str, Any]) -> int:
+    """Revision of a persona rules document; 0 when it has none"""
+    revision = document.get("revision", 0)
+    if not isinstance(revision, int) or isinstance(revision, bool) or revision < 0:
+        raise ValueError(f"Malformed persona rules: revision must be a non-negative integer, not {revision!r}")
+    return revision
+
+
+def load_rules(path: str = PERSONA_RULES_SOURCE) -> Tuple[AgeBand, ...]:
+    return parse_rules(load_document(path))
+
+
+def compile_rules(path: str) -> "PersonaRules":
+    """Load and compile a persona rules file together with its revision"""
+    document = load_document(path)
+    return PersonaRules(parse_rules(document), rules_revision(document))
+
+
+# The bundled rules; deployments may point PERSONA_RULES_PATH at their own file
+DEFAULT_RULES: Tuple[AgeBand, ...] = load_rules()
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_conditions(conditions: str) -> FrozenSet[str]:
+    """Normalized set of the comma-separated conditions in a profile"""
+    return frozenset(c.strip().lower() for c in conditions.split(",") if c.strip())
+
+
+def rules_version(bands: Sequence[AgeBand], revision: int = 0) -> str:
+    """Revision and digest identifying a rule set, such as 3-9f86d081884c7d65"""
+    spec = [
+        [band.min_age, [[rule.field, list(rule.match), rule.persona.value] for rule in band.rules], band.default.value]
+        for band in sorted(bands, key=lambda band: -1 if band.min_age is None else band.min_age)
+    ]
+    digest = hashlib.sha256(json.dumps(spec, separators=(",", ":")).encode()).hexdigest()[:16]
+    return f"{revision}-{digest}"
+
+
+def version_revision(version: Optional[str]) -> int:
+    """Revision part of a stored rules version; -1 for a missing or unrecognized one"""
+    revision, _, _ = (version or "").partition("-")
+    return int(revision) if revision.isdigit() else -1
+
+
+def input_fingerprint(age: int, conditions: Optional[str] = None, questionnaire: Any = None) -> str:
+    """Digest of everything a persona is computed from; the questionnaire may be a model or its dict"""
+    if questionnaire is not None and not isinstance(questionnaire, dict):
+        questionnaire = questionnaire.model_dump()
+    payload = json.dumps([age, conditions, questionnaire], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class _Memo(dict):
+    """Dict that fills missing keys from a function"""
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, key):
+        value = self[key] = self.function(key)
+        return value
+
+
+class PersonaRules:
+    """Decision table compiled from age-band rules"""
+
+    def __init__(self, bands: Sequence[AgeBand] = DEFAULT_RULES, revision: int = 0):
+        bands = sorted(bands, key=lambda band: -1 if band.min_age is None else band.min_age)
+        if not bands or bands[0].min_age is not None or any(band.min_age is None for band in bands[1:]):
+            raise ValueError("Persona rules need exactly one age band without a minimum age")
+        self.bands: Tuple[AgeBand, ...] = tuple(bands)
+        self.revision = revision
+        self.version: str = rules_version(bands, revision)
+        self.age_edges: List[int] = [band.min_age for band in bands[1:]]
+
+        # Bit 0 of a condition code: any conditions listed; bit i + 1: term set i matches
+        rules = [rule for band in bands for rule in band.rules]
+        self.condition_terms: List[Tuple[str, ...]] = list(dict.fromkeys(r.match for r in rules if r.field == CONDITIONS and r.match))
+        # Answer code 0 is any answer no rule compares with, including a missing questionnaire
+        self.fields: List[str] = list(dict.fromkeys(r.field for r in rules if r.field != CONDITIONS))
+        unknown = set(self.fields) - set(QUESTIONNAIRE_FIELDS)
+        if unknown:
+            raise ValueError(f"Persona rules test unknown fields: {', '.join(sorted(unknown))}")
+        self.answer_codes: List[Dict[str, int]] = []
+        for field in self.fields:
+            answers = dict.fromkeys(r.match[0] for r in rules if r.field == field)
+            self.answer_codes.append({answer: code for code, answer in enumerate(answers, start=1)})
+
+        shape = [len(bands), 2 ** (len(self.condition_terms) + 1)] + [len(codes) + 1 for codes in self.answer_codes]
+        self.shape: Tuple[int, ...] = tuple(shape)
+        self.strides: Tuple[int, ...] = tuple(math.prod(shape[i + 1:]) for i in range(len(shape)))
+        self.personas: List[PersonaType] = list(PersonaType)
+        persona_codes = {persona: code for code, persona in enumerate(self.personas)}
+        self.table: List[int] = [
+            persona_codes[self._evaluate(band, condition_code, answer_codes)]
+            for band, condition_code, *answer_codes in itertools.product(*(range(n) for n in shape))
+        ]
+        self._persona_array = np.asarray(self.personas, dtype=object)[self.table]
+        self._get_answers = operator.attrgetter(*self.fields) if self.fields else None
+        # Stored questionnaires come back from the data backends as dicts
+        self._get_items = operator.itemgetter(*self.fields) if self.fields else None
+        self.condition_offset = functools.lru_cache(maxsize=4096)(self.condition_offset)
+        self.answer_offset = functools.lru_cache(maxsize=4096)(self.answer_offset)
+
+    def supersedes(self, version: Optional[str]) -> bool:
+        """Whether a persona stored under a rules version is older than these rules"""
+        return version_revision(version) < self.revision
+
+    def _evaluate(self, band: int, condition_code: int, answer_codes: Sequence[int]) -> PersonaType:
+        """Walk one band's rules for a combination of codes (compile time only)"""
+        for rule in self.bands[band].rules:
+            if rule.field == CONDITIONS:
+                bit = self.condition_terms.index(rule.match) + 1 if rule.match else 0
+                if condition_code >> bit & 1:
+                    return rule.persona
+            else:
+                index = self.fields.index(rule.field)
+                if answer_codes[index] == self.answer_codes[index][rule.match[0]]:
+                    return rule.persona
+        return self.bands[band].default
+
+    def condition_offset(self, conditions: Optional[str]) -> int:
+        """Table offset of a conditions string"""
+        if not conditions:
+            return 0
+        parsed = parse_conditions(conditions)
+        code = 1
+        for bit, terms in enumerate(self.condition_terms, start=1):
+            if any(term in condition for condition in parsed for term in terms):
+                code |= 1 << bit
+        return code * self.strides[1]
+
+    def answer_offset(self, answers: Any) -> int:
+        """Table offset of the answers to the tested fields, as returned by _get_answers or _get_items"""
+        if len(self.fields) == 1:
+            answers = (answers,)
+        return sum(codes.get(answer, 0) * stride for answer, codes, stride in zip(answers, self.answer_codes, self.strides[2:]))
+
+    def classify(self, age: int, conditions: Optional[str] = None, questionnaire: Any = None) -> PersonaType:
+        """Persona of one user; the questionnaire is a QuestionnaireResponse, its dict or None"""
+        index = bisect.bisect_right(self.age_edges, age) * self.strides[0] + self.condition_offset(conditions)
+        if questionnaire is not None and self._get_answers is not None:
+            get = self._get_items if isinstance(questionnaire, dict) else self._get_answers
+            index += self.answer_offset(get(questionnaire))
+        return self.personas[self.table[index]]
+
+    def classify_batch(
+        self,
+        ages: Sequence[int],
+        conditions: Optional[Sequence[Optional[str]]] = None,
+        questionnaires: Optional[Sequence[Any]] = None
+    ) -> List[PersonaType]:
+        """Personas of parallel arrays of ages, conditions and questionnaires"""
+        index = np.searchsorted(self.age_edges, np.asarray(ages), side="right") * self.strides[0]
+        if conditions is not None:
+            # Each distinct conditions string is parsed once per batch
+            offsets = _Memo(self.condition_offset)
+            index += np.array([offsets[c] for c in conditions], dtype=np.int64)
+        if questionnaires is not None and self._get_answers is not None:
+            offsets, get_answers, get_items = _Memo(self.answer_offset), self._get_answers, self._get_items
+            index += np.array([
+                0 if q is None else offsets[get_items(q) if isinstance(q, dict) else get_answers(q)] for q in questionnaires
+            ], dtype=np.int64)
+        return self._persona_array[index].tolist()
+
+
+_rules: Optional[PersonaRules] = None
+_rules_signature: Optional[Tuple[int, int]] = None
+
+
+def get_persona_rules() -> PersonaRules:
+    """Process-wide compiled persona rules"""
+    global _rules, _rules_signature
+    if _rules is None:
+        path = data_path(settings.persona_rules_path, "persona_rules.json")
+        _rules_signature = file_signature(path)
+        _rules = compile_rules(path)
+    return _rules
+
+
+def reload_persona_rules() -> Optional[PersonaRules]:
+    """
+    Recompile the rules if their file changed since it was last read and swap
+    them in. Returns the new rules when their version differs from the old
+    ones, else None. A file that fails to load or compile, or that changes the
+    rules without raising their revision, is reported and the current rules
+    stay in place until the file changes again.
+    """
+    global _rules, _rules_signature
+    current = get_persona_rules()
+    path = data_path(settings.persona_rules_path, "persona_rules.json")
+    signature = file_signature(path)
+    if signature == _rules_signature:
+        return None
+    _rules_signature = signature
+    try:
+        rules = compile_rules(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Persona rules reload failed, keeping version {current.version}: {e}")
+        return None
+    if rules.version == current.version:
+        return None
+    if rules.revision <= current.revision:
+        print(f"❌ Persona rules changed without a higher revision, keeping version {current.version}")
+        return None
+    _rules = rules
+    print(f"🧭 Persona rules reloaded: version {current.version} -> {rules.version}")
+    return rules
@@ -0,0 +1,75 @@
+"""
+AI prompts compiled from the persona templates.
+
+Each persona's "prompts" section is rendered once into a PromptTemplate: the
+whole prompt text with a single slot for the user context. The context is
+serialized as compact JSON with sorted keys and empty values dropped, so the
+same context always produces the same prompt, byte for byte. Only the
+context's tokens are counted per render; the template's are counted once.
+Rendering is two string concatenations, so rendered prompts are not cached:
+any cache key would need the serialized context anyway.
+"""
+import json
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_CONTEXT_SLOT = "\x00context\x00"
+
+PROMPT_TEMPLATE = """You are a health AI assistant providing personalized lab result explanations.
+
+Persona Context:
+- Communication Style: {tone}
+- Complexity Level: {complexity}
+- Primary Focus: {focus}
+
+Instructions: {instruction}
+
+User Context: {context}
+
+Please analyze the provided lab results and provide a response that matches this persona's preferences."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: words and punctuation marks"""
+    return len(_TOKEN.findall(text))
+
+
+def _compact(value: Any) -> Any:
+    if isinstance(value, dict):
+        items = ((key, _compact(item)) for key, item in value.items())
+        return {key: item for key, item in items if item not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_compact(item) for item in value]
+    return value
+
+
+def serialize_context(context: Optional[Dict[str, Any]]) -> str:
+    """Deterministic compact JSON of a user context; None and empty values are left out"""
+    return json.dumps(_compact(context or {}), sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class RenderedPrompt(NamedTuple):
+    text: str
+    tokens: int
+
+
+class PromptTemplate:
+    """A persona's prompt with everything but the user context filled in"""
+    __slots__ = ("head", "tail", "static_tokens")
+
+    def __init__(self, prompts: Dict[str, Any]):
+        text = PROMPT_TEMPLATE.format(
+            tone=prompts.get("tone", "professional"),
+            complexity=prompts.get("complexity", "medium"),
+            focus=prompts.get("focus", "general_health"),
+            instruction=prompts.get("ai_instruction", "Provide a helpful summary of the lab results."),
+            context=_CONTEXT_SLOT
+        )
+        self.head, self.tail = text.split(_CONTEXT_SLOT)
+        self.static_tokens = estimate_tokens(self.head) + estimate_tokens(self.tail)
+
+    def render(self, context: Optional[Dict[str, Any]] = None) -> RenderedPrompt:
+        """The prompt for a user context"""
+        serialized = serialize_context(context)
+        return RenderedPrompt(self.head + serialized + self.tail, self.static_tokens + estimate_tokens(serialized))
@@ -0,0 +1,356 @@
+"""
+Hash-sharded data backend: user data spread over several SQLDataBackend shards.
+
+A user id hashes (crc32) to one of a fixed number of virtual buckets, and the
+shard map assigns every bucket to a shard database URL. The hash never changes;
+adding or removing a shard only reassigns buckets, and rebalance() moves the
+users of the reassigned buckets before the new map takes effect. All of a
+user's rows live on one shard, so every per-user query stays single-shard.
+
+Running servers check the map file every SHARD_MAP_RELOAD_INTERVAL seconds and
+switch to a newer version; rebalance() waits that long after saving the map
+before it deletes the moved users from their old shards.
+"""
+import asyncio
+import json
+import os
+import zlib
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.sql_data_backend import SQLDataBackend
+
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using default shard layout")
+    class MockSettings:
+        shard_database_urls = "sqlite:///./healthlens-shard0.db,sqlite:///./healthlens-shard1.db"
+        shard_map_path = "./shard_map.json"
+        shard_virtual_buckets = 1024
+        shard_map_reload_interval = 2.0
+    settings = MockSettings()
+
+DEFAULT_VIRTUAL_BUCKETS = 1024
+
+
+def bucket_of(user_id: str, bucket_count: int) -> int:
+    """Stable virtual bucket of a user id"""
+    return zlib.crc32(str(user_id).encode("utf-8")) % bucket_count
+
+
+class ShardMap:
+    """Assignment of virtual buckets to shard database URLs"""
+
+    def __init__(self, shards: List[str], buckets: List[int], version: int = 1):
+        if not shards:
+            raise ValueError("A shard map needs at least one shard")
+        if any(not 0 <= shard < len(shards) for shard in buckets):
+            raise ValueError("Shard map assigns a bucket to an unknown shard")
+        self.shards = list(shards)
+        self.buckets = list(buckets)
+        self.version = version
+
+    @classmethod
+    def uniform(cls, shards: List[str], bucket_count: int = DEFAULT_VIRTUAL_BUCKETS) -> "ShardMap":
+        return cls(shards, [bucket % len(shards) for bucket in range(bucket_count)])
+
+    @classmethod
+    def load(cls, path: str) -> "ShardMap":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["shards"], data["buckets"], data.get("version", 1))
+
+    def save(self, path: str):
+        """Write the map atomically so readers never see a partial file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.version, "shards": self.shards, "buckets": self.buckets}, f)
+        os.replace(tmp_path, path)
+
+    def bucket_of(self, user_id: str) -> int:
+        return bucket_of(user_id, len(self.buckets))
+
+    def shard_of(self, user_id: str) -> str:
+        return self.shards[self.buckets[self.bucket_of(user_id)]]
+
+    def with_shards(self, shards: List[str]) -> "ShardMap":
+        """
+        New map over `shards` with buckets spread evenly, keeping as many
+        buckets as possible on the shard they are already on.
+        """
+        total = len(self.buckets)
+        quota = [total // len(shards) + (1 if i < total % len(shards) else 0) for i in range(len(shards))]
+        index = {url: i for i, url in enumerate(shards)}
+        load = [0] * len(shards)
+        assigned: List[Optional[int]] = [None] * total
+        for bucket, shard in enumerate(self.buckets):
+            i = index.get(self.shards[shard])
+            if i is not None and load[i] < quota[i]:
+                assigned[bucket] = i
+                load[i] += 1
+        free = iter([i for i in range(len(shards)) for _ in range(quota[i] - load[i])])
+        for bucket in range(total):
+            if assigned[bucket] is None:
+                assigned[bucket] = next(free)
+        return ShardMap(shards, assigned, self.version + 1)
+
+    def moves(self, new_map: "ShardMap") -> Dict[Tuple[str, str], List[int]]:
+        """Buckets whose shard changes, grouped by (source URL, target URL)"""
+        if len(new_map.buckets) != len(self.buckets):
+            raise ValueError("Shard maps must have the same number of virtual buckets")
+        moved: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for bucket, (old, new) in enumerate(zip(self.buckets, new_map.buckets)):
+            if self.shards[old] != new_map.shards[new]:
+                moved[(self.shards[old], new_map.shards[new])].append(bucket)
+        return dict(moved)
+
+
+def load_shard_map(path: Optional[str] = None) -> ShardMap:
+    """Shard map at `path`, created from the configured shard URLs on first use"""
+    path = path or settings.shard_map_path
+    if os.path.exists(path):
+        return ShardMap.load(path)
+    urls = [url.strip() for url in settings.shard_database_urls.split(",") if url.strip()]
+    shard_map = ShardMap.uniform(urls, settings.shard_virtual_buckets)
+    shard_map.save(path)
+    return shard_map
+
+
+def _partition_seed_data(seed_data: Dict[str, Any], shard_map: ShardMap) -> Dict[str, Dict[str, Any]]:
+    parts: Dict[str, Dict[str, Any]] = {url: {} for url in shard_map.shards}
+    for section, by_user in seed_data.items():
+        for user_id, value in by_user.items():
+            parts[shard_map.shard_of(user_id)].setdefault(section, {})[user_id] = value
+    return parts
+
+
+class ShardedDataBackend:
+    """DataService backend routing each user to one of several SQLite shards"""
+
+    def __init__(
+        self,
+        shard_map: ShardMap,
+        pool_size: int = 5,
+        seed_data: Optional[Dict[str, Any]] = None,
+        map_path: Optional[str] = None,
+        reload_interval: float = 0
+    ):
+        self.shard_map = shard_map
+        self.map_path = map_path
+        self.reload_interval = reload_interval
+        self.pool_size = pool_size
+        seeds = _partition_seed_data(seed_data, shard_map) if seed_data else {}
+        self.shards: Dict[str, SQLDataBackend] = {
+            url: SQLDataBackend(url, pool_size, seeds.get(url) or None) for url in shard_map.shards
+        }
+        self._create_lock = asyncio.Lock()
+        self._map_mtime = self._stat_map()
+        self._map_watch: Optional[asyncio.Task] = None
+
+    def _shard(self, user_id: str) -> SQLDataBackend:
+        return self.shards[self.shard_map.shard_of(user_id)]
+
+    def _group_by_shard(self, user_ids: List[str]) -> Dict[str, List[str]]:
+        grouped: Dict[str, List[str]] = defaultdict(list)
+        for user_id in user_ids:
+            grouped[self.shard_map.shard_of(user_id)].append(user_id)
+        return grouped
+
+    async def connect(self):
+        await asyncio.gather(*(shard.connect() for shard in self.shards.values()))
+        if self.map_path and self.reload_interval > 0 and self._map_watch is None:
+            self._map_watch = asyncio.create_task(self._watch_map())
+
+    async def disconnect(self):
+        if self._map_watch is not None:
+            self._map_watch.cancel()
+            try:
+                await self._map_watch
+            except asyncio.CancelledError:
+                pass
+            self._map_watch = None
+        await asyncio.gather(*(shard.disconnect() for shard in self.shards.values()))
+
+    def _stat_map(self) -> Optional[int]:
+        try:
+            return os.stat(self.map_path).st_mtime_ns if self.map_path else None
+        except OSError:
+            return None
+
+    async def reload_shard_map(self) -> bool:
+        """Switch to the map file's version if a rebalance saved a newer one"""
+        mtime = self._stat_map()
+        if mtime is None or mtime == self._map_mtime:
+            return False
+        self._map_mtime = mtime
+        new_map = await asyncio.to_thread(ShardMap.load, self.map_path)
+        if new_map.version <= self.shard_map.version:
+            return False
+        added = [url for url in new_map.shards if url not in self.shards]
+        for url in added:
+            self.shards[url] = SQLDataBackend(url, self.pool_size)
+        await asyncio.gather(*(self.shards[url].connect() for url in added))
+        # Shards dropped from the map stay open until disconnect, for requests still using them
+        self.shard_map = new_map
+        print(f"🔀 Shard map v{new_map.version} loaded")
+        return True
+
+    async def _watch_map(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.reload_shard_map()
+            except Exception as e:
+                print(f"❌ Shard map reload failed: {e}")
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self._shard(user_id).get_user(user_id)
+
+    async def get_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Profiles for many users, read from every involved shard concurrently"""
+        grouped = self._group_by_shard(user_ids)
+        results = await asyncio.gather(*(self.shards[url].get_users(ids) for url, ids in grouped.items()))
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for part in results:
+            profiles.update(part)
+        return profiles
+
+    async def create_user(self, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Ids stay numeric and global: start past the combined row count and
+        # take the first id its own shard accepts (a taken id always collides
+        # on the shard it hashes to, so the primary key settles races)
+        async with self._create_lock:
+            counts = await asyncio.gather(*(shard.max_user_rowid() for shard in self.shards.values()))
+            next_id = sum(counts) + 1
+            while True:
+                profile_data["id"] = str(next_id)
+                if await self._shard(profile_data["id"]).insert_user(profile_data):
+                    return profile_data
+                next_id += 1
+
+    async def update_user(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._shard(user_id).update_user(user_id, profile_data)
+
+    async def get_lab_results(self, user_id: str, report_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        return await self._shard(user_id).get_lab_results(user_id, report_id)
+
+    async def store_lab_results(
+        self,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        report_id: str,
+        collected_at: str,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return await self._shard(user_id).store_lab_results(user_id, results, report_id, collected_at, source)
+
+    async def store_lab_results_batch(self, records: List[Tuple[str, str, str, Optional[str], Dict[str, Any]]]):
+        """Split records by shard and write each shard's part in its own concurrent transaction"""
+        grouped: Dict[str, List[Tuple]] = defaultdict(list)
+        for record in records:
+            grouped[self.shard_map.shard_of(record[0])].append(record)
+        await asyncio.gather(*(self.shards[url].store_lab_results_batch(part) for url, part in grouped.items()))
+
+    async def get_report(self, user_id: str, report_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await self._shard(user_id).get_report(user_id, report_id)
+
+    async def get_report_pair(self, user_id: str, from_id: str, to_id: str) -> Dict[str, Dict[str, Any]]:
+        return await self._shard(user_id).get_report_pair(user_id, from_id, to_id)
+
+    async def list_reports(self, user_id: str) -> List[Dict[str, Any]]:
+        return await self._shard(user_id).list_reports(user_id)
+
+    async def get_lab_results_page(
+        self,
+        user_id: str,
+        report_id: Optional[str] = None,
+        all_reports: bool = False,
+        after: Optional[tuple] = None,
+        limit: int = 100
+    ) -> List[Tuple[tuple, Dict[str, Any]]]:
+        return await self._shard(user_id).get_lab_results_page(user_id, report_id, all_reports, after, limit)
+
+    async def get_analyte_series(self, user_id: str, analyte: str) -> Tuple[List[str], List[float]]:
+        return await self._shard(user_id).get_analyte_series(user_id, analyte)
+
+    async def get_user_bundle(self, user_id: str, report_id: Optional[str] = None) -> Dict[str, Any]:
+        return await self._shard(user_id).get_user_bundle(user_id, report_id)
+
+    async def get_user_history(self, user_id: str) -> Dict[str, Any]:
+        return await self._shard(user_id).get_user_history(user_id)
+
+    async def scan_users(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        for shard in list(self.shards.values()):
+            async for rows in shard.scan_users(batch_size):
+                yield rows
+
+    async def scan_persona_inputs(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        for shard in list(self.shards.values()):
+            async for rows in shard.scan_persona_inputs(batch_size):
+                yield rows
+
+    async def update_personas(self, rows: List[Tuple[str, str, str, str]]):
+        grouped: Dict[str, List[Tuple]] = defaultdict(list)
+        for row in rows:
+            grouped[self.shard_map.shard_of(row[0])].append(row)
+        await asyncio.gather(*(self.shards[url].update_personas(part) for url, part in grouped.items()))
+
+    async def scan_lab_results(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        # A user lives on one shard, so shard-by-shard output stays grouped by user
+        for shard in list(self.shards.values()):
+            async for rows in shard.scan_lab_results(batch_size):
+                yield rows
+
+    async def rebalance(self, new_map: ShardMap, batch_size: int = 500, grace: float = 0) -> Dict[str, int]:
+        """
+        Move users whose bucket changes shard under `new_map`, then switch to it.
+        Users are copied, the map is swapped (and saved to map_path), and only
+        `grace` seconds later, once running servers have reloaded the map, are
+        the source rows deleted. Run it with writes paused: rows written to a
+        source shard mid-copy are not carried over.
+        """
+        for url in new_map.shards:
+            if url not in self.shards:
+                self.shards[url] = SQLDataBackend(url, self.pool_size)
+        await self.connect()
+
+        moves = self.shard_map.moves(new_map)
+        bucket_count = len(new_map.buckets)
+        moved_users: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for source_url in {source for source, _ in moves}:
+            source = self.shards[source_url]
+            for user_id in await source.list_user_ids():
+                target_url = new_map.shards[new_map.buckets[bucket_of(user_id, bucket_count)]]
+                if target_url != source_url:
+                    moved_users[(source_url, target_url)].append(user_id)
+
+        async def copy(source_url: str, target_url: str, user_ids: List[str]):
+            for start in range(0, len(user_ids), batch_size):
+                batch = user_ids[start:start + batch_size]
+                exported = await self.shards[source_url].export_users(batch)
+                await self.shards[target_url].import_users(batch, exported)
+
+        await asyncio.gather(*(copy(source, target, ids) for (source, target), ids in moved_users.items()))
+
+        self.shard_map = new_map
+        if self.map_path:
+            new_map.save(self.map_path)
+            self._map_mtime = self._stat_map()
+        if grace > 0:
+            await asyncio.sleep(grace)
+
+        for (source_url, _), user_ids in moved_users.items():
+            for start in range(0, len(user_ids), batch_size):
+                await self.shards[source_url].delete_users(user_ids[start:start + batch_size])
+
+        # Shards dropped from the map are closed but their files are left in place
+        for url in [url for url in self.shards if url not in new_map.shards]:
+            await self.shards.pop(url).disconnect()
+
+        return {
+            "buckets_moved": sum(len(buckets) for buckets in moves.values()),
+            "users_moved": sum(len(ids) for ids in moved_users.values()),
+            "version": new_map.version,
+        }
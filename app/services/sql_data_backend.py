@@ -0,0 +1,683 @@
+"""
+SQLite persistence backend for DataService.
+
+The schema is declared with SQLAlchemy Core so it can be managed by alembic,
+while queries run on a small pool of long-lived aiosqlite connections. Every
+query is a constant SQL string with bound parameters, so sqlite's per-connection
+statement cache keeps it prepared across calls.
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import aiosqlite
+import sqlalchemy as sa
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+metadata = sa.MetaData()
+
+users = sa.Table(
+    "users",
+    metadata,
+    sa.Column("id", sa.String, primary_key=True),
+    sa.Column("age", sa.Integer, nullable=False),
+    sa.Column("gender", sa.String, nullable=False),
+    sa.Column("conditions", sa.String),
+    sa.Column("created_at", sa.String),
+    sa.Column("questionnaire_responses", sa.Text),  # JSON
+    sa.Column("persona", sa.String),
+    sa.Column("persona_rules_version", sa.String),
+    sa.Column("persona_fingerprint", sa.String),
+)
+
+lab_results = sa.Table(
+    "lab_results",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+    sa.Column("user_id", sa.String, nullable=False),
+    sa.Column("report_id", sa.String),
+    sa.Column("result_date", sa.String, nullable=False),
+    sa.Column("name", sa.String, nullable=False),
+    sa.Column("value", sa.Float, nullable=False),
+    sa.Column("unit", sa.String, nullable=False),
+    sa.Column("ref_min", sa.Float),
+    sa.Column("ref_max", sa.Float),
+    sa.Column("category", sa.String, nullable=False),
+    sa.Column("status", sa.String, nullable=False),
+    sa.Column("original_value", sa.Float),
+    sa.Column("original_unit", sa.String),
+    sa.Index("ix_lab_results_user_report", "user_id", "report_id"),
+    sa.Index("ix_lab_results_user_date", "user_id", "result_date"),
+    sa.Index("ix_lab_results_report", "report_id"),
+)
+# Per-analyte trend lookups match names case-insensitively
+sa.Index(
+    "ix_lab_results_user_name_date",
+    lab_results.c.user_id,
+    lab_results.c.name.collate("NOCASE"),
+    lab_results.c.result_date,
+)
+
+lab_reports = sa.Table(
+    "lab_reports",
+    metadata,
+    sa.Column("report_id", sa.String, nullable=False),
+    sa.Column("user_id", sa.String, nullable=False),
+    sa.Column("collected_at", sa.String, nullable=False),
+    sa.Column("source", sa.String),
+    sa.Column("result_count", sa.Integer, nullable=False),
+    # Report ids come from partner uploads and are only unique per user
+    sa.PrimaryKeyConstraint("user_id", "report_id"),
+    sa.Index("ix_lab_reports_user_collected", "user_id", "collected_at"),
+)
+
+# Pointer to each user's most recently collected report
+latest_reports = sa.Table(
+    "latest_reports",
+    metadata,
+    sa.Column("user_id", sa.String, primary_key=True),
+    sa.Column("report_id", sa.String, nullable=False),
+    sa.Column("collected_at", sa.String, nullable=False),
+)
+
+user_history = sa.Table(
+    "user_history",
+    metadata,
+    sa.Column("user_id", sa.String, primary_key=True),
+    sa.Column("data", sa.Text, nullable=False),
+)
+
+# Queries are kept as constant strings so sqlite can reuse the prepared statements
+_PROFILE_COLUMNS = (
+    "age", "gender", "conditions", "created_at", "questionnaire_responses",
+    "persona", "persona_rules_version", "persona_fingerprint",
+)
+_USER_COLUMNS = ", ".join(("id",) + _PROFILE_COLUMNS)
+_SELECT_USER = f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?"
+_INSERT_USER = f"INSERT INTO users ({_USER_COLUMNS}) VALUES ({', '.join('?' * (len(_PROFILE_COLUMNS) + 1))})"
+_MAX_USER_ROWID = "SELECT COALESCE(MAX(rowid), 0) FROM users"
+_INSERT_USER_IF_ABSENT = _INSERT_USER + " ON CONFLICT(id) DO NOTHING"
+_USER_EXISTS = "SELECT 1 FROM users WHERE id = ?"
+_SELECT_LAB_RESULTS = (
+    "SELECT name, value, unit, ref_min, ref_max, category, status, original_value, original_unit FROM lab_results "
+    "WHERE user_id = ? AND report_id = COALESCE(?, (SELECT report_id FROM latest_reports WHERE user_id = ?)) "
+    "ORDER BY id"
+)
+_PAGE_COLUMNS = (
+    "id, result_date, report_id, name, value, unit, ref_min, ref_max, category, status, original_value, original_unit"
+)
+_REPORT_PAGE_FILTER = "report_id = COALESCE(?, (SELECT report_id FROM latest_reports WHERE user_id = ?))"
+# Keyset pagination over (result_date, id) keeps ordering stable while rows are added
+_SELECT_PAGE_FIRST = (
+    f"SELECT {_PAGE_COLUMNS} FROM lab_results WHERE user_id = ? AND {_REPORT_PAGE_FILTER} "
+    "ORDER BY result_date, id LIMIT ?"
+)
+_SELECT_PAGE_AFTER = (
+    f"SELECT {_PAGE_COLUMNS} FROM lab_results WHERE user_id = ? AND {_REPORT_PAGE_FILTER} "
+    "AND (result_date, id) > (?, ?) ORDER BY result_date, id LIMIT ?"
+)
+_SELECT_ALL_PAGE_FIRST = (
+    f"SELECT {_PAGE_COLUMNS} FROM lab_results WHERE user_id = ? "
+    "ORDER BY result_date, id LIMIT ?"
+)
+_SELECT_ALL_PAGE_AFTER = (
+    f"SELECT {_PAGE_COLUMNS} FROM lab_results WHERE user_id = ? "
+    "AND (result_date, id) > (?, ?) ORDER BY result_date, id LIMIT ?"
+)
+_SELECT_ANALYTE_SERIES = (
+    "SELECT result_date, value FROM lab_results "
+    "WHERE user_id = ? AND name = ? COLLATE NOCASE ORDER BY result_date"
+)
+_DELETE_LAB_RESULTS = "DELETE FROM lab_results WHERE user_id = ? AND report_id = ?"
+_REPORT_COLUMNS = ("report_id", "user_id", "collected_at", "source", "result_count")
+_SELECT_REPORT = (
+    "SELECT report_id, user_id, collected_at, source, result_count FROM lab_reports "
+    "WHERE user_id = ? AND report_id = COALESCE(?, (SELECT report_id FROM latest_reports WHERE user_id = ?))"
+)
+# Both reports of a comparison with their results in one pass over the user/report indexes
+_SELECT_REPORT_PAIR = (
+    "SELECT r.report_id, r.user_id, r.collected_at, r.source, r.result_count, "
+    "l.name, l.value, l.unit, l.ref_min, l.ref_max, l.category, l.status, l.original_value, l.original_unit "
+    "FROM lab_reports r LEFT JOIN lab_results l ON l.user_id = r.user_id AND l.report_id = r.report_id "
+    "WHERE r.user_id = ? AND r.report_id IN (?, ?) ORDER BY l.id"
+)
+_LIST_REPORTS = (
+    "SELECT report_id, user_id, collected_at, source, result_count FROM lab_reports "
+    "WHERE user_id = ? ORDER BY collected_at DESC"
+)
+_UPSERT_REPORT = (
+    "INSERT INTO lab_reports (report_id, user_id, collected_at, source, result_count) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id, report_id) DO UPDATE SET collected_at = excluded.collected_at, "
+    "source = excluded.source, result_count = excluded.result_count"
+)
+_APPEND_REPORT = (
+    "INSERT INTO lab_reports (report_id, user_id, collected_at, source, result_count) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(user_id, report_id) DO UPDATE SET result_count = lab_reports.result_count + excluded.result_count"
+)
+_UPSERT_LATEST_REPORT = (
+    "INSERT INTO latest_reports (user_id, report_id, collected_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET report_id = excluded.report_id, collected_at = excluded.collected_at "
+    "WHERE excluded.collected_at >= latest_reports.collected_at"
+)
+_INSERT_LAB_RESULT = (
+    "INSERT INTO lab_results (user_id, report_id, result_date, name, value, unit, ref_min, ref_max, category, status, "
+    "original_value, original_unit) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT_HISTORY = "SELECT data FROM user_history WHERE user_id = ?"
+_UPSERT_HISTORY = (
+    "INSERT INTO user_history (user_id, data) VALUES (?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data"
+)
+
+# Tables holding per-user rows, with the column that names the user. Used to
+# move users between databases; lab_results ids are reassigned on import.
+_USER_TABLES = (
+    (users, "id"),
+    (lab_results, "user_id"),
+    (lab_reports, "user_id"),
+    (latest_reports, "user_id"),
+    (user_history, "user_id"),
+)
+_SELECT_USER_IDS = (
+    "SELECT id FROM users UNION SELECT user_id FROM lab_reports UNION SELECT user_id FROM user_history"
+)
+# Full-table scans for bulk analytics; lab results come grouped by user in date order
+_SCAN_USERS = "SELECT id, age, gender, conditions, persona FROM users"
+_SCAN_PERSONA_INPUTS = (
+    "SELECT id, age, conditions, questionnaire_responses, persona_rules_version, persona_fingerprint FROM users"
+)
+_UPDATE_PERSONA = "UPDATE users SET persona = ?, persona_rules_version = ?, persona_fingerprint = ? WHERE id = ?"
+_SCAN_LAB_RESULTS = (
+    "SELECT user_id, result_date, name, value, ref_min, ref_max, status FROM lab_results "
+    "ORDER BY user_id, result_date, id"
+)
+# Upper bound for bound parameters in one IN (...) list
+_IN_CHUNK = 500
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """Extract the file path from a sqlite:/// URL"""
+    for prefix in ("sqlite+aiosqlite:///", "sqlite:///"):
+        if database_url.startswith(prefix):
+            return database_url[len(prefix):]
+    raise ValueError(f"Unsupported database URL for SQL backend: {database_url}")
+
+
+def schema_statements() -> List[str]:
+    """DDL for all tables and indexes, safe to run on every startup"""
+    dialect = sqlite.dialect()
+    statements = []
+    for table in metadata.sorted_tables:
+        statements.append(str(CreateTable(table, if_not_exists=True).compile(dialect=dialect)))
+        for index in table.indexes:
+            statements.append(str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect)))
+    return statements
+
+
+def _exported_columns(table: sa.Table) -> List[str]:
+    return [c.name for c in table.columns if not (table is lab_results and c.name == "id")]
+
+
+def _chunks(items: List[str], size: int = _IN_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _user_row_to_dict(row) -> Dict[str, Any]:
+    user = dict(zip(("id",) + _PROFILE_COLUMNS, row))
+    if user["questionnaire_responses"] is not None:
+        user["questionnaire_responses"] = json.loads(user["questionnaire_responses"])
+    return user
+
+
+def _user_param(profile_data: Dict[str, Any], column: str) -> Any:
+    value = profile_data.get(column)
+    if column == "questionnaire_responses" and value is not None:
+        return json.dumps(value.model_dump() if hasattr(value, "model_dump") else value)
+    return value.value if column == "persona" and hasattr(value, "value") else value
+
+
+def _user_params(profile_data: Dict[str, Any]) -> tuple:
+    return tuple([profile_data["id"]] + [_user_param(profile_data, c) for c in _PROFILE_COLUMNS])
+
+
+def _lab_row_to_dict(row) -> Dict[str, Any]:
+    result = {
+        "name": row[0],
+        "value": row[1],
+        "unit": row[2],
+        "reference_range": {"min": row[3], "max": row[4]},
+        "category": row[5],
+        "status": row[6],
+    }
+    # Only results converted to a canonical unit carry the submitted value
+    if row[7] is not None:
+        result["original_value"] = row[7]
+        result["original_unit"] = row[8]
+    return result
+
+
+def _page_row_to_item(row) -> Tuple[tuple, Dict[str, Any]]:
+    item = _lab_row_to_dict(row[3:])
+    item["report_id"] = row[2]
+    item["result_date"] = row[1]
+    return (row[1], row[0]), item
+
+
+def _lab_dict_to_params(user_id: str, report_id: str, result: Dict[str, Any], default_date: str) -> tuple:
+    ref = result.get("reference_range") or {}
+    status = result.get("status")
+    return (
+        user_id,
+        report_id,
+        result.get("result_date") or default_date,
+        result["name"],
+        float(result["value"]),
+        result["unit"],
+        ref.get("min"),
+        ref.get("max"),
+        result["category"],
+        status.value if hasattr(status, "value") else status,
+        result.get("original_value"),
+        result.get("original_unit"),
+    )
+
+
+class SQLiteConnectionPool:
+    """Fixed-size pool of persistent aiosqlite connections"""
+
+    def __init__(self, path: str, size: int = 5):
+        self.path = path
+        # Each connection to a plain :memory: path would see its own database
+        self.size = 1 if path == ":memory:" else max(1, size)
+        self._queue: Optional[asyncio.Queue] = None
+        self._connections: List[aiosqlite.Connection] = []
+
+    async def open(self):
+        self._queue = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.path, isolation_level=None, cached_statements=256)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            self._connections.append(conn)
+            self._queue.put_nowait(conn)
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        self._queue = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = await self._queue.get()
+        try:
+            yield conn
+        finally:
+            self._queue.put_nowait(conn)
+
+    @asynccontextmanager
+    async def snapshot(self):
+        """Read transaction so several queries see one consistent state"""
+        async with self.acquire() as conn:
+            await conn.execute("BEGIN")
+            try:
+                yield conn
+            finally:
+                await conn.execute("COMMIT")
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self.acquire() as conn:
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+
+
+class SQLDataBackend:
+    """Async SQLite-backed storage for profiles, lab results and history"""
+
+    def __init__(self, database_url: str, pool_size: int = 5, seed_data: Optional[Dict[str, Any]] = None):
+        self.database_url = database_url
+        self.pool = SQLiteConnectionPool(sqlite_path_from_url(database_url), pool_size)
+        self.seed_data = seed_data
+        self._connected = False
+        self._connect_lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self._connected:
+                return
+            await self.pool.open()
+            async with self.pool.acquire() as conn:
+                for statement in schema_statements():
+                    await conn.execute(statement)
+            self._connected = True
+            if self.seed_data:
+                await self._seed(self.seed_data)
+
+    async def disconnect(self):
+        async with self._connect_lock:
+            if self._connected:
+                await self.pool.close()
+                self._connected = False
+
+    async def _ensure_connected(self):
+        if not self._connected:
+            await self.connect()
+
+    async def _seed(self, data: Dict[str, Any]):
+        """Load initial data into an empty database"""
+        async with self.pool.transaction() as conn:
+            async with conn.execute(_MAX_USER_ROWID) as cursor:
+                if (await cursor.fetchone())[0]:
+                    return
+            for user in data.get("users", {}).values():
+                await conn.execute(_INSERT_USER, _user_params(user))
+            for user_id, results in data.get("lab_results", {}).items():
+                report = data["lab_reports"][user_id]
+                await self._write_report(conn, user_id, results, report["report_id"], report["collected_at"], report["source"])
+            for user_id, history in data.get("user_history", {}).items():
+                await conn.execute(_UPSERT_HISTORY, (user_id, json.dumps(history)))
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_USER, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return _user_row_to_dict(row)
+
+    async def create_user(self, profile_data: Dict[str, Any]) -> Dict[str, Any]:
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            async with conn.execute(_MAX_USER_ROWID) as cursor:
+                next_id = (await cursor.fetchone())[0] + 1
+            # Seeded users keep their own ids, so skip any that are already taken
+            while True:
+                async with conn.execute(_USER_EXISTS, (str(next_id),)) as cursor:
+                    if await cursor.fetchone() is None:
+                        break
+                next_id += 1
+            profile_data["id"] = str(next_id)
+            await conn.execute(_INSERT_USER, _user_params(profile_data))
+        return profile_data
+
+    async def insert_user(self, profile_data: Dict[str, Any]) -> bool:
+        """Insert a profile with a caller-chosen id; False if the id is taken"""
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            cursor = await conn.execute(
+                _INSERT_USER_IF_ABSENT,
+                _user_params(profile_data)
+            )
+            inserted = cursor.rowcount == 1
+            await cursor.close()
+        return inserted
+
+    async def max_user_rowid(self) -> int:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_MAX_USER_ROWID) as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def get_users(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Profiles for many users, keyed by id; unknown ids are left out"""
+        await self._ensure_connected()
+        profiles = {}
+        async with self.pool.acquire() as conn:
+            for chunk in _chunks(list(user_ids)):
+                placeholders = ", ".join("?" * len(chunk))
+                query = f"SELECT {_USER_COLUMNS} FROM users WHERE id IN ({placeholders})"
+                async with conn.execute(query, chunk) as cursor:
+                    for row in await cursor.fetchall():
+                        profiles[row[0]] = _user_row_to_dict(row)
+        return profiles
+
+    async def update_user(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        await self._ensure_connected()
+        columns = [c for c in _PROFILE_COLUMNS if c in profile_data]
+        async with self.pool.transaction() as conn:
+            if columns:
+                assignments = ", ".join(f"{c} = ?" for c in columns)
+                await conn.execute(
+                    f"UPDATE users SET {assignments} WHERE id = ?",
+                    tuple(_user_param(profile_data, c) for c in columns) + (user_id,)
+                )
+            async with conn.execute(_SELECT_USER, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return _user_row_to_dict(row)
+
+    async def get_lab_results(self, user_id: str, report_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_LAB_RESULTS, (user_id, report_id, user_id)) as cursor:
+                rows = await cursor.fetchall()
+            # An empty result only needs disambiguating from a missing report
+            if not rows:
+                async with conn.execute(_SELECT_REPORT, (user_id, report_id, user_id)) as cursor:
+                    if await cursor.fetchone() is None:
+                        return None
+        return [_lab_row_to_dict(row) for row in rows]
+
+    async def _write_report(
+        self,
+        conn,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        report_id: str,
+        collected_at: str,
+        source: Optional[str]
+    ) -> Dict[str, Any]:
+        report = (report_id, user_id, collected_at, source, len(results))
+        await conn.execute(_DELETE_LAB_RESULTS, (user_id, report_id))
+        await conn.executemany(_INSERT_LAB_RESULT, [_lab_dict_to_params(user_id, report_id, r, collected_at) for r in results])
+        await conn.execute(_UPSERT_REPORT, report)
+        await conn.execute(_UPSERT_LATEST_REPORT, (user_id, report_id, collected_at))
+        return dict(zip(_REPORT_COLUMNS, report))
+
+    async def store_lab_results(
+        self,
+        user_id: str,
+        results: List[Dict[str, Any]],
+        report_id: str,
+        collected_at: str,
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            return await self._write_report(conn, user_id, results, report_id, collected_at, source)
+
+    async def store_lab_results_batch(self, records: List[Tuple[str, str, str, Optional[str], Dict[str, Any]]]):
+        """Append results for many users and reports in a single transaction"""
+        await self._ensure_connected()
+        params = []
+        reports: Dict[Tuple[str, str], list] = {}
+        for user_id, report_id, collected_at, source, result in records:
+            params.append(_lab_dict_to_params(user_id, report_id, result, collected_at))
+            report = reports.setdefault((user_id, report_id), [report_id, user_id, collected_at, source, 0])
+            report[4] += 1
+        async with self.pool.transaction() as conn:
+            await conn.executemany(_INSERT_LAB_RESULT, params)
+            await conn.executemany(_APPEND_REPORT, [tuple(r) for r in reports.values()])
+            await conn.executemany(_UPSERT_LATEST_REPORT, [(r[1], r[0], r[2]) for r in reports.values()])
+
+    async def get_report(self, user_id: str, report_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_REPORT, (user_id, report_id, user_id)) as cursor:
+                row = await cursor.fetchone()
+        return dict(zip(_REPORT_COLUMNS, row)) if row else None
+
+    async def get_report_pair(self, user_id: str, from_id: str, to_id: str) -> Dict[str, Dict[str, Any]]:
+        """{report_id: {"report", "lab_results"}} for whichever of the two reports exist"""
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_REPORT_PAIR, (user_id, from_id, to_id)) as cursor:
+                rows = await cursor.fetchall()
+        pair = {}
+        for row in rows:
+            entry = pair.get(row[0])
+            if entry is None:
+                entry = pair[row[0]] = {"report": dict(zip(_REPORT_COLUMNS, row)), "lab_results": []}
+            if row[5] is not None:
+                entry["lab_results"].append(_lab_row_to_dict(row[5:]))
+        return pair
+
+    async def list_reports(self, user_id: str) -> List[Dict[str, Any]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_LIST_REPORTS, (user_id,)) as cursor:
+                rows = await cursor.fetchall()
+        return [dict(zip(_REPORT_COLUMNS, row)) for row in rows]
+
+    async def get_lab_results_page(
+        self,
+        user_id: str,
+        report_id: Optional[str] = None,
+        all_reports: bool = False,
+        after: Optional[tuple] = None,
+        limit: int = 100
+    ) -> List[Tuple[tuple, Dict[str, Any]]]:
+        await self._ensure_connected()
+        if all_reports:
+            query, params = (_SELECT_ALL_PAGE_FIRST, (user_id,)) if after is None else (_SELECT_ALL_PAGE_AFTER, (user_id, *after))
+        else:
+            scope = (user_id, report_id, user_id)
+            query, params = (_SELECT_PAGE_FIRST, scope) if after is None else (_SELECT_PAGE_AFTER, scope + tuple(after))
+        async with self.pool.acquire() as conn:
+            async with conn.execute(query, params + (limit,)) as cursor:
+                rows = await cursor.fetchall()
+        return [_page_row_to_item(row) for row in rows]
+
+    async def get_analyte_series(self, user_id: str, analyte: str) -> Tuple[List[str], List[float]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_ANALYTE_SERIES, (user_id, analyte)) as cursor:
+                rows = await cursor.fetchall()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    async def get_user_bundle(self, user_id: str, report_id: Optional[str] = None) -> Dict[str, Any]:
+        """Profile, report, lab results and history read in one transaction on one connection"""
+        await self._ensure_connected()
+        scope = (user_id, report_id, user_id)
+        async with self.pool.snapshot() as conn:
+            async with conn.execute(_SELECT_USER, (user_id,)) as cursor:
+                user_row = await cursor.fetchone()
+            async with conn.execute(_SELECT_REPORT, scope) as cursor:
+                report_row = await cursor.fetchone()
+            lab_rows = []
+            if report_row is not None:
+                async with conn.execute(_SELECT_LAB_RESULTS, scope) as cursor:
+                    lab_rows = await cursor.fetchall()
+            async with conn.execute(_SELECT_HISTORY, (user_id,)) as cursor:
+                history_row = await cursor.fetchone()
+        return {
+            "profile": _user_row_to_dict(user_row) if user_row else None,
+            "report": dict(zip(_REPORT_COLUMNS, report_row)) if report_row else None,
+            "lab_results": [_lab_row_to_dict(row) for row in lab_rows] if report_row else None,
+            "history": json.loads(history_row[0]) if history_row else {},
+        }
+
+    async def get_user_history(self, user_id: str) -> Dict[str, Any]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_HISTORY, (user_id,)) as cursor:
+                row = await cursor.fetchone()
+        return json.loads(row[0]) if row else {}
+
+    async def list_user_ids(self) -> List[str]:
+        """Every user id with a profile, reports or history in this database"""
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(_SELECT_USER_IDS) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    async def _scan(self, query: str, batch_size: int) -> AsyncIterator[List[tuple]]:
+        await self._ensure_connected()
+        async with self.pool.acquire() as conn:
+            async with conn.execute(query) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+
+    def scan_users(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        """Batches of (id, age, gender, conditions, persona) for every profile"""
+        return self._scan(_SCAN_USERS, batch_size)
+
+    async def scan_persona_inputs(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        """
+        Batches of (id, age, conditions, questionnaire_responses,
+        persona_rules_version, persona_fingerprint) for every profile
+        """
+        async for rows in self._scan(_SCAN_PERSONA_INPUTS, batch_size):
+            yield [
+                (user_id, age, conditions, json.loads(questionnaire) if questionnaire is not None else None, version, fingerprint)
+                for user_id, age, conditions, questionnaire, version, fingerprint in rows
+            ]
+
+    async def update_personas(self, rows: List[Tuple[str, str, str, str]]):
+        """Store (user_id, persona, rules_version, fingerprint) rows in one transaction"""
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            await conn.executemany(_UPDATE_PERSONA, [(persona, version, fingerprint, user_id) for user_id, persona, version, fingerprint in rows])
+
+    def scan_lab_results(self, batch_size: int = 10000) -> AsyncIterator[List[tuple]]:
+        """
+        Batches of (user_id, result_date, name, value, ref_min, ref_max, status)
+        for every stored result, grouped by user and oldest first
+        """
+        return self._scan(_SCAN_LAB_RESULTS, batch_size)
+
+    async def export_users(self, user_ids: List[str]) -> Dict[str, List[tuple]]:
+        """All rows belonging to the given users, per table, read in one snapshot"""
+        await self._ensure_connected()
+        exported: Dict[str, List[tuple]] = {}
+        async with self.pool.snapshot() as conn:
+            for table, column in _USER_TABLES:
+                columns = ", ".join(_exported_columns(table))
+                order = " ORDER BY id" if table is lab_results else ""
+                rows = exported.setdefault(table.name, [])
+                for chunk in _chunks(list(user_ids)):
+                    placeholders = ", ".join("?" * len(chunk))
+                    query = f"SELECT {columns} FROM {table.name} WHERE {column} IN ({placeholders}){order}"
+                    async with conn.execute(query, chunk) as cursor:
+                        rows.extend(await cursor.fetchall())
+        return exported
+
+    async def _delete_user_rows(self, conn, user_ids: List[str]):
+        for table, column in _USER_TABLES:
+            for chunk in _chunks(list(user_ids)):
+                placeholders = ", ".join("?" * len(chunk))
+                await conn.execute(f"DELETE FROM {table.name} WHERE {column} IN ({placeholders})", chunk)
+
+    async def import_users(self, user_ids: List[str], exported: Dict[str, List[tuple]]):
+        """Replace everything stored for the given users with rows from export_users"""
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            # Clearing first keeps a re-run of an interrupted move from duplicating lab rows
+            await self._delete_user_rows(conn, user_ids)
+            for table, _ in _USER_TABLES:
+                columns = _exported_columns(table)
+                rows = exported.get(table.name)
+                if rows:
+                    query = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+                    await conn.executemany(query, rows)
+
+    async def delete_users(self, user_ids: List[str]):
+        """Remove every row belonging to the given users"""
+        await self._ensure_connected()
+        async with self.pool.transaction() as conn:
+            await self._delete_user_rows(conn, user_ids)
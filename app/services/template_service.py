@@ -1,237 +1,177 @@
+"""
+UI templates per persona, loaded from app/data/ui_templates.json (or the file
+named by UI_TEMPLATES_PATH) and reloaded when that file changes.
+
+A loaded file is resolved into one template per PersonaType, with personas the
+file leaves out mapped to its fallback template, so a lookup is a single dict
+index. Reloading swaps the whole UITemplates at once and reports the personas
+whose template changed, so only their cached views need to go.
+
+Each template is also compiled into a UISkeleton: the ui_components tree with
+everything except the summary content and the lab results already in place,
+plus the same tree pre-encoded as JSON around those two slots, and its
+prompts into a PromptTemplate (see prompt_templates).
+"""
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
 from app.models.schemas import PersonaType
-from typing import Dict, Any
+from app.services.config_files import data_path, file_signature, load_document
+from app.services.persona_registry import encode_json
+from app.services.prompt_templates import PromptTemplate, RenderedPrompt
 
-class TemplateService:
-    def __init__(self):
-        self.templates = self._load_templates()
-    
-    def _load_templates(self) -> Dict[PersonaType, Dict[str, Any]]:
-        """Load UI templates for different personas"""
+# Try to import settings, fallback gracefully
+try:
+    from app.config import settings
+except ImportError:
+    print("⚠️  Settings not available - using the bundled UI templates")
+    class MockSettings:
+        ui_templates_path = ""
+    settings = MockSettings()
+
+
+# Placeholders marking the per-request slots in a skeleton's encoded JSON
+_DATA_SLOT = "\x00data\x00"
+_CONTENT_SLOT = "\x00content\x00"
+
+
+class UISkeleton:
+    """
+    A persona's ui_components with the fixed parts built once. render() and
+    render_json() fill in the lab results and summary content; the fixed
+    parts are shared between responses and must not be modified.
+    """
+    __slots__ = ("layout", "header", "results_type", "results_config", "summary_type", "summary_config",
+                 "styling", "persona", "json_parts")
+
+    def __init__(self, persona: PersonaType, template: Dict[str, Any]):
+        components = template.get("components", {})
+        self.layout = template.get("layout", "default")
+        self.header = {
+            "type": components.get("header", {}).get("type", "default"),
+            "title": "Your Health Results",
+            "subtitle": f"Personalized for {persona.value.replace('_', ' ').title()}"
+        }
+        self.results_config = components.get("results_view", {})
+        self.results_type = self.results_config.get("type", "default")
+        self.summary_config = components.get("summary", {})
+        self.summary_type = self.summary_config.get("type", "default")
+        self.styling = template.get("styling", {})
+        self.persona = persona.value
+        # JSON before the lab results, between them and the content, and after the content
+        encoded = encode_json(self.render(_CONTENT_SLOT, _DATA_SLOT))
+        head, rest = encoded.split(encode_json(_DATA_SLOT))
+        middle, tail = rest.split(encode_json(_CONTENT_SLOT))
+        self.json_parts: Tuple[bytes, bytes, bytes] = (head, middle, tail)
+
+    def render(self, content: Any, lab_results: Any) -> Dict[str, Any]:
+        """ui_components for one response"""
         return {
-            PersonaType.HEALTH_CONSCIOUS: {
-                "name": "senior_sue_template",
-                "layout": "simple_overview",
-                "components": {
-                    "header": {
-                        "type": "simple_header",
-                        "show_icons": True,
-                        "large_text": True
-                    },
-                    "results_view": {
-                        "type": "simplified_cards",
-                        "highlight_abnormal": True,
-                        "use_plain_language": True,
-                        "show_reference_ranges": False
-                    },
-                    "summary": {
-                        "type": "text_summary",
-                        "include_recommendations": True,
-                        "medical_context": True
-                    }
-                },
-                "styling": {
-                    "font_size": "large",
-                    "contrast": "high",
-                    "colors": "medical_safe"
-                },
-                "prompts": {
-                    "ai_instruction": "Use simple, clear language. Focus on what the patient needs to know for their diabetes management. Highlight any concerning values but reassure when appropriate.",
-                    "tone": "caring, professional, reassuring",
-                    "complexity": "low",
-                    "focus": "health_management"
-                }
-            },
-            PersonaType.DETAIL_ORIENTED: {
-                "name": "analyst_template",
-                "layout": "comprehensive_dashboard",
-                "components": {
-                    "header": {
-                        "type": "detailed_header",
-                        "show_metrics": True,
-                        "show_trends": True
-                    },
-                    "results_view": {
-                        "type": "detailed_table",
-                        "show_all_data": True,
-                        "include_charts": True,
-                        "show_historical": True
-                    },
-                    "summary": {
-                        "type": "analytical_summary",
-                        "include_statistics": True,
-                        "show_correlations": True
-                    }
-                },
-                "styling": {
-                    "font_size": "normal",
-                    "contrast": "normal",
-                    "colors": "professional"
-                },
-                "prompts": {
-                    "ai_instruction": "Provide detailed analysis with specific numbers, ranges, and trends. Include technical context and explain correlations between different biomarkers.",
-                    "tone": "analytical, detailed, precise",
-                    "complexity": "high",
-                    "focus": "comprehensive_analysis"
-                }
-            },
-            PersonaType.QUICK_BOLD: {
-                "name": "achiever_template",
-                "layout": "action_focused",
-                "components": {
-                    "header": {
-                        "type": "action_header",
-                        "show_status": True,
-                        "highlight_urgent": True
-                    },
-                    "results_view": {
-                        "type": "summary_cards",
-                        "show_only_abnormal": True,
-                        "action_buttons": True
-                    },
-                    "summary": {
-                        "type": "action_summary",
-                        "bullet_points": True,
-                        "next_steps": True
-                    }
-                },
-                "styling": {
-                    "font_size": "normal",
-                    "contrast": "high",
-                    "colors": "action_focused"
-                },
-                "prompts": {
-                    "ai_instruction": "Be direct and action-oriented. Focus on what needs immediate attention and specific next steps. Keep explanations brief but actionable.",
-                    "tone": "direct, motivating, action-oriented",
-                    "complexity": "medium",
-                    "focus": "immediate_actions"
-                }
-            },
-            PersonaType.TECH_SAVVY: {
-                "name": "innovator_template",
-                "layout": "integrated_dashboard",
-                "components": {
-                    "header": {
-                        "type": "tech_header",
-                        "show_integrations": True,
-                        "api_status": True
-                    },
-                    "results_view": {
-                        "type": "interactive_charts",
-                        "real_time_updates": True,
-                        "export_options": True
-                    },
-                    "summary": {
-                        "type": "data_driven_summary",
-                        "include_apis": True,
-                        "show_algorithms": True
-                    }
-                },
-                "styling": {
-                    "font_size": "normal",
-                    "contrast": "normal",
-                    "colors": "tech_modern"
-                },
-                "prompts": {
-                    "ai_instruction": "Include technical details and data integration possibilities. Mention how values relate to wearable device data and suggest tech-enabled monitoring.",
-                    "tone": "technical, innovative, data-driven",
-                    "complexity": "high",
-                    "focus": "technology_integration"
-                }
+            "layout": self.layout,
+            "components": {
+                "header": self.header,
+                "results_view": {"type": self.results_type, "data": lab_results, "config": self.results_config},
+                "summary": {"type": self.summary_type, "content": content, "config": self.summary_config}
             },
-            PersonaType.BEGINNER: {
-                "name": "learner_template",
-                "layout": "educational_guided",
-                "components": {
-                    "header": {
-                        "type": "educational_header",
-                        "show_help": True,
-                        "guided_tour": True
-                    },
-                    "results_view": {
-                        "type": "educational_cards",
-                        "explanations": True,
-                        "tooltips": True
-                    },
-                    "summary": {
-                        "type": "educational_summary",
-                        "learn_more_links": True,
-                        "step_by_step": True
-                    }
-                },
-                "styling": {
-                    "font_size": "large",
-                    "contrast": "high",
-                    "colors": "friendly"
-                },
-                "prompts": {
-                    "ai_instruction": "Explain everything in simple terms. Include what each test measures and why it matters. Be encouraging and educational without being overwhelming.",
-                    "tone": "educational, encouraging, simple",
-                    "complexity": "very_low",
-                    "focus": "learning_and_understanding"
-                }
-            }
+            "styling": self.styling,
+            "persona": self.persona
         }
+
+    def render_json(self, content: str, lab_results_json: bytes) -> bytes:
+        """render() encoded as compact JSON, given the lab results already encoded"""
+        head, middle, tail = self.json_parts
+        return b"".join((head, lab_results_json, middle, encode_json(content), tail))
+
+
+class UITemplates(NamedTuple):
+    version: str                                # Digest of the resolved templates
+    templates: Dict[PersonaType, Dict[str, Any]]  # Every persona, fallback included
+    skeletons: Dict[PersonaType, UISkeleton]
+    prompts: Dict[PersonaType, PromptTemplate]
+
+
+def compile_templates(document: Dict[str, Any]) -> UITemplates:
+    """Resolve a templates document into a template for every persona"""
+    try:
+        templates = {PersonaType(name): template for name, template in document["templates"].items()}
+        fallback = templates[PersonaType(document["fallback"])]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed UI templates: {e!r}")
+    resolved = {persona: templates.get(persona, fallback) for persona in PersonaType}
+    spec = json.dumps({persona.value: template for persona, template in resolved.items()}, sort_keys=True)
+    skeletons = {persona: UISkeleton(persona, template) for persona, template in resolved.items()}
+    prompts = {persona: PromptTemplate(template.get("prompts", {})) for persona, template in resolved.items()}
+    return UITemplates(hashlib.sha256(spec.encode()).hexdigest()[:16], resolved, skeletons, prompts)
+
+
+def _templates_path() -> str:
+    return data_path(settings.ui_templates_path, "ui_templates.json")
+
+
+_templates: Optional[UITemplates] = None
+_templates_signature: Optional[Tuple[int, int]] = None
+
+
+def get_ui_templates() -> UITemplates:
+    """Process-wide UI templates"""
+    global _templates, _templates_signature
+    if _templates is None:
+        path = _templates_path()
+        _templates_signature = file_signature(path)
+        _templates = compile_templates(load_document(path))
+    return _templates
+
+
+def reload_ui_templates() -> List[PersonaType]:
+    """
+    Reload the templates if their file changed since it was last read and swap
+    them in. Returns the personas whose template changed. A file that fails to
+    load is reported and the current templates stay until it changes again.
+    """
+    global _templates, _templates_signature
+    current = get_ui_templates()
+    path = _templates_path()
+    signature = file_signature(path)
+    if signature == _templates_signature:
+        return []
+    _templates_signature = signature
+    try:
+        templates = compile_templates(load_document(path))
+    except (OSError, ValueError) as e:
+        print(f"❌ UI templates reload failed, keeping version {current.version}: {e}")
+        return []
+    if templates.version == current.version:
+        return []
+    _templates = templates
+    changed = [p for p in PersonaType if templates.templates[p] != current.templates[p]]
+    print(f"🎨 UI templates reloaded: version {current.version} -> {templates.version}, {len(changed)} personas changed")
+    return changed
+
+
+class TemplateService:
+    @property
+    def templates(self) -> Dict[PersonaType, Dict[str, Any]]:
+        """UI templates for different personas, as currently loaded"""
+        return get_ui_templates().templates
     
     async def get_template_for_persona(self, persona: PersonaType) -> Dict[str, Any]:
         """Get UI template configuration for a specific persona"""
-        # Default to balanced template if persona not found
-        return self.templates.get(persona, self.templates.get(PersonaType.HEALTH_CONSCIOUS, {}))
+        # Personas without their own template already map to the file's fallback
+        return self.templates[persona]
     
     async def get_ai_prompt_for_persona(self, persona: PersonaType, context: Dict[str, Any] = None) -> str:
         """Generate AI prompt based on persona and context"""
-        template = await self.get_template_for_persona(persona)
-        prompts = template.get("prompts", {})
-        
-        base_instruction = prompts.get("ai_instruction", "Provide a helpful summary of the lab results.")
-        tone = prompts.get("tone", "professional")
-        complexity = prompts.get("complexity", "medium")
-        focus = prompts.get("focus", "general_health")
-        
-        # Build persona-specific prompt
-        prompt = f"""
-        You are a health AI assistant providing personalized lab result explanations.
-        
-        Persona Context:
-        - Communication Style: {tone}
-        - Complexity Level: {complexity}
-        - Primary Focus: {focus}
-        
-        Instructions: {base_instruction}
-        
-        User Context: {context or {}}
-        
-        Please analyze the provided lab results and provide a response that matches this persona's preferences.
-        """
-        
-        return prompt.strip()
+        return self.render_prompt(persona, context).text
+
+    def render_prompt(self, persona: PersonaType, context: Optional[Dict[str, Any]] = None) -> RenderedPrompt:
+        """The persona's compiled prompt for a context, with its token estimate"""
+        return get_ui_templates().prompts[persona].render(context)
     
     async def structure_ui_response(self, persona: PersonaType, content: str, lab_results: list) -> Dict[str, Any]:
         """Structure the AI response according to persona's UI template"""
-        template = await self.get_template_for_persona(persona)
-        components = template.get("components", {})
-        
-        # Structure response based on template
-        ui_response = {
-            "layout": template.get("layout", "default"),
-            "components": {
-                "header": {
-                    "type": components.get("header", {}).get("type", "default"),
-                    "title": "Your Health Results",
-                    "subtitle": f"Personalized for {persona.value.replace('_', ' ').title()}"
-                },
-                "results_view": {
-                    "type": components.get("results_view", {}).get("type", "default"),
-                    "data": lab_results,
-                    "config": components.get("results_view", {})
-                },
-                "summary": {
-                    "type": components.get("summary", {}).get("type", "default"),
-                    "content": content,
-                    "config": components.get("summary", {})
-                }
-            },
-            "styling": template.get("styling", {}),
-            "persona": persona.value
-        }
-        
-        return ui_response
\ No newline at end of file
+        return get_ui_templates().skeletons[persona].render(content, lab_results)
+
+    def encode_ui_response(self, persona: PersonaType, content: str, lab_results_json: bytes) -> bytes:
+        """structure_ui_response as JSON bytes, spliced from the persona's pre-encoded skeleton"""
+        return get_ui_templates().skeletons[persona].render_json(content, lab_results_json)
@@ -0,0 +1,180 @@
+"""
+Columnar per-user, per-analyte time series with server-side downsampling.
+
+Each series is a pair of NumPy arrays (epoch seconds, values) sorted by time,
+loaded once from the data backend and kept in an LRU store. Each series
+remembers the user's data version it was loaded under (see
+DataService.get_series_version) and is reloaded once the version moves on, so
+writes handled by other workers are seen straight away. Range queries are
+two binary searches; downsampling (LTTB or min/max buckets) runs on the slice
+so only the requested number of points is ever materialized.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def to_epoch_seconds(value: str) -> int:
+    """Parse an ISO-8601 date or datetime (naive values are taken as UTC)"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class AnalyteSeries:
+    """Time-sorted timestamps and values for one user and analyte"""
+
+    def __init__(self, timestamps: np.ndarray, values: np.ndarray, version: Optional[str] = None):
+        order = np.argsort(timestamps, kind="stable")
+        self.timestamps = timestamps[order]
+        self.values = values[order]
+        self.version = version
+        self.loaded_at = time.time()
+
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        hi = len(self.timestamps) if end is None else int(np.searchsorted(self.timestamps, end, side="right"))
+        return self.timestamps[lo:hi], self.values[lo:hi]
+
+
+def downsample_lttb(timestamps: np.ndarray, values: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets downsampling to `threshold` points"""
+    n = len(timestamps)
+    if threshold >= n or threshold < 3:
+        return timestamps, values
+
+    x = timestamps.astype(np.float64)
+    y = values
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean() if next_stop > stop else x[n - 1]
+        avg_y = y[stop:next_stop].mean() if next_stop > stop else y[n - 1]
+
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return timestamps[selected], values[selected]
+
+
+def downsample_minmax(timestamps: np.ndarray, values: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the minimum and maximum of each of threshold/2 equal-count buckets"""
+    n = len(timestamps)
+    if threshold >= n or threshold < 2:
+        return timestamps, values
+
+    edges = np.linspace(0, n, threshold // 2 + 1).astype(np.int64)
+    picks = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        if stop <= start:
+            continue
+        bucket = values[start:stop]
+        lo, hi = start + int(np.argmin(bucket)), start + int(np.argmax(bucket))
+        picks.extend((lo, hi) if lo <= hi else (hi, lo))
+    selected = np.unique(np.asarray(picks, dtype=np.int64))
+    return timestamps[selected], values[selected]
+
+
+class TimeSeriesStore:
+    """Bounded LRU of loaded analyte series keyed by (user_id, analyte)"""
+
+    def __init__(self, max_series: int = 10000, ttl: int = 300):
+        self.max_series = max_series
+        self.ttl = ttl
+        self._series: "OrderedDict[Tuple[str, str], AnalyteSeries]" = OrderedDict()
+
+    @staticmethod
+    def _key(user_id: str, analyte: str) -> Tuple[str, str]:
+        return user_id, analyte.lower()
+
+    def get(self, user_id: str, analyte: str, version: Optional[str] = None) -> Optional[AnalyteSeries]:
+        """The loaded series, unless it has expired or was loaded under another data version"""
+        key = self._key(user_id, analyte)
+        series = self._series.get(key)
+        if series is None:
+            return None
+        if series.version != version or time.time() - series.loaded_at > self.ttl:
+            del self._series[key]
+            return None
+        self._series.move_to_end(key)
+        return series
+
+    def put(self, user_id: str, analyte: str, series: AnalyteSeries):
+        key = self._key(user_id, analyte)
+        self._series[key] = series
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+
+# Shared store; writes on any worker are picked up through the data version
+timeseries_store = TimeSeriesStore()
+
+
+class TrendService:
+    def __init__(self, data_service, store: TimeSeriesStore = timeseries_store):
+        self.data_service = data_service
+        self.store = store
+
+    async def _load(self, user_id: str, analyte: str) -> AnalyteSeries:
+        # Read the version before the rows: a write landing in between moves it on again
+        version = await self.data_service.get_series_version(user_id)
+        series = self.store.get(user_id, analyte, version)
+        if series is None:
+            dates, values = await self.data_service.get_analyte_series(user_id, analyte)
+            series = AnalyteSeries(
+                np.fromiter((to_epoch_seconds(d) for d in dates), dtype=np.int64, count=len(dates)),
+                np.asarray(values, dtype=np.float64),
+                version
+            )
+            self.store.put(user_id, analyte, series)
+        return series
+
+    async def get_trend(
+        self,
+        user_id: str,
+        analyte: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        points: int = 300,
+        method: str = "lttb"
+    ) -> Dict[str, Any]:
+        """Return a time range of one analyte downsampled to at most `points` points"""
+        if method not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"Unsupported downsampling method: {method}")
+
+        series = await self._load(user_id, analyte)
+        timestamps, values = series.range(
+            to_epoch_seconds(start) if start else None,
+            to_epoch_seconds(end) if end else None
+        )
+        total = len(timestamps)
+        if method == "lttb":
+            timestamps, values = downsample_lttb(timestamps, values, points)
+        else:
+            timestamps, values = downsample_minmax(timestamps, values, points)
+
+        return {
+            "user_id": user_id,
+            "analyte": analyte,
+            "method": method,
+            "total_points": total,
+            "returned_points": len(timestamps),
+            "timestamps": timestamps.tolist(),
+            "values": values.tolist(),
+        }
@@ -0,0 +1,101 @@
+"""
+Vectorized conversion of lab values to each analyte's canonical unit.
+
+Rows are grouped by their distinct (name, unit) pair with np.unique, the lab
+catalog is consulted once per pair, and the resulting factors and offsets are
+broadcast back over the whole value and reference-range arrays. A batch of
+millions of rows costs one catalog lookup per distinct pair, not per row.
+Reference ranges are taken to be in the same unit as their value.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.lab_catalog import LabCatalog, get_lab_catalog, normalize_unit
+
+def convert_arrays(
+    names: Sequence[str],
+    units: Sequence[str],
+    values: Sequence[float],
+    ref_min: Sequence[float],
+    ref_max: Sequence[float],
+    catalog: Optional[LabCatalog] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Convert parallel arrays to canonical units. Missing bounds are NaN and stay
+    NaN. Returns the converted values, ref_min, ref_max and units, a
+    `converted` mask of rows moved to a different unit and a `relabeled` mask
+    of rows whose unit string changed (including spelling-only fixes such as
+    mmol/l to mmol/L). Unknown tests and units pass through untouched.
+    """
+    catalog = catalog or get_lab_catalog()
+    # Factorize names and units separately on fixed-width string arrays (sorted
+    # in C), then combine the two codes into one integer per distinct pair
+    name_values, name_codes = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+    unit_values, unit_codes = np.unique(np.asarray(units, dtype=str), return_inverse=True)
+    pair_codes, inverse = np.unique(name_codes.astype(np.int64) * len(unit_values) + unit_codes, return_inverse=True)
+
+    factors = np.ones(len(pair_codes))
+    offsets = np.zeros(len(pair_codes))
+    canonical = np.empty(len(pair_codes), dtype=object)
+    changed = np.zeros(len(pair_codes), dtype=bool)
+    relabeled = np.zeros(len(pair_codes), dtype=bool)
+    for i, code in enumerate(pair_codes.tolist()):
+        name, unit = str(name_values[code // len(unit_values)]), str(unit_values[code % len(unit_values)])
+        conversion = catalog.unit_conversion(name, unit)
+        if conversion is None:
+            canonical[i] = unit
+            continue
+        canonical[i], factors[i], offsets[i] = conversion
+        changed[i] = normalize_unit(unit) != normalize_unit(canonical[i]) or factors[i] != 1.0 or offsets[i] != 0.0
+        relabeled[i] = canonical[i] != unit
+
+    factor = factors[inverse]
+    offset = offsets[inverse]
+    return {
+        "values": np.round(np.asarray(values, dtype=np.float64) * factor + offset, 6),
+        "ref_min": np.round(np.asarray(ref_min, dtype=np.float64) * factor + offset, 6),
+        "ref_max": np.round(np.asarray(ref_max, dtype=np.float64) * factor + offset, 6),
+        "units": canonical[inverse],
+        "converted": changed[inverse],
+        "relabeled": relabeled[inverse],
+    }
+
+
+def _nan(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def _bound(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def normalize_rows(rows: List[Dict[str, Any]], catalog: Optional[LabCatalog] = None) -> int:
+    """
+    Convert lab result dicts in place to canonical units. Converted rows keep
+    their submitted value and unit as original_value and original_unit.
+    Returns the number of rows changed.
+    """
+    if not rows:
+        return 0
+    refs = [row.get("reference_range") or {} for row in rows]
+    result = convert_arrays(
+        [row["name"] for row in rows],
+        [row["unit"] for row in rows],
+        [row["value"] for row in rows],
+        [_nan(ref.get("min")) for ref in refs],
+        [_nan(ref.get("max")) for ref in refs],
+        catalog
+    )
+
+    values, ref_min, ref_max, units = result["values"], result["ref_min"], result["ref_max"], result["units"]
+    converted = np.flatnonzero(result["converted"])
+    for i in converted.tolist():
+        row = rows[i]
+        row.setdefault("original_value", row["value"])
+        row.setdefault("original_unit", row["unit"])
+        row["value"] = float(values[i])
+        row["reference_range"] = {"min": _bound(ref_min[i]), "max": _bound(ref_max[i])}
+    for i in np.flatnonzero(result["relabeled"]).tolist():
+        rows[i]["unit"] = units[i]
+    return len(converted)
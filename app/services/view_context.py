@@ -0,0 +1,83 @@
+"""
+Request-scoped state for generating an adaptive view.
+
+A ViewContext is created once the persona and lab results of a request are
+known and is handed to every later stage. Everything derived from them (the
+template, skeleton and prompt, the abnormal and high-priority results, the
+encoded lab results, the AI user context) is computed the first time a stage
+asks for it and reused after that. The template, skeleton and prompt come
+from the templates loaded when the context was created, so a reload
+mid-request cannot mix two versions.
+"""
+from functools import cached_property
+from typing import Any, Dict, List, Optional
+
+from app.models.schemas import LabResult, PersonaType, UserProfile
+from app.services.lab_classifier import STATUS_BY_CODE, STATUS_NORMAL, effective_status_codes
+from app.services.persona_registry import encode_json
+from app.services.prompt_templates import RenderedPrompt
+from app.services.template_service import UISkeleton, get_ui_templates
+
+
+class ViewContext:
+    def __init__(
+        self,
+        persona: PersonaType,
+        lab_results: List[LabResult],
+        profile: Optional[UserProfile] = None,
+        history: Optional[Dict[str, Any]] = None,
+        user_context: Optional[Dict[str, Any]] = None
+    ):
+        self.persona = persona
+        self.lab_results = lab_results
+        self.profile = profile
+        self.history = history
+        self._user_context = user_context
+        self._ui_templates = get_ui_templates()
+
+    @cached_property
+    def template(self) -> Dict[str, Any]:
+        return self._ui_templates.templates[self.persona]
+
+    @cached_property
+    def skeleton(self) -> UISkeleton:
+        return self._ui_templates.skeletons[self.persona]
+
+    @cached_property
+    def prompt(self) -> RenderedPrompt:
+        """The persona's AI prompt for this request's user context"""
+        return self._ui_templates.prompts[self.persona].render(self.user_context)
+
+    @cached_property
+    def abnormal_results(self) -> List[LabResult]:
+        """Results outside their reference range, classified like DataService.get_abnormal_results"""
+        codes = effective_status_codes(self.lab_results_data)
+        return [
+            r.model_copy(update={"status": STATUS_BY_CODE[code]})
+            for r, code in zip(self.lab_results, codes)
+            if code != STATUS_NORMAL
+        ]
+
+    @cached_property
+    def high_priority_results(self) -> List[LabResult]:
+        return [r for r in self.abnormal_results if r.status == "high"]
+
+    @cached_property
+    def lab_results_data(self) -> List[Dict[str, Any]]:
+        """Lab results as JSON-ready dicts"""
+        return [r.model_dump(mode="json") for r in self.lab_results]
+
+    @cached_property
+    def lab_results_json(self) -> bytes:
+        return encode_json(self.lab_results_data)
+
+    @cached_property
+    def user_context(self) -> Dict[str, Any]:
+        """Context for the AI service: the caller's, or built from the profile and history"""
+        if self._user_context is not None or self.profile is None:
+            return self._user_context or {}
+        return {
+            "age": self.profile.age,
+            "conditions": self.profile.conditions,
+            "history": self.history
+        }
@@ -0,0 +1,108 @@
+"""
+Benchmark connection reuse of the shared AI transport against a local stub.
+
+Starts a minimal keep-alive HTTP/1.1 server on 127.0.0.1 that answers every
+POST with a small JSON reply and counts the TCP connections it accepts. The
+same --requests generation calls, --concurrency at a time, are then sent:
+
+    per-client   a new httpx.AsyncClient per call, as when every AIService
+                 owned its own client
+    shared       ai_transport.post_json, one pooled client for the process
+
+and requests per second and connections opened are reported. The stub
+speaks plain HTTP/1.1, so this measures pooling and keep-alive, not HTTP/2.
+
+    python benchmarks/bench_ai_transport.py --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.config import settings
+from app.services.ai_transport import ai_transport
+
+REPLY = b'{"content":"All your lab results are within normal ranges."}'
+BODY = b'{"persona":"balanced","prompt":"' + b"x" * 600 + b'"}'
+
+
+class StubServer:
+    def __init__(self):
+        self.connections = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                    b"content-length: " + str(len(REPLY)).encode() + b"\r\n\r\n" + REPLY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return f"http://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+
+
+async def per_client(url: str):
+    async with httpx.AsyncClient(base_url=url) as client:
+        response = await client.post("/generate", content=BODY, headers={"content-type": "application/json"})
+        response.raise_for_status()
+        return response.json()
+
+
+async def shared(url: str):
+    return await ai_transport.post_json("/generate", BODY)
+
+
+async def run(call, url: str, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call(url)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return time.perf_counter() - t0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    stub = StubServer()
+    url = await stub.start()
+    settings.ai_service_url = url
+    await ai_transport.start()
+
+    print(f"{'mode':>12} {'req/s':>10} {'connections':>12}")
+    for name, call in (("per-client", per_client), ("shared", shared)):
+        stub.connections = 0
+        seconds = await run(call, url, args.requests, args.concurrency)
+        print(f"{name:>12} {args.requests / seconds:>10.0f} {stub.connections:>12}")
+
+    await ai_transport.close()
+    stub.server.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Cohort query latency over a synthetic columnar snapshot.
+
+Builds --users users and --results lab results spread over --analytes
+analytes, saves the snapshot, then times typical cohort queries both on the
+calling thread and through a process-pool worker that memory-maps the saved
+snapshot (the first pooled call includes worker start-up and is reported
+separately).
+
+    python benchmarks/bench_cohort_queries.py --results 10000000 --analytes 1
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cohort_engine import CohortData, run_query, run_query_at
+
+PERSONAS = ["balanced", "beginner", "casual", "health-conscious", "intermediate"]
+CONDITIONS = ["asthma", "hypertension", "high cholesterol", "type 2 diabetes"]
+
+QUERIES = {
+    "high LDL, health-conscious 65+": {"personas": ["health-conscious"], "age_min": 65},
+    "by persona": {"group_by": "persona"},
+    "by age band, all results": {"group_by": "age_band", "latest_only": False},
+    "diabetics by condition": {"conditions": ["diabetes"], "group_by": "condition"},
+}
+
+
+def synthetic(users: int, results: int, analytes: int, seed: int = 0) -> CohortData:
+    rng = np.random.default_rng(seed)
+    row_user = np.sort(rng.integers(0, users, results).astype(np.int32))
+    analyte = rng.integers(0, analytes, results).astype(np.int32)
+    order = np.argsort(analyte, kind="stable")
+    row_user, analyte = row_user[order], analyte[order]
+    latest = np.ones(results, dtype=bool)
+    latest[:-1] = (row_user[1:] != row_user[:-1]) | (analyte[1:] != analyte[:-1])
+    values = rng.normal(110, 30, results)
+    order = np.lexsort((values, analyte))
+    row_user, analyte, values, latest = row_user[order], analyte[order], values[order], latest[order]
+    bounds = np.searchsorted(analyte, np.arange(analytes + 1))
+
+    condition_user = rng.integers(0, users, users // 2).astype(np.int32)
+    arrays = {
+        "user_age": rng.integers(18, 95, users).astype(np.int16),
+        "user_gender": rng.integers(0, 2, users).astype(np.int16),
+        "user_persona": rng.integers(0, len(PERSONAS), users).astype(np.int16),
+        "condition_user": condition_user,
+        "condition_index": rng.integers(0, len(CONDITIONS), len(condition_user)).astype(np.int16),
+        "row_user": row_user,
+        "row_value": values,
+        "row_status": rng.choice(np.array([0, 1, 2], dtype=np.int8), results, p=[0.7, 0.2, 0.1]),
+        "row_latest": latest,
+    }
+    meta = {
+        "built_at": time.time(),
+        "analytes": {f"analyte-{i}": (int(bounds[i]), int(bounds[i + 1])) for i in range(analytes)},
+        "genders": ["female", "male"],
+        "personas": PERSONAS,
+        "conditions": CONDITIONS,
+        "age_bands": [18, 30, 45, 65, 80],
+    }
+    return CohortData(arrays, meta)
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--results", type=int, default=10000000)
+    parser.add_argument("--analytes", type=int, default=1, help="1 puts every result in the queried analyte")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = synthetic(args.users, args.results, args.analytes)
+    start, stop = data.analytes["analyte-0"]
+    print(f"{args.users:,} users, {args.results:,} results; queried analyte holds {stop - start:,}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = data.save(os.path.join(tmp, "snapshot"))
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            warm = time.perf_counter()
+            pool.submit(run_query_at, path, {"analyte": "analyte-0"}).result()
+            print(f"worker start-up and snapshot open: {time.perf_counter() - warm:.3f}s")
+
+            print(f"{'query':<34} {'inline':>9} {'pooled':>9}")
+            for label, filters in QUERIES.items():
+                query = {"analyte": "analyte-0", "percentiles": [5, 25, 50, 75, 95], "histogram_bins": 20, **filters}
+                inline = best_of(lambda: run_query(data, query), args.repeat)
+                pooled = best_of(lambda: pool.submit(run_query_at, path, query).result(), args.repeat)
+                print(f"{label:<34} {inline:>8.3f}s {pooled:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark DataService query latency on the SQL backend as the data set grows.
+
+The database is filled in steps up to --users users with --rows-per-user lab
+rows each; after every step random profile and lab-result lookups are timed.
+Flat latency across steps shows the indexed queries do not degrade with size.
+
+    python benchmarks/bench_data_service.py --users 1000000 --rows-per-user 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.data_service import DataService
+from app.services.sql_data_backend import SQLDataBackend, schema_statements
+
+ANALYTES = ["Glucose", "Sodium", "Potassium", "Creatinine", "Hemoglobin"]
+
+
+def bulk_load(path: str, start: int, stop: int, rows_per_user: int):
+    """Insert users [start, stop) and their lab rows with plain sqlite3"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for statement in schema_statements():
+        conn.execute(statement)
+    with conn:
+        conn.executemany(
+            "INSERT INTO users (id, age, gender, conditions, created_at) VALUES (?, ?, ?, ?, ?)",
+            ((str(i), 20 + i % 70, "Female", None, "2024-01-01T00:00:00") for i in range(start, stop))
+        )
+        conn.executemany(
+            "INSERT INTO lab_results (user_id, report_id, result_date, name, value, unit, ref_min, ref_max, category, status) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (str(i), f"r{i}-{j // 10}", f"2024-01-{1 + j // 10:02d}", ANALYTES[j % 5], 90.0 + j,
+                 "mg/dL", 70.0, 99.0, "Metabolic Panel", "normal")
+                for i in range(start, stop)
+                for j in range(rows_per_user)
+            )
+        )
+        reports_per_user = (rows_per_user + 9) // 10
+        conn.executemany(
+            "INSERT INTO lab_reports (report_id, user_id, collected_at, source, result_count) VALUES (?, ?, ?, ?, ?)",
+            (
+                (f"r{i}-{k}", str(i), f"2024-01-{1 + k:02d}", "bench", min(10, rows_per_user - 10 * k))
+                for i in range(start, stop)
+                for k in range(reports_per_user)
+            )
+        )
+        conn.executemany(
+            "INSERT INTO latest_reports (user_id, report_id, collected_at) VALUES (?, ?, ?)",
+            ((str(i), f"r{i}-{reports_per_user - 1}", f"2024-01-{reports_per_user:02d}") for i in range(start, stop))
+        )
+    conn.close()
+
+
+async def time_lookups(service: DataService, max_user: int, samples: int):
+    profile_ms, labs_ms = [], []
+    for _ in range(samples):
+        user_id = str(random.randrange(max_user))
+        t0 = time.perf_counter()
+        await service.get_user_profile(user_id)
+        t1 = time.perf_counter()
+        await service.get_lab_results(user_id)
+        t2 = time.perf_counter()
+        profile_ms.append((t1 - t0) * 1000)
+        labs_ms.append((t2 - t1) * 1000)
+    return profile_ms, labs_ms
+
+
+def pct(values, q):
+    return statistics.quantiles(values, n=100)[q - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--rows-per-user", type=int, default=50)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        step = args.users // args.steps
+        print(f"{'users':>10} {'lab rows':>12} {'profile p50':>12} {'profile p99':>12} {'labs p50':>10} {'labs p99':>10}")
+        for n in range(1, args.steps + 1):
+            bulk_load(path, (n - 1) * step, n * step, args.rows_per_user)
+            backend = SQLDataBackend(f"sqlite:///{path}")
+            service = DataService(backend, cache=None)
+            await backend.connect()
+            profile_ms, labs_ms = await time_lookups(service, n * step, args.samples)
+            await backend.disconnect()
+            print(
+                f"{n * step:>10} {n * step * args.rows_per_user:>12} "
+                f"{pct(profile_ms, 50):>10.3f}ms {pct(profile_ms, 99):>10.3f}ms "
+                f"{pct(labs_ms, 50):>8.3f}ms {pct(labs_ms, 99):>8.3f}ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+"""
+Compare vectorized lab classification with the per-object LabResult path.
+
+The vectorized leg runs classify_rows on result dicts, as DataService does,
+so it includes building the value and reference-range arrays.
+
+    python benchmarks/bench_lab_classifier.py --sizes 10000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.models.schemas import LabResult, LabResultStatus
+from app.services.lab_classifier import classify_rows
+
+
+def per_object(results):
+    """Row-by-row classification on pydantic objects, as done before"""
+    statuses = []
+    for r in results:
+        if r.value > r.reference_range["max"]:
+            statuses.append(LabResultStatus.HIGH)
+        elif r.value < r.reference_range["min"]:
+            statuses.append(LabResultStatus.LOW)
+        else:
+            statuses.append(LabResultStatus.NORMAL)
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'results':>10} {'per-object':>12} {'vectorized':>12} {'speedup':>8}")
+    for n in args.sizes:
+        rows = [
+            {"name": "Glucose", "value": v, "unit": "mg/dL", "reference_range": {"min": 70.0, "max": 99.0},
+             "category": "Metabolic Panel", "status": "normal"}
+            for v in np.random.uniform(50, 150, n).tolist()
+        ]
+        results = [LabResult(**row) for row in rows]
+
+        t0 = time.perf_counter()
+        per_object(results)
+        t1 = time.perf_counter()
+        classify_rows(rows)
+        t2 = time.perf_counter()
+
+        print(f"{n:>10} {(t1 - t0) * 1000:>10.2f}ms {(t2 - t1) * 1000:>10.2f}ms {(t1 - t0) / (t2 - t1):>7.1f}x")
+
+
+if __name__ == "__main__":
+    np.random.seed(0)
+    main()
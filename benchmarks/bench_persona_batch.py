@@ -0,0 +1,124 @@
+"""
+Compare the compiled persona decision table with the if/elif tree it replaced.
+
+Checks that every generated user gets the same persona from the old tree,
+PersonaRules.classify and PersonaRules.classify_batch, then reports users per
+second (best of --repeat runs) for the old tree awaited once per user, as
+callers used it, for the old tree called inline, and for the table.
+
+    python benchmarks/bench_persona_batch.py --sizes 10000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.schemas import PersonaType, QuestionnaireResponse
+from app.services.persona_rules import PersonaRules
+
+CONDITIONS = [
+    None, None, None, "", " ", "hypertension", "Type 2 Diabetes", "DIABETIC neuropathy", "asthma, diabetes",
+    "high cholesterol, hypertension", "prediabetes", "Diabetic", "Asthma, Hypertension, High Cholesterol, Sleep Apnea",
+    "hypothyroidism, osteoarthritis, type 2 diabetes mellitus",
+]
+ANSWERS = {
+    "tracking_style": ["detail-oriented", "tech-savvy", "quick-bold", "casual", "Detail-Oriented"],
+    "motivation": ["goal-focused", "fast-action", "health-maintenance"],
+    "time_spent": ["5-minutes", "15-minutes"],
+    "tech_comfort": ["beginner", "power", "intermediate"],
+    "dashboard_preference": ["charts", "summary"],
+}
+
+
+def if_elif_tree(age, conditions=None, questionnaire_responses=None):
+    """PersonaService.determine_persona as it was before the decision table"""
+    if age >= 65:
+        if conditions and ("diabetes" in conditions.lower() or "diabetic" in conditions.lower()):
+            return PersonaType.HEALTH_CONSCIOUS
+        elif questionnaire_responses:
+            if questionnaire_responses.tech_comfort == "beginner":
+                return PersonaType.BEGINNER
+            elif questionnaire_responses.tracking_style == "detail-oriented":
+                return PersonaType.DETAIL_ORIENTED
+        return PersonaType.CASUAL
+    elif age >= 45:
+        if conditions:
+            return PersonaType.HEALTH_CONSCIOUS
+        elif questionnaire_responses:
+            if questionnaire_responses.motivation == "goal-focused":
+                return PersonaType.GOAL_FOCUSED
+            elif questionnaire_responses.tracking_style == "tech-savvy":
+                return PersonaType.TECH_SAVVY
+        return PersonaType.BALANCED
+    else:
+        if questionnaire_responses:
+            if questionnaire_responses.tracking_style == "quick-bold":
+                return PersonaType.QUICK_BOLD
+            elif questionnaire_responses.tracking_style == "detail-oriented":
+                return PersonaType.ANALYTICAL
+            elif questionnaire_responses.tech_comfort == "power":
+                return PersonaType.TECH_SAVVY
+            elif questionnaire_responses.motivation == "fast-action":
+                return PersonaType.FAST_ACTION
+        return PersonaType.INTERMEDIATE
+
+
+def make_users(n):
+    # Users draw from a pool of distinct questionnaires (or none)
+    questionnaires = [None] + [
+        QuestionnaireResponse(**{field: random.choice(values) for field, values in ANSWERS.items()})
+        for _ in range(200)
+    ]
+    ages = [random.randint(-1, 100) for _ in range(n)]
+    conditions = [random.choice(CONDITIONS) for _ in range(n)]
+    answers = [random.choice(questionnaires) for _ in range(n)]
+    return ages, conditions, answers
+
+
+async def awaited(ages, conditions, answers):
+    async def determine_persona(age, conditions=None, questionnaire_responses=None):
+        return if_elif_tree(age, conditions, questionnaire_responses)
+    return [await determine_persona(a, conditions=c, questionnaire_responses=q) for a, c, q in zip(ages, conditions, answers)]
+
+
+def best(repeat, function, *args):
+    """(result, fastest time) of repeated calls"""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - t0)
+    return result, min(times)
+
+
+def rate(n, seconds):
+    return f"{n / seconds / 1000:>9.0f}k/s"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rules = PersonaRules()
+    print(f"decision table: {len(rules.table)} entries, shape {rules.shape}")
+    print(f"{'users':>10} {'awaited':>12} {'inline':>12} {'classify':>12} {'batch':>12} {'speedup':>8}")
+    for n in args.sizes:
+        ages, conditions, answers = make_users(n)
+
+        expected, t_awaited = best(args.repeat, lambda: asyncio.run(awaited(ages, conditions, answers)))
+        inline, t_inline = best(args.repeat, lambda: [if_elif_tree(a, c, q) for a, c, q in zip(ages, conditions, answers)])
+        single, t_single = best(args.repeat, lambda: [rules.classify(a, c, q) for a, c, q in zip(ages, conditions, answers)])
+        batch, t_batch = best(args.repeat, rules.classify_batch, ages, conditions, answers)
+
+        assert inline == expected and single == expected and batch == expected, "decision table disagrees with the if/elif tree"
+        print(f"{n:>10} {rate(n, t_awaited)} {rate(n, t_inline)} {rate(n, t_single)} {rate(n, t_batch)} {t_awaited / t_batch:>7.1f}x")
+
+if __name__ == "__main__":
+    random.seed(0)
+    main()
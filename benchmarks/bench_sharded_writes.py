@@ -0,0 +1,88 @@
+"""
+Lab ingestion throughput of the sharded backend as the shard count grows.
+
+Concurrent writers each append --batches batches of --batch-size records for
+random users through ShardedDataBackend.store_lab_results_batch. Every shard is
+a separate SQLite file, so batches for different shards commit in parallel
+instead of queueing on a single database writer lock.
+
+    python benchmarks/bench_sharded_writes.py --shards 1 2 4 8 --writers 8
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.sharded_data_backend import ShardedDataBackend, ShardMap
+
+ANALYTES = ["Glucose", "Sodium", "Potassium", "Creatinine", "Hemoglobin"]
+
+
+def make_batch(size: int, users: int, writer: int, batch: int):
+    return [
+        (
+            str(random.randrange(users)),
+            f"bench-{writer}-{batch}",
+            "2024-06-01T09:00:00",
+            "bench",
+            {
+                "name": random.choice(ANALYTES),
+                "value": random.uniform(50, 150),
+                "unit": "mg/dL",
+                "reference_range": {"min": 70.0, "max": 99.0},
+                "category": "Metabolic Panel",
+                "status": "normal",
+            },
+        )
+        for _ in range(size)
+    ]
+
+
+async def run(shard_count: int, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        urls = [f"sqlite:///{tmp}/shard{i}.db" for i in range(shard_count)]
+        backend = ShardedDataBackend(ShardMap.uniform(urls), pool_size=args.writers)
+        await backend.connect()
+        batches = [
+            [make_batch(args.batch_size, args.users, w, b) for b in range(args.batches)]
+            for w in range(args.writers)
+        ]
+
+        async def writer(own_batches):
+            for records in own_batches:
+                await backend.store_lab_results_batch(records)
+
+        try:
+            t0 = time.perf_counter()
+            await asyncio.gather(*(writer(own) for own in batches))
+            elapsed = time.perf_counter() - t0
+        finally:
+            await backend.disconnect()
+    return args.writers * args.batches * args.batch_size / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'shards':>6} {'rows/s':>12} {'scaling':>8}")
+    baseline = None
+    for shard_count in args.shards:
+        throughput = asyncio.run(run(shard_count, args))
+        baseline = baseline or throughput
+        print(f"{shard_count:>6} {throughput:>12,.0f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    main()
@@ -0,0 +1,107 @@
+"""
+Per-request model CPU of the adaptive view: the old path that re-validated
+and re-dumped lab results at every layer versus the trusted path that
+validates stored rows once and builds the response dict directly.
+
+    python benchmarks/bench_trusted_models.py --sizes 50 500
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.schemas import AdaptiveViewResponse, AIGenerationResponse, LabResult, PersonaType
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+RECOMMENDATIONS = ["Follow up with your healthcare provider"]
+
+
+def make_rows(n):
+    return [
+        {
+            "name": f"Analyte {i}",
+            "value": random.uniform(50, 150),
+            "unit": "mg/dL",
+            "reference_range": {"min": 70.0, "max": 99.0},
+            "category": "Metabolic Panel",
+            "status": random.choice(["normal", "high", "low"]),
+        }
+        for i in range(n)
+    ]
+
+
+def ui_components(dumped):
+    return {"components": {"results_view": {"data": dumped}}}
+
+
+def validated_miss(rows):
+    """Cache miss as done before: dump, validate and re-dump at every layer"""
+    results = [LabResult(**row) for row in rows]
+    ai = AIGenerationResponse(content="", ui_components=ui_components([r.dict() for r in results]),
+                              recommendations=RECOMMENDATIONS)
+    response = AdaptiveViewResponse(persona=PersonaType.TECH_SAVVY, ui_components=ai.ui_components,
+                                    lab_results=results, recommendations=ai.recommendations)
+    cached = response.dict()
+    return json.dumps(jsonable_encoder(response)), cached
+
+
+def trusted_miss(rows):
+    results = [LabResult(**row) for row in rows]
+    ai = AIGenerationResponse(content="", ui_components=ui_components([r.model_dump(mode="json") for r in results]),
+                              recommendations=RECOMMENDATIONS)
+    response = {
+        "persona": PersonaType.TECH_SAVVY.value,
+        "ui_components": ai.ui_components,
+        "lab_results": [r.model_dump(mode="json") for r in results],
+        "recommendations": ai.recommendations,
+        "cache_hit": False,
+    }
+    return json.dumps(response), response
+
+
+def validated_hit(cached):
+    cached["cache_hit"] = True
+    return json.dumps(jsonable_encoder(AdaptiveViewResponse(**cached)))
+
+
+def trusted_hit(cached):
+    return json.dumps({**cached, "cache_hit": True})
+
+
+def per_call_us(fn, arg, samples):
+    t0 = time.perf_counter()
+    for _ in range(samples):
+        fn(arg)
+    return (time.perf_counter() - t0) / samples * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'results':>8} {'path':>6} {'validated':>12} {'trusted':>12} {'saved':>12}")
+    for n in args.sizes:
+        rows = make_rows(n)
+        _, cached = validated_miss(rows)
+        for label, before, after, before_arg, after_arg in (
+            ("miss", validated_miss, trusted_miss, rows, rows),
+            ("hit", validated_hit, trusted_hit, cached, trusted_miss(rows)[1]),
+        ):
+            b = per_call_us(before, before_arg, args.samples)
+            a = per_call_us(after, after_arg, args.samples)
+            print(f"{n:>8} {label:>6} {b:>10.1f}us {a:>10.1f}us {b - a:>10.1f}us")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    main()
@@ -0,0 +1,107 @@
+"""
+Compare building ui_components from the template on every call with the
+precompiled UISkeleton.
+
+For every persona, checks that the skeleton's dict and spliced JSON match what
+the old structure_ui_response built, then reports microseconds per call (best
+of --repeat runs of --calls calls) for:
+
+    rebuild        the old structure_ui_response tree
+    rebuild+json   the old tree, then json-encoded as the response would be
+    render         UISkeleton.render
+    render_json    UISkeleton.render_json, lab results encoded once by the caller
+
+    python benchmarks/bench_ui_skeleton.py --results 20
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.schemas import PersonaType
+from app.services.persona_registry import encode_json
+from app.services.template_service import get_ui_templates
+
+
+def rebuild(template, persona, content, lab_results):
+    """TemplateService.structure_ui_response as it was before skeletons"""
+    components = template.get("components", {})
+    return {
+        "layout": template.get("layout", "default"),
+        "components": {
+            "header": {
+                "type": components.get("header", {}).get("type", "default"),
+                "title": "Your Health Results",
+                "subtitle": f"Personalized for {persona.value.replace('_', ' ').title()}"
+            },
+            "results_view": {
+                "type": components.get("results_view", {}).get("type", "default"),
+                "data": lab_results,
+                "config": components.get("results_view", {})
+            },
+            "summary": {
+                "type": components.get("summary", {}).get("type", "default"),
+                "content": content,
+                "config": components.get("summary", {})
+            }
+        },
+        "styling": template.get("styling", {}),
+        "persona": persona.value
+    }
+
+
+def make_results(n):
+    return [
+        {
+            "name": f"Test {i}", "value": 90.0 + i, "unit": "mg/dL", "reference_range": {"min": 70.0, "max": 100.0},
+            "status": "high" if i % 3 == 0 else "normal", "date": "2024-01-15T00:00:00",
+        }
+        for i in range(n)
+    ]
+
+
+def best(repeat, calls, function):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(calls):
+            function()
+        times.append(time.perf_counter() - t0)
+    return min(times) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    templates = get_ui_templates()
+    lab_results = make_results(args.results)
+    content = "Your lab results show 2 values outside the normal range:\n\n• Glucose is elevated\n• LDL is elevated"
+    for persona in PersonaType:
+        expected = rebuild(templates.templates[persona], persona, content, lab_results)
+        skeleton = templates.skeletons[persona]
+        assert skeleton.render(content, lab_results) == expected, persona
+        assert skeleton.render_json(content, encode_json(lab_results)) == encode_json(expected), persona
+
+    persona = PersonaType.DETAIL_ORIENTED
+    template, skeleton = templates.templates[persona], templates.skeletons[persona]
+    lab_results_json = encode_json(lab_results)
+    timings = {
+        "rebuild": best(args.repeat, args.calls, lambda: rebuild(template, persona, content, lab_results)),
+        "rebuild+json": best(args.repeat, args.calls, lambda: encode_json(rebuild(template, persona, content, lab_results))),
+        "render": best(args.repeat, args.calls, lambda: skeleton.render(content, lab_results)),
+        "render_json": best(args.repeat, args.calls, lambda: skeleton.render_json(content, lab_results_json)),
+    }
+    print(f"{args.results} lab results, {len(PersonaType)} personas checked")
+    for name, micros in timings.items():
+        print(f"{name:>14} {micros:>8.2f} us/call")
+    print(f"{'speedup':>14} {timings['rebuild'] / timings['render']:>8.1f}x dict, "
+          f"{timings['rebuild+json'] / timings['render_json']:>.1f}x JSON")
+
+if __name__ == "__main__":
+    main()
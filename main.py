@@ -1,9 +1,16 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.orchestrator import router as orchestrator_router
 from app.api.persona import router as persona_router
 from app.api.data import router as data_router
 from app.api.ai import router as ai_router
+from app.api.analytics import router as analytics_router
+from app.services.cache_service import cache_service
+from app.services.cohort_service import cohort_service
+from app.services.ai_transport import ai_transport
+from app.services.content_reload import cancel_content_reload, start_content_reload
+from app.services.data_service import cancel_persona_recompute, get_data_backend, start_persona_recompute
 
 # Import test router for debugging
 try:
@@ -34,10 +41,34 @@ except ImportError:
     # Fallback if settings can't be imported
     cors_origins = ["http://localhost:5173", "http://localhost:3000", "http://localhost:8080"]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await get_data_backend().connect()
+    # One pooled AI backend client for the whole application
+    await ai_transport.start()
+    # Follow other workers' cache writes so this worker's local tier never serves stale entries
+    await cache_service.start_invalidation_listener()
+    # Warm the local cache before the worker starts accepting requests
+    await cache_service.warm()
+    # Stored personas computed under older rules are refreshed in the background
+    start_persona_recompute()
+    # Persona rules and UI templates are reloaded when their files change
+    start_content_reload()
+    yield
+    await cancel_content_reload()
+    await cancel_persona_recompute()
+    await cache_service.stop_invalidation_listener()
+    # Snapshot the hottest entries so the next worker starts warm
+    await cache_service.snapshot()
+    cohort_service.close()
+    await ai_transport.close()
+    await get_data_backend().disconnect()
+
 app = FastAPI(
     title="HealthLens API",
     description="Personalized health dashboard API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -54,6 +85,7 @@ app.include_router(orchestrator_router, prefix="/api/v1")
 app.include_router(persona_router, prefix="/api/v1/persona")
 app.include_router(data_router, prefix="/api/v1/data")
 app.include_router(ai_router, prefix="/api/v1/ai")
+app.include_router(analytics_router, prefix="/api/v1/analytics")
 
 # Include test router if available
 if TEST_ROUTER_AVAILABLE:
@@ -0,0 +1,74 @@
+"""
+HealthLens - Shard rebalancing tool
+
+Reassigns virtual buckets to a new list of shard databases and moves the
+affected users. Pause ingestion and profile writes while it runs. Running
+servers pick the new map up within SHARD_MAP_RELOAD_INTERVAL seconds; the old
+copies of moved users are deleted only after --grace seconds, so servers that
+have not reloaded yet keep finding them.
+
+    python rebalance_shards.py --add sqlite:///./healthlens-shard2.db
+    python rebalance_shards.py --shards sqlite:///./a.db sqlite:///./b.db --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import settings
+from app.services.sharded_data_backend import ShardedDataBackend, load_shard_map
+
+
+async def rebalance(args) -> int:
+    current = load_shard_map(args.map)
+    if args.shards:
+        shards = args.shards
+    else:
+        shards = [url for url in current.shards if url not in (args.remove or [])]
+        shards += [url for url in (args.add or []) if url not in shards]
+    if not shards:
+        print("❌ The new shard list is empty")
+        return 1
+
+    new_map = current.with_shards(shards)
+    moves = current.moves(new_map)
+    print(f"🔀 Shard map v{current.version} -> v{new_map.version}: {len(current.shards)} -> {len(shards)} shards")
+    for (source, target), buckets in sorted(moves.items()):
+        print(f"   {len(buckets):>5} buckets  {source} -> {target}")
+    if not moves:
+        print("✅ Nothing to move")
+        return 0
+    if args.dry_run:
+        return 0
+
+    backend = ShardedDataBackend(current, settings.database_pool_size, map_path=args.map)
+    try:
+        summary = await backend.rebalance(new_map, batch_size=args.batch_size, grace=args.grace)
+    finally:
+        await backend.disconnect()
+    print(f"✅ Moved {summary['users_moved']} users in {summary['buckets_moved']} buckets; map is now v{summary['version']}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebalance users between data shards")
+    parser.add_argument("--map", default=settings.shard_map_path, help="shard map file")
+    parser.add_argument("--shards", nargs="+", help="full list of shard database URLs after rebalancing")
+    parser.add_argument("--add", nargs="+", help="shard database URLs to add")
+    parser.add_argument("--remove", nargs="+", help="shard database URLs to drain and drop")
+    parser.add_argument("--batch-size", type=int, default=500, help="users copied per transaction")
+    parser.add_argument(
+        "--grace", type=float, default=2 * settings.shard_map_reload_interval,
+        help="seconds to wait after saving the map before deleting moved users from their old shards"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="only print the bucket moves")
+    args = parser.parse_args()
+    if not (args.shards or args.add or args.remove):
+        parser.error("one of --shards, --add or --remove is required")
+    sys.exit(asyncio.run(rebalance(args)))
+
+
+if __name__ == "__main__":
+    main()
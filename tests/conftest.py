@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# Settings are read when app.config is first imported, so point the app's
+# on-disk state at a scratch directory before any test module imports it
+_scratch = tempfile.mkdtemp(prefix="healthlens-tests-")
+os.environ.setdefault("DATA_BACKEND", "memory")
+os.environ.setdefault("LAB_CATALOG_PATH", os.path.join(_scratch, "lab_catalog.bin"))
+os.environ.setdefault("CACHE_SNAPSHOT_PATH", os.path.join(_scratch, "cache_snapshot.bin"))
+os.environ.setdefault("COHORT_SNAPSHOT_DIR", os.path.join(_scratch, "cohort_snapshot"))
+os.environ.setdefault("CONTENT_RELOAD_INTERVAL", "0")
@@ -0,0 +1,72 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.orchestrator import data_service
+from app.services.cache_service import cache_service, ui_version_key
+from app.services.json_patch import apply_patch, make_patch
+from main import app
+
+DOCUMENTS = [
+    ({}, {}),
+    ({"a": 1}, {"a": 2}),
+    ({"a": 1, "b": 2}, {"b": 2, "c": 3}),
+    ({"a": {"b": {"c": 1}}}, {"a": {"b": {"c": 1, "d": [1, 2]}}}),
+    ({"a": [1, 2, 3, 4, 5]}, {"a": [1, 2]}),
+    ({"a": [1, 2]}, {"a": [1, 2, 3, 4, 5]}),
+    ({"a": [1, 2, 3]}, {"a": []}),
+    ({"a": []}, {"a": [{"x": 1}, {"y": [2]}]}),
+    ({"a": [{"x": 1}, {"x": 2}, {"x": 3}]}, {"a": [{"x": 1}, {"x": 20}]}),
+    ({"a": [[1, 2], [3]]}, {"a": [[1], [3, 4, 5], [6]]}),
+    ({"a": {"b": 1}}, {"a": [1, 2]}),
+    ({"a": None}, {"a": {"b": None}}),
+    ({"a~b": 1, "c/d": 2, "~1": 3, "/": 4}, {"a~b": 10, "c/d": {"e/f~g": 5}, "~0": 6, "/": [4]}),
+    ({"a": {"x/y": [1, 2, 3]}}, {"a": {"x/y": [1]}, "~": {}}),
+    ([1, 2, 3], [3, 2]),
+    (1, {"a": 1}),
+]
+
+
+@pytest.mark.parametrize("old, new", DOCUMENTS)
+def test_apply_make_patch_round_trip(old, new):
+    patch = make_patch(old, new)
+    assert apply_patch(old, patch) == new
+    assert apply_patch(new, make_patch(new, old)) == old
+
+
+def test_apply_patch_leaves_input_unchanged():
+    old = {"a": [1, 2, 3], "b": {"c": 1}}
+    apply_patch(old, make_patch(old, {"a": [1], "b": {"c": 2, "d": 3}}))
+    assert old == {"a": [1, 2, 3], "b": {"c": 1}}
+
+
+def test_escaped_keys_in_paths():
+    patch = make_patch({"a/b": 1, "c~d": 1}, {"a/b": 2, "c~d": 2})
+    assert sorted(op["path"] for op in patch) == ["/a~1b", "/c~0d"]
+
+
+def _adaptive_view(client, **params):
+    response = client.get("/api/v1/adaptive-view", params={"user_id": "123", "bypass_cache": True, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_adaptive_view_patch_and_evicted_base():
+    with TestClient(app) as client:
+        base = _adaptive_view(client)
+        results = client.portal.call(data_service.get_lab_results, "123")
+        changed = [{**result.model_dump(), "value": result.value + 1} for result in results]
+        client.portal.call(data_service.store_lab_report, "123", changed, "RPT-123-001", "2024-10-15T09:00:00Z", "mock")
+        current = _adaptive_view(client)
+        assert current["ui_version"] != base["ui_version"]
+
+        patched = _adaptive_view(client, ui_version=base["ui_version"])
+        assert "ui_components" not in patched
+        assert patched["ui_base_version"] == base["ui_version"]
+        assert apply_patch(base["ui_components"], patched["ui_patch"]) == current["ui_components"]
+
+        # Once the base version has left the cache the client gets the whole document
+        client.portal.call(cache_service.delete, ui_version_key("123", None, base["ui_version"]))
+        full = _adaptive_view(client, ui_version=base["ui_version"])
+        assert "ui_patch" not in full
+        assert full["ui_version"] == current["ui_version"]
+        assert full["ui_components"] == current["ui_components"]
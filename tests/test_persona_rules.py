@@ -0,0 +1,84 @@
+import itertools
+
+import pytest
+
+from app.models.schemas import PersonaType, QuestionnaireResponse
+from app.services.persona_rules import PERSONA_RULES_SOURCE, compile_rules
+
+
+def legacy_persona(age, conditions=None, questionnaire_responses=None):
+    """The if/elif tree PersonaService.determine_persona used before the decision table"""
+    if age >= 65:
+        if conditions and ("diabetes" in conditions.lower() or "diabetic" in conditions.lower()):
+            return PersonaType.HEALTH_CONSCIOUS
+        elif questionnaire_responses:
+            if questionnaire_responses.tech_comfort == "beginner":
+                return PersonaType.BEGINNER
+            elif questionnaire_responses.tracking_style == "detail-oriented":
+                return PersonaType.DETAIL_ORIENTED
+        return PersonaType.CASUAL
+
+    elif age >= 45:
+        if conditions:
+            return PersonaType.HEALTH_CONSCIOUS
+        elif questionnaire_responses:
+            if questionnaire_responses.motivation == "goal-focused":
+                return PersonaType.GOAL_FOCUSED
+            elif questionnaire_responses.tracking_style == "tech-savvy":
+                return PersonaType.TECH_SAVVY
+        return PersonaType.BALANCED
+
+    else:
+        if questionnaire_responses:
+            if questionnaire_responses.tracking_style == "quick-bold":
+                return PersonaType.QUICK_BOLD
+            elif questionnaire_responses.tracking_style == "detail-oriented":
+                return PersonaType.ANALYTICAL
+            elif questionnaire_responses.tech_comfort == "power":
+                return PersonaType.TECH_SAVVY
+            elif questionnaire_responses.motivation == "fast-action":
+                return PersonaType.FAST_ACTION
+        return PersonaType.INTERMEDIATE
+
+
+AGES = [0, 18, 44, 45, 46, 64, 65, 66, 120]
+CONDITIONS = [
+    None, "", " ", ",", "diabetes", "Type 2 Diabetes", "prediabetic", "DIABETIC, asthma",
+    "hypertension", "asthma, high cholesterol",
+]
+QUESTIONNAIRES = [None] + [
+    QuestionnaireResponse(
+        tracking_style=tracking_style,
+        motivation=motivation,
+        time_spent="moderate",
+        tech_comfort=tech_comfort,
+        dashboard_preference="overview",
+    )
+    for tracking_style, motivation, tech_comfort in itertools.product(
+        ["detail-oriented", "tech-savvy", "quick-bold", "casual"],
+        ["goal-focused", "fast-action", "curious"],
+        ["beginner", "power", "average"],
+    )
+]
+CASES = list(itertools.product(AGES, CONDITIONS, QUESTIONNAIRES))
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return compile_rules(PERSONA_RULES_SOURCE)
+
+
+def test_classify_matches_legacy_tree(rules):
+    for age, conditions, questionnaire in CASES:
+        expected = legacy_persona(age, conditions, questionnaire)
+        assert rules.classify(age, conditions, questionnaire) == expected, (age, conditions, questionnaire)
+        stored = questionnaire.model_dump() if questionnaire is not None else None
+        assert rules.classify(age, conditions, stored) == expected, (age, conditions, stored)
+
+
+def test_classify_batch_matches_legacy_tree(rules):
+    ages, conditions, questionnaires = zip(*CASES)
+    expected = [legacy_persona(*case) for case in CASES]
+    assert rules.classify_batch(ages, conditions, questionnaires) == expected
+    stored = [q.model_dump() if q is not None else None for q in questionnaires]
+    assert rules.classify_batch(ages, conditions, stored) == expected